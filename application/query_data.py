@@ -1,31 +1,51 @@
 class QueryDataUseCase:
-    def __init__(self, query_artists, query_tracks, filter=None):
+    def __init__(self, query_artists, query_tracks, filter=None, batch_size=500, ask=True):
         self.query_artists = query_artists
         self.query_tracks = query_tracks
         self.filter = filter
+        self.batch_size = batch_size
+        self.ask = ask
 
-    def execute(self):
+    def filter_list(self):
+        """
+        Returns the names or IDs to query, from the filter or asked via input when there is none.
+        Without a filter and with ask disabled, the empty list selects every artist.
+        """
         if self.filter == None:
+            if not self.ask:
+                return []
             user_input = input('\nFor more information, enter artist names or IDs separated by comma: ')
-            filter_list = [f.strip() for f in user_input.split(',')]
-        else:
-            filter_list = [f.strip() for f in self.filter.split(',')]
+            return [f.strip() for f in user_input.split(',')]
+        return [f.strip() for f in self.filter.split(',')]
+
+    def iter_results(self):
+        """
+        Yields the result one artist at a time, fetching the tracks of batch_size artists per query,
+        so callers can stream the output without building the whole result.
+
+        Yields:
+            tuple: Artist name and a dictionary with its ID and top tracks.
+        """
+        artists = self.query_artists(self.filter_list())
 
-        artists = self.query_artists(filter_list)
+        for start in range(0, len(artists), self.batch_size):
+            batch = artists[start:start + self.batch_size]
+            tracks_by_artist = self.query_tracks([artist.artist_id for artist in batch])
 
-        result = {}
-        for artist in artists:
-            tracks = self.query_tracks(artist.artist_id)
-            result[artist.artist_name] = {
-                'id': artist.artist_id,
-                'top_tracks': [
-                    {
-                        'song_name': t.song_name,
-                        'song_id': t.song_id,
-                        'popularity': t.popularity,
-                        'album': t.album,
-                        'insertion_date': t.insertion_date
-                    } for t in tracks
-                ]
-            }
-        return result
+            for artist in batch:
+                tracks = tracks_by_artist.get(artist.artist_id, [])
+                yield artist.name, {
+                    'id': artist.artist_id,
+                    'top_tracks': [
+                        {
+                            'song_name': t.song_name,
+                            'song_id': t.song_id,
+                            'popularity': t.popularity,
+                            'album': t.album,
+                            'insertion_date': t.insertion_date
+                        } for t in tracks
+                    ]
+                }
+
+    def execute(self):
+        return dict(self.iter_results())
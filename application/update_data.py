@@ -1,27 +1,283 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+_DONE = object()
+
+
 class UpdateDataUseCase:
-    def __init__(self, spotify_api, check_data_date, create_csv, insert_csv_data_to_database):
+    """
+    Fetches the artists of a roster and stores their top tracks as a pipeline: results stream from
+    the fetch workers, in roster order, into a bounded queue that a persistence thread drains,
+    committing every batch_size artists while fetching continues.
+
+    With a refresh queue, the artists are first queued in the refresh_jobs table and then claimed
+    queue_size at a time, so several processes can share a roster and an interrupted run resumes
+    with the artists not done yet.
+
+    Args:
+        spotify_api (SpotifyAPI): API client.
+        check_data_date (callable): Returns the artists of the roster that need an update.
+        insert_results (callable): Stores a batch of results with their insertion date.
+        create_csv (callable): Appends a batch of results to the CSV export, if any.
+        workers (int): Artists fetched concurrently.
+        resolve_artist_ids (callable): Resolves names to the artist IDs already stored, if any.
+        batch_size (int): Artists committed per batch.
+        queue_size (int): Artists fetched ahead of the persistence stage, at most. Defaults to two batches.
+        jobs (RefreshQueue): Work queue of the run, if any.
+        save_artist_ids (callable): Stores the artist ID found for each roster name, if any, so
+            resolve_artist_ids finds names spelled differently from Spotify's on later runs.
+    """
+    def __init__(self, spotify_api, check_data_date, insert_results, create_csv=None, workers=1,
+                 resolve_artist_ids=None, batch_size=100, queue_size=None, jobs=None, save_artist_ids=None):
         self.spotify_api = spotify_api
         self.check_data_date = check_data_date
+        self.insert_results = insert_results
         self.create_csv = create_csv
-        self.insert_csv_data_to_database = insert_csv_data_to_database
+        self.workers = max(1, workers)
+        self.resolve_artist_ids = resolve_artist_ids
+        self.batch_size = max(1, batch_size)
+        self.queue_size = queue_size or 2 * self.batch_size
+        self.jobs = jobs
+        self.save_artist_ids = save_artist_ids
+
+    def resolve_known_artists(self, artists):
+        """
+        Resolves artists whose IDs are already stored, refreshing their metadata in batches
+        through the multiple artists endpoint instead of one name search each.
+
+        Args:
+            artists (list): Artist names.
+
+        Returns:
+            dict: Lowercased artist name -> Artist object, for the artists resolved without a search.
+        """
+        if self.resolve_artist_ids is None:
+            return {}
+
+        artist_ids = self.resolve_artist_ids(artists)
+        if not artist_ids:
+            return {}
+
+        print(f'Refreshing {len(artist_ids)} known artists by ID')
+        found = {artist.artist_id: artist for artist in self.spotify_api.search_artists_by_ids(list(artist_ids.values()))}
+
+        known = {name: found[artist_id] for name, artist_id in artist_ids.items() if artist_id in found}
+        self.spotify_api.artist_cache.update(known)
+        return known
+
+    def fetch_artist(self, artist, artist_obj=None):
+        """
+        Searches an artist by name, unless already resolved, and then their top tracks.
+
+        Args:
+            artist (str): Artist name.
+            artist_obj (Artist): Artist already resolved by ID, if any.
+
+        Returns:
+            dict: Result of search_top_tracks for the artist.
+        """
+        if artist_obj is None:
+            print(f'Searching for {artist}')
+            artist_obj = self.spotify_api.search_artist(artist)
+        print(f'Searching tracks for artist {artist}')
+        return self.spotify_api.search_top_tracks(artist_obj)
+
+    def iter_fetched(self, artists, known_artists=None):
+        """
+        Fetches the artists, fanning the requests out across a thread pool when more than one worker
+        is configured, and yields each result as soon as it and the ones before it are available.
+        At most queue_size requests are submitted ahead of the consumer.
+
+        Args:
+            artists (list): Artist names.
+            known_artists (dict): Lowercased artist name -> Artist object already resolved.
+
+        Yields:
+            tuple: Artist name and its result, in the same order as the given artists.
+        """
+        known_artists = known_artists or {}
+
+        if self.workers == 1:
+            for artist in artists:
+                yield artist, self.fetch_artist(artist, known_artists.get(artist.lower()))
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            try:
+                for artist in artists:
+                    pending.append((artist, executor.submit(self.fetch_artist, artist, known_artists.get(artist.lower()))))
+                    if len(pending) >= self.queue_size:
+                        artist, future = pending.popleft()
+                        yield artist, future.result()
+                while pending:
+                    artist, future = pending.popleft()
+                    yield artist, future.result()
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def fetch_artists(self, artists, known_artists=None):
+        """
+        Fetches all artists.
+
+        Args:
+            artists (list): Artist names.
+            known_artists (dict): Lowercased artist name -> Artist object already resolved.
+
+        Returns:
+            list: Results in the same order as the given artists.
+        """
+        return [result for _, result in self.iter_fetched(artists, known_artists)]
+
+    def persist(self, batches, insertion_date, errors):
+        """
+        Persistence stage: stores each batch taken from the queue with the artist ID of each roster
+        name, appends it to the CSV export and marks its jobs finished once committed. After a failure the remaining batches are drained
+        unwritten, so the fetching side never blocks on a full queue.
+
+        Args:
+            batches (Queue): Lists of (artist name, result) pairs, ended by _DONE.
+            insertion_date (datetime): Timestamp stored on every row.
+            errors (list): Receives the exception that stopped the stage.
+        """
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                return
+            if errors:
+                continue
+            try:
+                results = [result for _, result in batch if result]
+                if results:
+                    self.insert_results(results, insertion_date)
+                    if self.save_artist_ids is not None:
+                        self.save_artist_ids({artist: result['artist'].artist_id for artist, result in batch if result})
+                    if self.create_csv is not None:
+                        self.create_csv(results, insertion_date)
+                if self.jobs is not None:
+                    self.finish_jobs(batch)
+            except Exception as e:
+                errors.append(e)
+
+    def finish_jobs(self, batch):
+        """
+        Marks the jobs of a committed batch: done when saved, failed when Spotify found no artist by
+        that name, and back to pending with the error of the request otherwise, e.g. after a 429 or
+        5xx that outlasted the retries, so a later attempt or rerun fetches them again.
+
+        Args:
+            batch (list): (artist name, result) pairs.
+        """
+        not_found = self.spotify_api.not_found
+        done, missing, failed = [], [], {}
+        for artist, result in batch:
+            if result:
+                done.append(artist)
+            elif artist.lower() in not_found:
+                missing.append(artist)
+            else:
+                failed[artist] = self.spotify_api.errors.get(artist.lower(), 'Request failed')
+        self.jobs.finish(done, missing, failed)
+
+    def run_pipeline(self, artists, insertion_date):
+        """
+        Fetches the artists and persists them in batches, the persistence stage running on its own
+        thread. Batches fetched before an error are still committed before the error is raised.
+
+        Args:
+            artists (list): Artist names.
+            insertion_date (datetime): Timestamp stored on every row.
+        """
+        known_artists = self.resolve_known_artists(artists)
+        batches = queue.Queue(maxsize=max(1, self.queue_size // self.batch_size))
+        errors = []
+        persister = threading.Thread(target=self.persist, args=(batches, insertion_date, errors), daemon=True)
+        persister.start()
+        try:
+            batch = []
+            for artist, result in self.iter_fetched(artists, known_artists):
+                batch.append((artist, result))
+                if len(batch) == self.batch_size:
+                    batches.put(batch)
+                    batch = []
+                if errors:
+                    break
+            if batch and not errors:
+                batches.put(batch)
+        finally:
+            batches.put(_DONE)
+            persister.join()
+
+        if errors:
+            raise errors[0]
+
+    def enqueue(self, artists_json):
+        """
+        Queues the artists of the roster that need an update in the refresh queue.
+
+        Returns:
+            int: Number of artists left to process in the run, including those queued by an interrupted attempt.
+        """
+        self.jobs.enqueue(self.check_data_date(artists_json))
+        counts = self.jobs.counts()
+        if counts.get('done') or counts.get('failed') or counts.get('in_progress'):
+            print(f'Resuming run: {counts}')
+            self.warn_in_progress(counts)
+        return counts.get('pending', 0) + counts.get('in_progress', 0)
+
+    def warn_in_progress(self, counts):
+        """
+        Warns about artists claimed by another process, or left in_progress by a run that stopped,
+        which this run does not fetch until their lease expires.
+        """
+        if counts.get('in_progress'):
+            print(f'{counts["in_progress"]} artists are in progress in another process or were left by a run '
+                  f'that stopped. They are fetched again once their lease of {self.jobs.lease_seconds:g}s expires '
+                  f'(see --lease_seconds).')
+
+    def process_jobs(self, insertion_date=None):
+        """
+        Claims artists from the refresh queue and processes them until none is left. On error, the
+        artists still held are returned to the queue before the error is raised.
+
+        Args:
+            insertion_date (datetime): Timestamp stored on every row. Defaults to now.
+        """
+        insertion_date = insertion_date or datetime.now()
+        while True:
+            artists = self.jobs.claim(self.queue_size)
+            if not artists:
+                return
+            try:
+                self.run_pipeline(artists, insertion_date)
+            except Exception as e:
+                self.jobs.release(str(e))
+                raise
 
     def execute(self, artists_json):
-        artists = self.check_data_date(artists_json)
-        if not artists:
+        if self.jobs is None:
+            artists = self.check_data_date(artists_json)
+            remaining = len(artists)
+        else:
+            remaining = self.enqueue(artists_json)
+        if not remaining:
             print('Data already updated. No new search will be executed.')
             return
-    
-        results = []
-        print('Searching...')
-        for artist in artists:
-            print(f'Searching for {artist}')
-            artist_obj = self.spotify_api.search_artist(artist)
-            print(f'Searching tracks for artist {artist}')
-            artist_info = self.spotify_api.search_top_tracks(artist_obj)
-            results.append(artist_info)
 
-        self.create_csv(results)
-        print(f'Search completed. File saved at /data/search_results.csv.')
+        print('Searching...')
+        insertion_date = datetime.now()
+        if self.jobs is None:
+            self.run_pipeline(artists, insertion_date)
+        else:
+            self.process_jobs(insertion_date)
+            counts = self.jobs.counts()
+            print(f'Refresh jobs: {counts}')
+            self.warn_in_progress(counts)
 
-        self.insert_csv_data_to_database()
-        print(f'Database created successfully. File saved at /data/spotify_data.db.')
+        print(f'Search completed. Data saved at /data/spotify_data.db.')
+        if self.create_csv is not None:
+            print(f'CSV exported to /data/search_results_{insertion_date.date()}.csv.')
@@ -0,0 +1,105 @@
+"""
+Compares the vectorized popularity trends of application/analytics.py (deltas, rolling averages,
+ranks, rank changes and rising tracks for every artist at once) with a naive per-artist Python
+loop over the same history rows, and checks that both agree on a sample of rows.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_analytics --artists 2000 --days 100
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.synthetic import populate
+
+
+def naive_trends(rows, window):
+    by_artist = {}
+    for artist_id, artist_name, song_id, song_name, album, popularity, insertion_date in rows:
+        by_artist.setdefault(artist_id, []).append((song_id, insertion_date, popularity))
+
+    trends = {}
+    for artist_id, tracks in by_artist.items():
+        by_date = {}
+        by_song = {}
+        for song_id, insertion_date, popularity in tracks:
+            by_date.setdefault(insertion_date, []).append((song_id, popularity))
+            by_song.setdefault(song_id, []).append((insertion_date, popularity))
+
+        ranks = {}
+        for insertion_date, entries in by_date.items():
+            for position, (song_id, _) in enumerate(sorted(entries, key=lambda e: (-e[1], e[0])), 1):
+                ranks[(song_id, insertion_date)] = position
+
+        for song_id, series in by_song.items():
+            series.sort()
+            for i, (insertion_date, popularity) in enumerate(series):
+                values = [p for _, p in series[max(0, i - window + 1):i + 1]]
+                rank = ranks[(song_id, insertion_date)]
+                trends[(artist_id, song_id, insertion_date)] = (
+                    popularity - series[i - 1][1] if i else None,
+                    sum(values) / len(values),
+                    rank,
+                    ranks[(song_id, series[i - 1][0])] - rank if i else None
+                )
+    return trends
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    print(f'{label:<36} {time.perf_counter() - start:8.3f}s')
+    return result
+
+
+def same(value, expected):
+    if expected is None:
+        return math.isnan(value)
+    return abs(value - expected) < 1e-6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=100)
+    parser.add_argument('--window', type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        from infrastructure.database import Database, db
+        from infrastructure.columnar import build_history
+        from application.analytics import compute_trends, rising_tracks
+
+        connection = db.raw_connection()
+        populate(connection, args.artists, args.days)
+        connection.close()
+        database = Database()
+        print(f'{args.artists * args.days * 10} history rows')
+
+        with database.session_scope() as session:
+            rows = timed('read rows from SQLite', lambda: database._history_cursor(session).fetchall())
+        history = timed('build columnar history', lambda: build_history(rows))
+        trends = timed('vectorized trends', lambda: compute_trends(history, args.window))
+        timed('vectorized rising tracks', lambda: rising_tracks(history, trends))
+        expected = timed('naive per-artist loop', lambda: naive_trends(rows, args.window))
+
+        artist_id, song_id, insertion_date = history.artist_id, history.song_id, history.insertion_date
+        insertion_text = {value: str(value).replace('T', ' ') for value in history.insertion_dates}
+        for row in random.sample(range(len(history)), min(1000, len(history))):
+            key = (str(artist_id[row]), str(song_id[row]), insertion_text[insertion_date[row]])
+            delta, rolling_average, rank, rank_change = expected[key]
+            assert same(trends['delta'][row], delta), key
+            assert same(trends['rolling_average'][row], rolling_average), key
+            assert trends['rank'][row] == rank, key
+            assert same(trends['rank_change'][row], rank_change), key
+        print('sampled rows match the naive loop')
+        db.dispose()
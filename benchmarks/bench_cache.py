@@ -0,0 +1,47 @@
+"""
+Runs the same update twice against the local fake Spotify server with the response cache enabled,
+expiring the cache in between, and reports hits, revalidations and bytes not downloaded.
+
+Usage:
+    python -m benchmarks.bench_cache --artists 200
+"""
+import argparse
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from application.update_data import UpdateDataUseCase
+from benchmarks.fake_spotify import FakeSpotifyServer
+from infrastructure.api import SpotifyAPI
+from infrastructure.cache import ResponseCache
+
+
+def run_once(server, cache, artists, label):
+    api = SpotifyAPI('id', 'secret', url=server.api_url, token_url=server.token_url, cache=cache)
+    usecase = UpdateDataUseCase(api, lambda _: artists, lambda results, _: None)
+
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        usecase.execute('artists.json')
+    elapsed = time.perf_counter() - start
+    print(f'{label:<14} {elapsed:6.2f}s  {cache.stats()}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.005)
+    args = parser.parse_args()
+
+    artists = [f'Artist {i}' for i in range(args.artists)]
+    with tempfile.TemporaryDirectory() as folder, FakeSpotifyServer(latency=args.latency) as server:
+        cache = ResponseCache(os.path.join(folder, 'http_cache.db'), ttl=3600)
+        run_once(server, cache, artists, 'cold')
+        run_once(server, cache, artists, 'warm')
+
+        cache.ttl = 0
+        run_once(server, cache, artists, 'revalidated')
+        print(f'304 responses served: {server.not_modified}')
+        cache.close()
@@ -0,0 +1,105 @@
+"""
+Compares the top_tracks history stored as daily search_results CSV files (the format written by
+create_csv) with the columnar export of Database.export_history: size on disk, and time to load
+every row with popularity and insertion date parsed into usable values.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_export --artists 2000 --days 100
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.synthetic import populate
+
+
+def size_mb(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 1024 / 1024
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 1024 / 1024
+
+
+def write_daily_csvs(connection, folder):
+    os.makedirs(folder)
+    rows = connection.execute(
+        'SELECT a.artist_name, t.artist_id, t.song_name, t.song_id, t.popularity, t.album, t.insertion_date '
+        'FROM top_tracks_history t JOIN artists a ON a.artist_id = t.artist_id ORDER BY t.insertion_date'
+    )
+    columns = ['artist_name', 'artist_id', 'song_name', 'song_id', 'popularity', 'album', 'insertion_date']
+    current, f, writer = None, None, None
+    for row in rows:
+        day = row[6][:10]
+        if day != current:
+            if f:
+                f.close()
+            current = day
+            f = open(os.path.join(folder, f'search_results_{day}.csv'), 'w', newline='', encoding='utf-8')
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(columns)
+        writer.writerow(row)
+    if f:
+        f.close()
+
+
+def load_csvs(folder):
+    popularity, insertion_dates = [], []
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name), newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f, delimiter=';'):
+                popularity.append(int(row['popularity']))
+                insertion_dates.append(datetime.fromisoformat(row['insertion_date']))
+    return sum(popularity) / len(popularity)
+
+
+def load_columns(path, mmap):
+    history = load_history(path, mmap=mmap)
+    history.insertion_date
+    return float(history.popularity.mean())
+
+
+def timed(label, function, size):
+    start = time.perf_counter()
+    mean = function()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<28} {size:8.1f}MB  load={elapsed * 1000:9.1f}ms  (mean popularity {mean:.2f})')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        from infrastructure.database import Database, db
+        from infrastructure.columnar import load_history
+
+        connection = db.raw_connection()
+        populate(connection, args.artists, args.days)
+        csv_folder = os.path.join(folder, 'csv')
+        write_daily_csvs(connection, csv_folder)
+        connection.close()
+        print(f'{args.artists * args.days * 10} history rows')
+
+        database = Database()
+        start = time.perf_counter()
+        database.export_history('history')
+        print(f'export_history (.npy folder)  {time.perf_counter() - start:6.2f}s')
+        start = time.perf_counter()
+        database.export_history('history.npz')
+        print(f'export_history (.npz)         {time.perf_counter() - start:6.2f}s')
+
+        timed('daily CSV files', lambda: load_csvs(csv_folder), size_mb(csv_folder))
+        timed('.npz compressed', lambda: load_columns('history.npz', False), size_mb('history.npz'))
+        timed('.npy folder, read', lambda: load_columns('history', False), size_mb('history'))
+        timed('.npy folder, memory-mapped', lambda: load_columns('history', True), size_mb('history'))
+        db.dispose()
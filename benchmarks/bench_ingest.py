@@ -0,0 +1,79 @@
+"""
+Compares the ways search results reach the database, on synthetic search results: the CSV file
+written by create_csv loaded with the legacy loop (one session.merge per row, as before batching)
+and with insert_csv_data_to_database (streamed, batched upserts), and the direct bulk upsert of
+insert_results. Every ingestion writes to its own fresh database file, so each one times inserts,
+not updates of rows left by the previous one. The legacy loop takes minutes at the default size.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_ingest --tracks 100000
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.synthetic import search_results
+
+
+def timed(label, function, rows):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<36} {elapsed:8.2f}s  {rows / elapsed:10.0f} rows/s')
+
+
+def merge_per_row(database, csv_folder):
+    """
+    The ingestion loop used before batching: every row is read into memory, then merged one by
+    one into artists and the top_tracks table.
+    """
+    from infrastructure.database import Artists, TopTracks
+
+    with database.session_scope() as session:
+        for file in sorted(f for f in os.listdir(csv_folder) if f.endswith('.csv')):
+            with open(os.path.join(csv_folder, file), encoding='utf-8') as f:
+                rows = list(csv.DictReader(f, delimiter=';'))
+            for row in rows:
+                session.merge(Artists(artist_id=row['artist_id'], artist_name=row['artist_name']))
+                session.merge(TopTracks(song_name=row['song_name'], song_id=row['song_id'],
+                                        popularity=int(row['popularity']), album=row['album'],
+                                        artist_id=row['artist_id'], insertion_date=row['insertion_date']))
+            session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tracks', type=int, default=100000)
+    args = parser.parse_args()
+
+    results = search_results(args.tracks // 10)
+    insertion_date = datetime.now()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        os.makedirs('data')
+        from infrastructure.database import Database, create_database_engine
+
+        def fresh_database(name):
+            return Database(create_database_engine(os.path.join(folder, f'{name}.db')))
+
+        database = fresh_database('csv')
+        timed('create_csv', lambda: database.create_csv(results, insertion_date), args.tracks)
+        timed('CSV + merge per row (legacy)', lambda: merge_per_row(database, 'data'), args.tracks)
+        database.engine.dispose()
+
+        database = fresh_database('batched')
+        timed('CSV + insert_csv_data_to_database', lambda: database.insert_csv_data_to_database('data'), args.tracks)
+        database.engine.dispose()
+
+        database = fresh_database('bulk')
+        timed('bulk upsert (insert_results)', lambda: database.insert_results(results, insertion_date), args.tracks)
+        database.engine.dispose()
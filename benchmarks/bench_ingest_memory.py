@@ -0,0 +1,70 @@
+"""
+Measures peak Python memory (tracemalloc) of insert_csv_data_to_database on CSV files of growing size,
+next to the peak of materializing the same file with list(csv.DictReader), as the old ingestion did.
+Streaming ingestion should stay flat while the materialized reference grows with the file.
+
+Every file is ingested into its own fresh database file, so each size times inserts, not updates
+of the rows left by the previous one. Runs inside a temporary working directory so the real
+data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_ingest_memory --rows 50000,200000
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.getcwd())
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['artist_name', 'artist_id', 'song_name', 'song_id', 'popularity', 'album', 'insertion_date'])
+        for i in range(rows):
+            a = i // 10
+            writer.writerow([f'Artist {a}', f'artist{a:08d}', f'Track {i}', f'track{i:010d}', i % 100,
+                             f'Album {a % 500}', '2024-07-22 10:00:00.000000'])
+
+
+def peak_mb(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed
+
+
+def materialize(path):
+    with open(path, encoding='utf-8') as f:
+        return len(list(csv.DictReader(f, delimiter=';')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=str, default='50000,200000')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        from infrastructure.database import Database, create_database_engine
+
+        for rows in [int(r) for r in args.rows.split(',')]:
+            database = Database(create_database_engine(os.path.join(folder, f'ingest_{rows}.db')))
+            csv_folder = os.path.join(folder, f'csv_{rows}')
+            os.makedirs(csv_folder)
+            path = os.path.join(csv_folder, 'search_results.csv')
+            write_csv(path, rows)
+            size = os.path.getsize(path) / 1024 / 1024
+
+            reference, _ = peak_mb(lambda: materialize(path))
+            streaming, elapsed = peak_mb(lambda: database.insert_csv_data_to_database(csv_folder))
+            print(f'rows={rows:9d}  file={size:7.1f}MB  list(reader) peak={reference:7.1f}MB  '
+                  f'streaming ingest peak={streaming:6.1f}MB  ({rows / elapsed:8.0f} rows/s)')
+            database.engine.dispose()
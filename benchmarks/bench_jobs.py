@@ -0,0 +1,95 @@
+"""
+Runs one roster update through the refresh_jobs queue with 1, 2 and 4 worker processes against
+the local fake Spotify server, checking that every artist is requested exactly once whatever the
+number of processes, then kills a run halfway and resumes it.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_jobs --artists 400 --latency 0.02 --processes 1,2,4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.fake_spotify import FakeSpotifyServer
+
+
+def worker(run_id, api_url, token_url, workers, lease_seconds):
+    from infrastructure.api import SpotifyAPI
+    from infrastructure.database import Database
+    from infrastructure.jobs import RefreshQueue
+    from application.update_data import UpdateDataUseCase
+
+    database = Database()
+    api = SpotifyAPI('id', 'secret', url=api_url, token_url=token_url, pool_size=workers)
+    usecase = UpdateDataUseCase(api, None, database.insert_results, workers=workers, batch_size=20,
+                                jobs=RefreshQueue(database, run_id, lease_seconds=lease_seconds))
+    with redirect_stdout(StringIO()):
+        usecase.process_jobs()
+
+
+def run(server, database, label, artists, processes, workers, kill_after=None, lease_seconds=600):
+    from infrastructure.jobs import RefreshQueue
+
+    jobs = RefreshQueue(database, label)
+    jobs.enqueue(artists)
+    searches = server.requests_served
+    context = multiprocessing.get_context('spawn')
+    pool = [context.Process(target=worker, args=(label, server.api_url, server.token_url, workers, lease_seconds))
+            for _ in range(processes)]
+
+    start = time.perf_counter()
+    for process in pool:
+        process.start()
+    if kill_after is not None:
+        time.sleep(kill_after)
+        for process in pool:
+            process.kill()
+    for process in pool:
+        process.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, server.requests_served - searches, jobs.counts()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--processes', type=str, default='1,2,4')
+    parser.add_argument('--workers', type=int, default=1, help='Fetch threads per process')
+    parser.add_argument('--lease_seconds', type=float, default=5, help='Lease of the resumed run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder, FakeSpotifyServer(latency=args.latency) as server:
+        os.chdir(folder)
+        from infrastructure.database import Database, db
+
+        database = Database()
+        timings = {}
+        for processes in [int(p) for p in args.processes.split(',')]:
+            artists = [f'Artist {processes}-{i}' for i in range(args.artists)]
+            elapsed, requests, counts = run(server, database, f'run {processes}', artists, processes, args.workers)
+            # Each artist takes one search and one top-tracks request, whatever the number of processes.
+            assert requests == 2 * args.artists, f'{requests} requests for {args.artists} artists'
+            timings[processes] = elapsed
+            print(f'processes={processes}  {elapsed:6.2f}s  {args.artists / elapsed:7.1f} artists/s  {counts}')
+
+        artists = [f'Resumed {i}' for i in range(args.artists)]
+        kill_after = timings.get(2, elapsed) / 2
+        elapsed, requests, counts = run(server, database, 'resumed', artists, 2, args.workers, kill_after=kill_after)
+        print(f'2 processes killed after {elapsed:5.2f}s: {counts}')
+        # Jobs left in_progress by the killed processes are claimed again once their lease expires,
+        # as with --lease_seconds. The lease stays longer than a claimed batch takes to process.
+        time.sleep(args.lease_seconds)
+        elapsed, requests, counts = run(server, database, 'resumed', artists, 2, args.workers,
+                                        lease_seconds=args.lease_seconds)
+        print(f'resumed in {elapsed:5.2f}s with {requests} API requests: {counts}')
+        db.dispose()
@@ -0,0 +1,106 @@
+"""
+Measures the cost of --metrics: the overhead of one instrumented call against a plain method
+call, then a whole update against the local fake Spotify server with and without instrumentation,
+printing the per-stage latencies the instrumented run recorded.
+
+With no server latency the update is dominated by local work, which is the worst case for the
+relative overhead. Runs inside a temporary working directory so the real data/spotify_data.db is
+never touched.
+
+Usage:
+    python -m benchmarks.bench_metrics --artists 500 --latency 0 --calls 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.fake_spotify import FakeSpotifyServer
+
+
+class Target:
+    def call(self, value):
+        return value
+
+
+def call_overhead(calls):
+    from infrastructure.metrics import Metrics
+
+    timings = {}
+    for label, target in (('plain', Target()), ('instrumented', Metrics().instrument(Target(), 'bench', ['call']))):
+        call = target.call
+        start = time.perf_counter()
+        for i in range(calls):
+            call(i)
+        timings[label] = (time.perf_counter() - start) / calls
+        print(f'{label + " call":<20} {timings[label] * 1e9:8.0f}ns')
+    print(f'{"overhead per call":<20} {(timings["instrumented"] - timings["plain"]) * 1e9:8.0f}ns')
+
+
+def update(server, database, label, artists, workers, metrics=None):
+    from infrastructure.api import SpotifyAPI
+    from infrastructure.jobs import RefreshQueue
+    from application.update_data import UpdateDataUseCase
+    from interface.main import INSTRUMENTED
+
+    api = SpotifyAPI('id', 'secret', url=server.api_url, token_url=server.token_url, pool_size=workers)
+    jobs = RefreshQueue(database, label)
+    if metrics is not None:
+        metrics.instrument(api, 'api', INSTRUMENTED['api'])
+        metrics.instrument(api.scheduler, 'http', INSTRUMENTED['http'])
+        metrics.instrument(jobs, 'jobs', INSTRUMENTED['jobs'])
+    usecase = UpdateDataUseCase(api, lambda _: artists, database.insert_results, workers=workers, jobs=jobs)
+    if metrics is not None:
+        metrics.instrument(usecase, 'update', INSTRUMENTED['update'])
+
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        usecase.execute('artists.json')
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--calls', type=int, default=1000000)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    call_overhead(args.calls)
+
+    with tempfile.TemporaryDirectory() as folder, FakeSpotifyServer(latency=args.latency) as server:
+        os.chdir(folder)
+        from infrastructure.database import Database, db
+        from infrastructure.metrics import Metrics
+        from interface.main import INSTRUMENTED, ROW_COUNTS
+
+        timings = {'disabled': [], 'enabled': []}
+        metrics = None
+        for round in range(args.rounds):
+            for label in timings:
+                database = Database()
+                if label == 'enabled':
+                    metrics = Metrics()
+                    metrics.instrument(database, 'database', INSTRUMENTED['database'], ROW_COUNTS['database'])
+                artists = [f'{label} {round} {i}' for i in range(args.artists)]
+                timings[label].append(update(server, database, f'{label} {round}', artists, args.workers,
+                                             metrics if label == 'enabled' else None))
+        for label, values in timings.items():
+            best = min(values)
+            print(f'update, metrics {label:<9} {best:6.2f}s  {args.artists / best:7.1f} artists/s (best of {args.rounds})')
+        print(f'overhead {min(timings["enabled"]) / min(timings["disabled"]) - 1:+.1%}')
+
+        print('\nStages of the last instrumented run:')
+        for histogram in metrics.report()['histograms']:
+            labels = histogram['labels']
+            print(f'  {labels["component"]:<9} {labels["method"]:<22} calls={histogram["count"]:6}  '
+                  f'mean={histogram["mean"] * 1000:8.2f}ms  p95<={histogram["p95"] * 1000:8.1f}ms  '
+                  f'total={histogram["sum"]:6.2f}s')
+        db.dispose()
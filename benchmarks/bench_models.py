@@ -0,0 +1,103 @@
+"""
+Compares the query read path through ORM LatestTopTracks instances with the column path that
+selects plain tuples into slotted, frozen TrackSnapshot models: load time, memory held per 1M
+tracks (tracemalloc) and serialization time (dicts as built by QueryDataUseCase, then JSON).
+A plain, non-slotted dataclass with the same fields is included as reference.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_models --tracks 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.synthetic import populate
+
+
+@dataclass
+class PlainSnapshot:
+    artist_id: str
+    song_id: str
+    song_name: str
+    popularity: int
+    album: str
+    insertion_date: str
+
+
+def serialize(tracks):
+    return json.dumps([{
+        'song_name': t.song_name,
+        'song_id': t.song_id,
+        'popularity': t.popularity,
+        'album': t.album,
+        'insertion_date': t.insertion_date
+    } for t in tracks])
+
+
+def measure(label, load, count):
+    gc.collect()
+    start = time.perf_counter()
+    tracks = load()
+    load_time = time.perf_counter() - start
+    start = time.perf_counter()
+    serialize(tracks)
+    serialize_time = time.perf_counter() - start
+    del tracks
+    gc.collect()
+
+    tracemalloc.start()
+    tracks = load()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tracks
+    gc.collect()
+
+    scale = 1_000_000 / count
+    print(f'{label:<26} load={load_time:6.2f}s  serialize={serialize_time:6.2f}s  '
+          f'memory={held * scale / 1024 / 1024:7.1f}MB per 1M tracks')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tracks', type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        from infrastructure.database import Database, db, LatestTopTracks, SNAPSHOT_COLUMNS
+        from sqlalchemy import select
+
+        connection = db.raw_connection()
+        populate(connection, args.tracks // 10, 1)
+        connection.close()
+        database = Database()
+        database.rebuild_latest_top_tracks()
+        count = args.tracks // 10 * 10
+
+        def orm_instances():
+            session = database.Session()
+            tracks = session.query(LatestTopTracks).all()
+            database.Session.remove()
+            return tracks
+
+        def snapshots():
+            return [track for tracks in database.query_latest_top_tracks().values() for track in tracks]
+
+        def plain_dataclasses():
+            with database.session_scope() as session:
+                return [PlainSnapshot(*row) for row in session.execute(select(*SNAPSHOT_COLUMNS))]
+
+        measure('ORM LatestTopTracks', orm_instances, count)
+        measure('plain dataclass', plain_dataclasses, count)
+        measure('slotted TrackSnapshot', snapshots, count)
+        db.dispose()
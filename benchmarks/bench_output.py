@@ -0,0 +1,87 @@
+"""
+Compares the ways of writing a query over every artist: building the whole result and printing
+its repr (the previous output), building it and dumping one JSON document, and streaming it with
+--format json/ndjson using the stdlib encoder and orjson (when installed). Reports time to first
+byte, total time and peak traced memory.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_output --artists 50000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.synthetic import populate
+
+
+class Sink:
+    """
+    Text stream that discards what it receives, remembering when the first write happened.
+    """
+    def __init__(self):
+        self.first_write = None
+        self.size = 0
+
+    def write(self, text):
+        if self.first_write is None:
+            self.first_write = time.perf_counter()
+        self.size += len(text)
+
+    def flush(self):
+        pass
+
+
+def measure(label, write):
+    sink = Sink()
+    tracemalloc.start()
+    start = time.perf_counter()
+    write(sink)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'{label:<26} first byte={(sink.first_write - start) * 1000:8.1f}ms  total={elapsed:6.2f}s  '
+          f'peak={peak / 1024 / 1024:7.1f}MB  output={sink.size / 1024 / 1024:6.1f}MB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        from infrastructure.database import Database, db
+        from infrastructure.reader import SnapshotReader
+        from application.query_data import QueryDataUseCase
+        import interface.output as output
+
+        connection = db.raw_connection()
+        populate(connection, args.artists, 1)
+        connection.close()
+        Database().rebuild_latest_top_tracks()
+        db.dispose()
+
+        reader = SnapshotReader()
+
+        def usecase():
+            return QueryDataUseCase(reader.query_artists_data, reader.query_latest_top_tracks, ask=False)
+
+        measure('print(dict) (previous)', lambda sink: print(usecase().execute(), file=sink))
+        measure('json.dumps(dict)', lambda sink: sink.write(json.dumps(usecase().execute())))
+        orjson = output.orjson
+        output.orjson = None
+        measure('stream json, stdlib', lambda sink: output.write_results(usecase().iter_results(), 'json', sink))
+        measure('stream ndjson, stdlib', lambda sink: output.write_results(usecase().iter_results(), 'ndjson', sink))
+        output.orjson = orjson
+        if orjson is not None:
+            measure('stream json, orjson', lambda sink: output.write_results(usecase().iter_results(), 'json', sink))
+            measure('stream ndjson, orjson', lambda sink: output.write_results(usecase().iter_results(), 'ndjson', sink))
+        reader.close()
@@ -0,0 +1,87 @@
+"""
+Compares the top_tracks history kept in one table with the same history split into monthly
+partitions: check_data_date for the current day, removing the oldest month (DELETE against
+drop_partition) and the VACUUM that follows.
+
+Both databases are filled with the same synthetic history; the partitioned one is then upgraded
+by migrate, as a database written by an older version would be.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_partitions --artists 2000 --days 180
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.synthetic import populate
+
+
+def timed(label, function, repeat=1):
+    start = time.perf_counter()
+    for i in range(repeat):
+        function()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f'  {label:<34} {elapsed * 1000:9.2f}ms')
+
+
+def create(path, artist_count, days, partitioned):
+    from infrastructure.database import Database, create_database_engine, migrate
+
+    engine = create_database_engine(path)
+    migrate(engine)
+    connection = engine.raw_connection()
+    populate(connection, artist_count, days)
+    if partitioned:
+        connection.execute('PRAGMA user_version = 1')
+        connection.commit()
+    connection.close()
+    migrate(engine)
+    return engine, Database(engine=engine)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=180)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        roster_path = os.path.join(folder, 'artists.json')
+        with open(roster_path, 'w', encoding='utf-8') as f:
+            json.dump([f'Artist {a}' for a in range(0, args.artists, max(1, args.artists // 100))], f)
+
+        oldest = date.today() - timedelta(days=args.days - 1)
+        next_month = (oldest.replace(day=1) + timedelta(days=32)).replace(day=1)
+        print(f'{args.artists * args.days * 10} history rows')
+
+        for partitioned in (False, True):
+            path = os.path.join(folder, f'{"partitioned" if partitioned else "single"}.db')
+            engine, database = create(path, args.artists, args.days, partitioned)
+            print('monthly partitions' if partitioned else 'single top_tracks table')
+            if partitioned:
+                print(f'  {len(database.partitions())} partitions')
+
+            timed('check_data_date (100 artists)', lambda: database.check_data_date(roster_path), 5)
+            if partitioned:
+                timed('drop oldest month', lambda: database.drop_partition(f'{oldest:%Y%m}'))
+            else:
+                def delete_oldest():
+                    with engine.begin() as connection:
+                        connection.exec_driver_sql('DELETE FROM top_tracks WHERE insertion_day < ?', (str(next_month),))
+                timed('delete oldest month', delete_oldest)
+
+            def vacuum():
+                with engine.connect() as connection:
+                    connection.exec_driver_sql('VACUUM')
+            timed('VACUUM', vacuum)
+            print(f'  {"file size":<34} {os.path.getsize(path) / 1024 / 1024:9.1f}MB')
+            engine.dispose()
@@ -0,0 +1,78 @@
+"""
+Compares the previous update flow (fetch every artist, then write everything at once) with the
+pipelined UpdateDataUseCase, which commits batches while fetching continues. Both run against the
+local fake Spotify server and write into a real database. Reports total time, the time until the
+first commit and how many artists would have been saved by a crash at 90% of the run.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_pipeline --artists 1000 --latency 0.02 --workers 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.fake_spotify import FakeSpotifyServer
+
+
+class Recorder:
+    """
+    Wraps insert_results, recording when each batch was committed.
+    """
+    def __init__(self, insert_results):
+        self.insert_results = insert_results
+        self.commits = []
+
+    def __call__(self, results, insertion_date):
+        self.insert_results(results, insertion_date)
+        self.commits.append((time.perf_counter(), len(results)))
+
+
+def report(label, start, elapsed, recorder, artist_count):
+    first_commit = recorder.commits[0][0] - start
+    crash_at = start + 0.9 * elapsed
+    saved = sum(count for committed, count in recorder.commits if committed <= crash_at)
+    print(f'{label:<22} total={elapsed:6.2f}s  first commit={first_commit:6.2f}s  '
+          f'saved by a crash at 90%={saved}/{artist_count}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--batch_size', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder, FakeSpotifyServer(latency=args.latency) as server:
+        os.chdir(folder)
+        from infrastructure.api import SpotifyAPI
+        from infrastructure.jobs import RefreshQueue
+        from infrastructure.database import Database, db
+        from application.update_data import UpdateDataUseCase
+
+        database = Database()
+        for label in ('fetch all, then write', 'pipelined'):
+            artists = [f'{label} {i}' for i in range(args.artists)]
+            api = SpotifyAPI('id', 'secret', url=server.api_url, token_url=server.token_url, pool_size=args.workers)
+            recorder = Recorder(database.insert_results)
+            usecase = UpdateDataUseCase(api, lambda _: artists, recorder, workers=args.workers,
+                                        batch_size=args.batch_size, jobs=RefreshQueue(database, label))
+
+            start = time.perf_counter()
+            with redirect_stdout(StringIO()):
+                if label == 'pipelined':
+                    usecase.execute('artists.json')
+                else:
+                    results = usecase.fetch_artists(artists)
+                    recorder(results, datetime.now())
+            report(label, start, time.perf_counter() - start, recorder, args.artists)
+        db.dispose()
@@ -0,0 +1,69 @@
+"""
+Times the hot top_tracks queries (query_top_tracks_data, check_data_date, query_artists_data)
+over a synthetic history, with the schema indexes and again after dropping them.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_queries --artists 2000 --days 100
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.synthetic import populate
+
+
+def timed(label, function, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        function(i)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f'  {label:<34} {elapsed * 1000:9.2f}ms per call')
+
+
+def run(database, artist_count, roster_path):
+    timed('query_top_tracks_data', lambda i: database.query_top_tracks_data(f'artist{i % artist_count:08d}'), 200)
+    timed('query_latest_top_tracks (10 ids)',
+          lambda i: database.query_latest_top_tracks([f'artist{(i * 10 + n) % artist_count:08d}' for n in range(10)]), 200)
+    timed('query_artists_data (10 names)', lambda i: database.query_artists_data([f'artist {i * 10 + n}' for n in range(10)]), 50)
+    timed('check_data_date (100 artists)', lambda i: database.check_data_date(roster_path), 1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        from infrastructure.database import Database, db, Base
+
+        roster_path = os.path.join(folder, 'artists.json')
+        with open(roster_path, 'w', encoding='utf-8') as f:
+            json.dump([f'Artist {a}' for a in range(0, args.artists, max(1, args.artists // 100))], f)
+
+        connection = db.raw_connection()
+        populate(connection, args.artists, args.days)
+        database = Database()
+        database.rebuild_latest_top_tracks()
+        print(f'{args.artists * args.days * 10} history rows')
+
+        print('with indexes')
+        run(database, args.artists, roster_path)
+
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(f'DROP INDEX IF EXISTS {index.name}')
+        connection.commit()
+        connection.close()
+
+        print('without indexes')
+        run(database, args.artists, roster_path)
+        db.dispose()
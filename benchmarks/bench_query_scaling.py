@@ -0,0 +1,66 @@
+"""
+Shows how the unfiltered artist query scales with the number of artists: the former N+1 pattern
+(max(insertion_date) and then the tracks, per artist, over the history) against QueryDataUseCase
+with the bulk query_latest_top_tracks.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_query_scaling --artists 100,1000,5000 --days 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.synthetic import populate
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=str, default='100,1000,5000')
+    parser.add_argument('--days', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        from sqlalchemy import func
+        from application.query_data import QueryDataUseCase
+        from infrastructure.database import Database, db, Artists, TopTracks, LatestTopTracks
+
+        database = Database()
+        for artist_count in [int(a) for a in args.artists.split(',')]:
+            with database.session_scope() as session:
+                for table in (LatestTopTracks, TopTracks, Artists):
+                    session.query(table).delete()
+            connection = db.raw_connection()
+            populate(connection, artist_count, args.days)
+            connection.close()
+            database.rebuild_latest_top_tracks()
+
+            def n_plus_one():
+                with database.session_scope() as session:
+                    for artist in database.query_artists_data([]):
+                        most_recent_date = session.query(func.max(TopTracks.insertion_date)).filter(
+                            TopTracks.artist_id == artist.artist_id
+                        ).scalar()
+                        session.query(TopTracks).filter(
+                            TopTracks.artist_id == artist.artist_id,
+                            TopTracks.insertion_date == most_recent_date
+                        ).order_by(TopTracks.popularity.desc()).all()
+
+            bulk = QueryDataUseCase(database.query_artists_data, database.query_latest_top_tracks, ask=False)
+
+            before = timed(n_plus_one)
+            after = timed(bulk.execute)
+            print(f'artists={artist_count:6d}  N+1 queries={before * 1000:9.1f}ms  bulk query={after * 1000:9.1f}ms')
+        db.dispose()
@@ -0,0 +1,46 @@
+"""
+Runs an update against a fake Spotify server that enforces a rate limit with 429 responses,
+and reports throughput, retries and dropped artists for a given client-side rate.
+
+Usage:
+    python -m benchmarks.bench_rate_limit --artists 200 --server_rate 50 --client_rate 45 --workers 8
+"""
+import argparse
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from application.update_data import UpdateDataUseCase
+from benchmarks.fake_spotify import FakeSpotifyServer
+from infrastructure.api import SpotifyAPI, RequestScheduler
+
+
+def run(artist_count, server_rate, client_rate, workers):
+    artists = [f'Artist {i}' for i in range(artist_count)]
+    with FakeSpotifyServer(latency=0.01, rate_limit=server_rate, retry_after=1) as server:
+        scheduler = RequestScheduler(rate=client_rate, max_retries=10)
+        api = SpotifyAPI('id', 'secret', url=server.api_url, token_url=server.token_url,
+                         pool_size=workers, scheduler=scheduler)
+        collected = []
+        usecase = UpdateDataUseCase(api, lambda _: artists, lambda results, _: collected.extend(results), workers=workers)
+
+        start = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            usecase.execute('artists.json')
+        elapsed = time.perf_counter() - start
+
+    dropped = sum(1 for result in collected if result is None)
+    print(f'client_rate={client_rate}  {elapsed:6.2f}s  {scheduler.sent / elapsed:6.1f} req/s  '
+          f'429s={server.rejected}  retries={scheduler.retries}  dropped={dropped}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=200)
+    parser.add_argument('--server_rate', type=float, default=50)
+    parser.add_argument('--client_rate', type=str, default='0,45')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    for rate in [float(r) for r in args.client_rate.split(',')]:
+        run(args.artists, args.server_rate, rate or None, args.workers)
@@ -0,0 +1,113 @@
+"""
+Load test of the query server (`interface.main --serve`) on a local database: several client
+threads send GET /query requests over keep-alive connections and the p50/p99 latency and
+requests per second are reported, with the result cache disabled and enabled. A few one-shot
+`interface.main --filter` runs are timed for comparison.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_server --artists 1000 --requests 5000 --clients 8
+"""
+import argparse
+import http.client
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from domain.models import Artist, Track
+
+
+def load(port, filters, clients):
+    latencies = []
+    lock = threading.Lock()
+    per_client = [filters[i::clients] for i in range(clients)]
+
+    def client(requests):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        timings = []
+        for filter in requests:
+            start = time.perf_counter()
+            connection.request('GET', f'/query?filter={quote(filter)}')
+            response = connection.getresponse()
+            response.read()
+            timings.append(time.perf_counter() - start)
+            if response.status != 200:
+                raise RuntimeError(f'Query failed with status {response.status}')
+        connection.close()
+        with lock:
+            latencies.extend(timings)
+
+    threads = [threading.Thread(target=client, args=(requests,)) for requests in per_client]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def percentile(latencies, q):
+    """
+    Returns the nearest-rank percentile of sorted latencies, in milliseconds.
+    """
+    return latencies[min(len(latencies) - 1, math.ceil(q * len(latencies)) - 1)] * 1000
+
+
+def report(label, latencies, elapsed):
+    latencies = sorted(latencies)
+    p50, p95, p99 = (percentile(latencies, q) for q in (0.5, 0.95, 0.99))
+    print(f'{label:<24} p50={p50:7.2f}ms  p95={p95:7.2f}ms  p99={p99:7.2f}ms  {len(latencies) / elapsed:8.0f} req/s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--cli_runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        from infrastructure.database import Database
+        from infrastructure.reader import SnapshotReader
+        from interface.server import QueryService, create_server
+
+        database = Database()
+        database.insert_results([{
+            'artist': Artist(name=f'Artist {a}', artist_id=f'id{a}'),
+            'top_tracks': [Track(f'Song {a}-{t}', f's{a}-{t}', t * 10, 'Album') for t in range(10)]
+        } for a in range(args.artists)])
+        database.engine.dispose()
+
+        random.seed(0)
+        filters = [','.join(f'Artist {random.randrange(args.artists)}' for _ in range(random.randint(1, 3)))
+                   for _ in range(args.requests)]
+
+        for label, cache_size in (('server, no cache', 0), ('server, LRU cache', 4 * args.artists)):
+            service = QueryService(SnapshotReader(check_same_thread=False), cache_size)
+            server = create_server(service, port=0)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            report(label, *load(server.server_address[1], filters, args.clients))
+            server.shutdown()
+            server.server_close()
+
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        timings = []
+        for filter in filters[:args.cli_runs]:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-m', 'interface.main', '--filter', filter],
+                           env=env, capture_output=True, check=True)
+            timings.append(time.perf_counter() - start)
+        report('one-shot CLI', timings, sum(timings))
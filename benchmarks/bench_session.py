@@ -0,0 +1,53 @@
+"""
+Compares request latency of the pooled SpotifyAPI session against one connection per request
+(module-level requests.get/post, as the client used before) on the local fake Spotify server.
+
+Usage:
+    python -m benchmarks.bench_session --requests 500
+"""
+import argparse
+import statistics
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+import requests
+
+from benchmarks.fake_spotify import FakeSpotifyServer
+from domain.models import Artist
+from infrastructure.api import SpotifyAPI
+
+
+def measure(api, count):
+    latencies = []
+    with redirect_stdout(StringIO()):
+        for i in range(count):
+            start = time.perf_counter()
+            artist = api.search_artist(f'Artist {i}')
+            api.search_top_tracks(Artist(name=artist.name, artist_id=artist.artist_id))
+            latencies.append((time.perf_counter() - start) / 2)
+    return latencies
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f'{label:<22} p50={p50:6.2f}ms  p99={p99:6.2f}ms  total={sum(latencies) * 2:6.2f}s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with FakeSpotifyServer(latency=args.latency) as server:
+        pooled = SpotifyAPI('id', 'secret', url=server.api_url, token_url=server.token_url)
+
+        unpooled = SpotifyAPI('id', 'secret', url=server.api_url, token_url=server.token_url)
+        unpooled.session = requests
+
+        report('connection per request', measure(unpooled, args.requests))
+        report('pooled session', measure(pooled, args.requests))
+        pooled.close()
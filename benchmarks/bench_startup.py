@@ -0,0 +1,82 @@
+"""
+Measures the wall time of a read-only `interface.main --filter` run in a fresh interpreter,
+and the import cost of the modules it loads, parsed from `python -X importtime`.
+The eager line imports what every run loaded before (SQLAlchemy models with the
+migration, requests and the Spotify client).
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10 --artists 200
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from domain.models import Artist, Track
+
+EAGER = 'import infrastructure.database, infrastructure.api, infrastructure.cache, application.update_data; infrastructure.database.get_engine()'
+
+
+def run(args, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable] + args, cwd=cwd, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr)
+    return elapsed, completed
+
+
+def wall_time(label, args, cwd, runs):
+    timings = sorted(run(args, cwd)[0] for _ in range(runs))
+    print(f'{label:<32} median={statistics.median(timings) * 1000:7.1f}ms  min={timings[0] * 1000:7.1f}ms')
+
+
+def top_imports(label, args, cwd, count=8):
+    _, completed = run(['-X', 'importtime'] + args, cwd)
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            imports.append((int(cumulative), name.strip()))
+    total = sum(cumulative for cumulative, _ in imports)
+    print(f'{label}: {total / 1000:.1f}ms in top-level imports')
+    for cumulative, name in sorted(imports, reverse=True)[:count]:
+        print(f'    {cumulative / 1000:7.1f}ms  {name}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--artists', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        from infrastructure.database import Database
+
+        results = [{
+            'artist': Artist(name=f'Artist {a}', artist_id=f'id{a}'),
+            'top_tracks': [Track(f'Song {a}-{t}', f's{a}-{t}', t * 10, 'Album') for t in range(10)]
+        } for a in range(args.artists)]
+        database = Database()
+        database.insert_results(results)
+        database.engine.dispose()
+
+        query = ['-m', 'interface.main', '--filter', 'Artist 1']
+        wall_time('python -c pass', ['-c', 'pass'], folder, args.runs)
+        wall_time('eager imports + migration check', ['-c', EAGER], folder, args.runs)
+        wall_time('interface.main --filter', query, folder, args.runs)
+        print()
+        top_imports('eager imports', ['-c', EAGER], folder)
+        top_imports('interface.main --filter', query, folder)
@@ -0,0 +1,43 @@
+"""
+Benchmarks UpdateDataUseCase fetching with different worker counts against the local fake Spotify server.
+
+Usage:
+    python -m benchmarks.bench_update --artists 200 --latency 0.05 --workers 1,4,16
+"""
+import argparse
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from application.update_data import UpdateDataUseCase
+from benchmarks.fake_spotify import FakeSpotifyServer
+from infrastructure.api import SpotifyAPI
+
+
+def run(artist_count, latency, workers):
+    artists = [f'Artist {i}' for i in range(artist_count)]
+    with FakeSpotifyServer(latency=latency) as server:
+        api = SpotifyAPI('id', 'secret', url=server.api_url, token_url=server.token_url)
+        collected = []
+        usecase = UpdateDataUseCase(api, lambda _: artists, lambda results, _: collected.extend(results), workers=workers)
+
+        start = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            usecase.execute('artists.json')
+        elapsed = time.perf_counter() - start
+
+    names = [result['artist'].name for result in collected]
+    assert names == artists, 'results are not in roster order'
+    return elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--artists', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--workers', type=str, default='1,4,16')
+    args = parser.parse_args()
+
+    for workers in [int(w) for w in args.workers.split(',')]:
+        elapsed = run(args.artists, args.latency, workers)
+        print(f'workers={workers:3d}  {elapsed:8.2f}s  {args.artists / elapsed:8.1f} artists/s')
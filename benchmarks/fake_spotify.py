@@ -0,0 +1,188 @@
+"""
+Local stand-in for the Spotify token, search and top-tracks endpoints, used by the benchmarks.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def fake_artist_id(name):
+    """
+    Returns a deterministic 22 character artist ID for the given name.
+    """
+    return hashlib.sha1(name.lower().encode('utf-8')).hexdigest()[:22]
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        if self.command == 'GET' and status == 200:
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            headers = dict(headers or {}, ETag=etag)
+            if self.headers.get('If-None-Match') == etag:
+                self.server.not_modified += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self.server.wait()
+        if urlparse(self.path).path == '/api/token':
+            self._send_json({'access_token': 'fake-token', 'token_type': 'Bearer', 'expires_in': 3600})
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        parts = parsed.path.strip('/').split('/')
+        self.server.wait()
+
+        rejection = self.server.reject()
+        if rejection:
+            status, headers = rejection
+            self._send_json({'error': {'status': status}}, status, headers)
+        elif parts == ['v1', 'search']:
+            name = params.get('q', [''])[0]
+            if self.server.missing(name):
+                self._send_json({'artists': {'items': []}})
+            else:
+                self.server.artist_names[fake_artist_id(name)] = name
+                self._send_json({'artists': {'items': [{'id': fake_artist_id(name), 'name': name}]}})
+        elif parts == ['v1', 'artists']:
+            ids = params.get('ids', [''])[0].split(',')[:50]
+            artists = [{'id': artist_id, 'name': self.server.artist_names[artist_id]}
+                       if artist_id in self.server.artist_names else None for artist_id in ids]
+            self._send_json({'artists': artists})
+        elif len(parts) == 4 and parts[:2] == ['v1', 'artists'] and parts[3] == 'top-tracks':
+            artist_id = parts[2]
+            tracks = [{
+                'id': f'{artist_id[:12]}{i:010d}',
+                'name': f'Track {i}',
+                'popularity': 100 - i * 3,
+                'album': {'name': f'Album {i % 3}'}
+            } for i in range(self.server.tracks_per_artist)]
+            self._send_json({'tracks': tracks})
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering like the Spotify API, with an injected latency per request.
+
+    Args:
+        latency (float): Seconds each request waits before being answered.
+        tracks_per_artist (int): Number of tracks returned by the top-tracks endpoint.
+        script (list): Status codes answered, in order, to the first API GET requests (e.g. [429, 429, 503]).
+        rate_limit (float): API GET requests per second allowed before answering 429. None disables the limit.
+        retry_after (int): Value of the Retry-After header sent with 429 responses.
+        error_rate (float): Fraction of API GET requests answered 503 at random.
+        throttle_rate (float): Fraction of API GET requests answered 429 at random.
+        missing_rate (float): Fraction of artist names the search does not find. The same names are
+            missing on every request, as they would be on Spotify.
+        seed (int): Seed of the random errors, so runs with the same arguments fail the same requests.
+    """
+    daemon_threads = True
+
+    def __init__(self, latency=0.05, tracks_per_artist=10, script=None, rate_limit=None, retry_after=1,
+                 error_rate=0.0, throttle_rate=0.0, missing_rate=0.0, seed=0, host='127.0.0.1', port=0):
+        super().__init__((host, port), FakeSpotifyHandler)
+        self.latency = latency
+        self.tracks_per_artist = tracks_per_artist
+        self.script = deque(script or [])
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.missing_rate = missing_rate
+        self._random = random.Random(seed)
+        self.requests_served = 0
+        self.artist_names = {}
+        self.not_modified = 0
+        self.rejected = 0
+        self._window = deque()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def reject(self):
+        """
+        Returns (status, headers) when the current request must fail, following the script first,
+        then the random error rates and then the rate limit over a sliding one second window, or
+        None to answer normally.
+        """
+        with self._lock:
+            self.requests_served += 1
+            status = self.script.popleft() if self.script else None
+            if status is None and (self.throttle_rate or self.error_rate):
+                draw = self._random.random()
+                if draw < self.throttle_rate:
+                    status = 429
+                elif draw < self.throttle_rate + self.error_rate:
+                    status = 503
+            if status is None and self.rate_limit:
+                now = time.monotonic()
+                while self._window and now - self._window[0] > 1.0:
+                    self._window.popleft()
+                if len(self._window) >= self.rate_limit:
+                    status = 429
+                else:
+                    self._window.append(now)
+            if status is None:
+                return None
+            self.rejected += 1
+            return status, ({'Retry-After': str(self.retry_after)} if status == 429 else {})
+
+    def missing(self, name):
+        """
+        Returns whether the search must not find the artist name.
+        """
+        return self.missing_rate > 0 and int(fake_artist_id(name), 16) % 10000 < self.missing_rate * 10000
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def api_url(self):
+        return f'{self.base_url}/v1'
+
+    @property
+    def token_url(self):
+        return f'{self.base_url}/api/token'
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
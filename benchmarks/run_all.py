@@ -0,0 +1,316 @@
+"""
+Repeatable benchmark suite: update throughput against the local fake Spotify server (with
+latency, random 503 and 429 answers and artists not found), ingest rows per second, query
+latency and memory use, on synthetic data from benchmarks/synthetic.py with a fixed seed.
+
+Results are saved as JSON, one metric per entry with its unit and whether higher or lower is
+better. Given a previous result with --compare, the suite prints the change of every metric and
+exits with status 1 when one got worse by more than --tolerance, so regressions are caught
+between versions.
+
+Runs inside a temporary working directory so the real data/spotify_data.db is never touched.
+
+Usage:
+    python -m benchmarks.run_all --output benchmarks/results/baseline.json
+    python -m benchmarks.run_all --compare benchmarks/results/baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.bench_output import Sink
+from benchmarks.fake_spotify import FakeSpotifyServer
+from benchmarks.synthetic import artist_names, partition_history, populate, search_results, write_roster
+
+SCENARIOS = ['update', 'ingest', 'queries', 'memory']
+
+
+class Results:
+    """
+    Metrics collected by the suite, keyed by name.
+    """
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better):
+        self.metrics[name] = {'value': value, 'unit': unit, 'better': better}
+        print(f'  {name:<44} {value:12.3f} {unit}')
+
+
+def latency(function, calls):
+    """
+    Calls function(i) calls times and returns the median and 95th percentile latency in milliseconds.
+    """
+    timings = []
+    for i in range(calls):
+        start = time.perf_counter()
+        function(i)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000
+
+
+def bench_update(args, results, folder):
+    from infrastructure.api import RequestScheduler, SpotifyAPI
+    from infrastructure.database import Database, create_database_engine
+    from application.update_data import UpdateDataUseCase
+
+    artists = artist_names(args.artists)
+    best = None
+    for round in range(args.repeat):
+        # A new server per round, so every round fails the same requests.
+        with FakeSpotifyServer(latency=args.latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                               missing_rate=args.missing_rate, retry_after=0, seed=args.seed) as server:
+            engine = create_database_engine(os.path.join(folder, f'update{round}.db'))
+            database = Database(engine=engine)
+            scheduler = RequestScheduler(backoff=0.01, max_backoff=0.1)
+            api = SpotifyAPI('id', 'secret', url=server.api_url, token_url=server.token_url,
+                             pool_size=args.workers, scheduler=scheduler)
+            usecase = UpdateDataUseCase(api, lambda _: artists, database.insert_results, workers=args.workers)
+
+            start = time.perf_counter()
+            with redirect_stdout(StringIO()):
+                usecase.execute('artists.json')
+            elapsed = time.perf_counter() - start
+
+            with engine.connect() as connection:
+                stored = connection.exec_driver_sql('SELECT COUNT(*) FROM artists').scalar()
+            api.close()
+            engine.dispose()
+        if best is None or elapsed < best[0]:
+            best = elapsed, scheduler.sent, scheduler.retries, stored
+
+    elapsed, sent, retries, stored = best
+    results.add('update.artists_per_second', args.artists / elapsed, 'artists/s', 'higher')
+    results.add('update.requests_per_artist', sent / args.artists, 'requests', 'lower')
+    results.add('update.retries', retries, 'requests', 'lower')
+    results.add('update.artists_stored', stored, 'artists', 'higher')
+
+
+def bench_ingest(args, results, folder):
+    from infrastructure.database import Database, create_database_engine
+
+    rows = args.ingest_artists * 10
+    data = search_results(args.ingest_artists, seed=args.seed)
+    insertion_date = datetime(2024, 7, 22, 9)
+    upsert, csv_import = None, None
+    for round in range(args.repeat):
+        engine = create_database_engine(os.path.join(folder, f'ingest{round}.db'))
+        database = Database(engine=engine)
+        start = time.perf_counter()
+        database.insert_results(data, insertion_date)
+        elapsed = time.perf_counter() - start
+        upsert = min(upsert or elapsed, elapsed)
+
+        # create_csv writes to data/ in the working directory, so each round gets its own.
+        round_folder = os.path.join(folder, f'csv{round}')
+        os.makedirs(round_folder)
+        os.chdir(round_folder)
+        os.makedirs('data')
+        database.create_csv(data, insertion_date)
+        engine.dispose()
+        engine = create_database_engine(os.path.join(folder, f'import{round}.db'))
+        database = Database(engine=engine)
+        start = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            database.insert_csv_data_to_database('data')
+        elapsed = time.perf_counter() - start
+        csv_import = min(csv_import or elapsed, elapsed)
+        os.chdir(folder)
+        engine.dispose()
+
+    results.add('ingest.insert_results_rows_per_second', rows / upsert, 'rows/s', 'higher')
+    results.add('ingest.import_csv_rows_per_second', rows / csv_import, 'rows/s', 'higher')
+
+
+def history_database(args, folder):
+    """
+    Returns the path of a database holding args.days days of synthetic history, creating it on first use.
+    """
+    from infrastructure.database import Database, create_database_engine, migrate
+
+    path = os.path.join(folder, 'history.db')
+    if not os.path.exists(path):
+        engine = create_database_engine(path)
+        migrate(engine)
+        connection = engine.raw_connection()
+        populate(connection, args.query_artists, args.days, seed=args.seed)
+        connection.close()
+        partition_history(engine)
+        Database(engine=engine).rebuild_latest_top_tracks()
+        engine.dispose()
+    return path
+
+
+def bench_queries(args, results, folder):
+    from infrastructure.database import Database, create_database_engine
+    from infrastructure.reader import SnapshotReader
+    from application.query_data import QueryDataUseCase
+    from interface.output import write_results
+
+    path = history_database(args, folder)
+    roster = os.path.join(folder, 'roster.json')
+    write_roster(roster, artist_names(args.query_artists)[::max(1, args.query_artists // 100)])
+    engine = create_database_engine(path)
+    database = Database(engine=engine)
+    reader = SnapshotReader(path)
+    count = args.query_artists
+
+    def ids(i):
+        return [f'artist{(i * 10 + n) % count:08d}' for n in range(10)]
+
+    measures = [
+        ('latest_top_tracks_10_ids', lambda i: database.query_latest_top_tracks(ids(i)), 200),
+        ('artists_data_10_names', lambda i: database.query_artists_data([f'artist {(i * 10 + n) % count}' for n in range(10)]), 100),
+        ('reader_latest_top_tracks_10_ids', lambda i: reader.query_latest_top_tracks(ids(i)), 200),
+        ('check_data_date_100_artists', lambda i: database.check_data_date(roster), 10),
+    ]
+    for name, function, calls in measures:
+        # Best of the rounds, after a warm-up call, so the page cache and noisy neighbours weigh less.
+        function(0)
+        rounds = [latency(function, calls) for _ in range(args.repeat)]
+        p50, p95 = min(p50 for p50, _ in rounds), min(p95 for _, p95 in rounds)
+        results.add(f'queries.{name}_p50', p50, 'ms', 'lower')
+        results.add(f'queries.{name}_p95', p95, 'ms', 'lower')
+
+    def full_result(i):
+        usecase = QueryDataUseCase(reader.query_artists_data, reader.query_latest_top_tracks, ask=False)
+        write_results(usecase.iter_results(), 'ndjson', Sink())
+    best = min(latency(full_result, 1)[0] for _ in range(args.repeat))
+    results.add('queries.all_artists_ndjson', best, 'ms', 'lower')
+    reader.close()
+    engine.dispose()
+
+
+def bench_memory(args, results, folder):
+    from infrastructure.reader import SnapshotReader
+    from application.query_data import QueryDataUseCase
+    from interface.output import write_results
+
+    reader = SnapshotReader(history_database(args, folder))
+
+    def peak(function):
+        tracemalloc.start()
+        function()
+        value = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return value / 1024 / 1024
+
+    def usecase():
+        return QueryDataUseCase(reader.query_artists_data, reader.query_latest_top_tracks, ask=False)
+
+    results.add('memory.all_artists_dict_peak', peak(lambda: usecase().execute()), 'MB', 'lower')
+    results.add('memory.all_artists_ndjson_peak', peak(lambda: write_results(usecase().iter_results(), 'ndjson', Sink())),
+                'MB', 'lower')
+    reader.close()
+    try:
+        import resource
+    except ImportError:
+        return
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    results.add('memory.max_rss', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 'MB', 'lower')
+
+
+def commit():
+    """
+    Returns the git commit of the working tree, or None outside a git repository.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(metrics, baseline, tolerance):
+    """
+    Prints the change of every metric against a previous result.
+
+    Returns:
+        list: Names of the metrics that got worse by more than tolerance.
+    """
+    regressions = []
+    print(f'\nCompared with {baseline.get("commit")} ({baseline.get("created")}):')
+    for name, metric in metrics.items():
+        previous = baseline['metrics'].get(name)
+        if previous is None or not previous['value']:
+            continue
+        change = metric['value'] / previous['value'] - 1
+        worse = change < -tolerance if metric['better'] == 'higher' else change > tolerance
+        if worse:
+            regressions.append(name)
+        print(f'  {name:<44} {previous["value"]:12.3f} -> {metric["value"]:12.3f} {change:+8.1%}'
+              f'{"  REGRESSION" if worse else ""}')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenarios', type=str, default=','.join(SCENARIOS))
+    parser.add_argument('--output', type=str, required=False,
+                        help='JSON file to write. Defaults to benchmarks/results/<commit>_<time>.json')
+    parser.add_argument('--compare', type=str, required=False, help='Previous result to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Relative change reported as a regression')
+    parser.add_argument('--repeat', type=int, default=3, help='Rounds per measure; the best one is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--artists', type=int, default=500, help='Artists fetched by the update')
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--error_rate', type=float, default=0.02, help='Fraction of requests answered 503')
+    parser.add_argument('--throttle_rate', type=float, default=0.02, help='Fraction of requests answered 429')
+    parser.add_argument('--missing_rate', type=float, default=0.01, help='Fraction of artists not found')
+    parser.add_argument('--ingest_artists', type=int, default=5000, help='Artists (10 tracks each) ingested')
+    parser.add_argument('--query_artists', type=int, default=2000, help='Artists in the queried history')
+    parser.add_argument('--days', type=int, default=90, help='Days of queried history')
+    args = parser.parse_args()
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',')]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    created = datetime.now()
+    revision = commit()
+    output = os.path.abspath(args.output or os.path.join(
+        'benchmarks', 'results', f'{revision or "local"}_{created:%Y%m%d_%H%M%S}.json'))
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = Results()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        for scenario in scenarios:
+            print(scenario)
+            globals()[f'bench_{scenario}'](args, results, folder)
+
+    report = {
+        'commit': revision,
+        'created': created.isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': vars(args),
+        'metrics': results.metrics
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nResults written to {output}')
+
+    if baseline is not None:
+        regressions = compare(results.metrics, baseline, args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} metrics regressed by more than {args.tolerance:.0%}: {", ".join(regressions)}')
+            sys.exit(1)
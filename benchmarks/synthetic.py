@@ -0,0 +1,78 @@
+"""
+Synthetic data shared by the benchmarks: artist rosters, search results as SpotifyAPI returns
+them and days or months of top_tracks history written straight into a database. Everything is
+derived from a seed, so two runs with the same arguments work on the same data.
+"""
+import json
+import random
+from datetime import date, timedelta
+
+from domain.models import Artist, Track
+
+
+def artist_names(count, prefix='Artist'):
+    """
+    Returns count artist names: 'Artist 0', 'Artist 1', ...
+    """
+    return [f'{prefix} {a}' for a in range(count)]
+
+
+def write_roster(path, names):
+    """
+    Writes a roster of artist names in the artists.json format.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(names, f)
+
+
+def search_results(artist_count, tracks_per_artist=10, seed=0):
+    """
+    Returns the results of a search of artist_count artists, as built by SpotifyAPI.search_top_tracks.
+    """
+    rng = random.Random(seed)
+    results = []
+    for a in range(artist_count):
+        artist = Artist(name=f'Artist {a}', artist_id=f'artist{a:08d}')
+        tracks = [Track(track_name=f'Track {a}-{t}', track_id=f'track{a:08d}{t:02d}',
+                        popularity=rng.randint(0, 100), album=f'Album {a % 500}')
+                  for t in range(tracks_per_artist)]
+        results.append({'artist': artist, 'top_tracks': tracks})
+    return results
+
+
+def populate(connection, artist_count, days, tracks_per_artist=10, seed=0):
+    """
+    Writes artist_count artists and one snapshot of their top tracks per day, for the last days days
+    up to today, into the legacy top_tracks table through a raw DB-API connection. History reads
+    include that table while it holds rows; partition_history moves them to the monthly partitions.
+    Popularity follows a random walk per track, so the history has realistic trends.
+    """
+    rng = random.Random(seed)
+    connection.executemany('INSERT INTO artists (artist_id, artist_name) VALUES (?, ?)',
+                           [(f'artist{a:08d}', f'Artist {a}') for a in range(artist_count)])
+    popularity = [rng.randint(0, 100) for _ in range(artist_count * tracks_per_artist)]
+    start = date.today() - timedelta(days=days - 1)
+    for d in range(days):
+        day = start + timedelta(days=d)
+        insertion_date = f'{day} 09:00:00.000000'
+        popularity = [min(100, max(0, p + rng.randint(-3, 3))) for p in popularity]
+        connection.executemany(
+            'INSERT INTO top_tracks (song_name, song_id, popularity, album, artist_id, insertion_date, insertion_day) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(f'Track {a}-{t}', f'track{a:08d}{t:02d}', popularity[a * tracks_per_artist + t], f'Album {a % 500}',
+              f'artist{a:08d}', insertion_date, str(day))
+             for a in range(artist_count) for t in range(tracks_per_artist)]
+        )
+    connection.commit()
+
+
+def partition_history(engine):
+    """
+    Moves the rows written by populate to the monthly partitions, as the migration of a database
+    created before partitioning does.
+    """
+    from infrastructure.database import migrate
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql('PRAGMA user_version = 1')
+    migrate(engine)
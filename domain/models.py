@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 import time
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Artist:
    """
    Class to store artist information resulting from Spotify API search.
@@ -10,7 +10,7 @@ class Artist:
    name: str
    artist_id: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Track:
     """
     Class to store track information from the artist resulting from Spotify API search.
@@ -20,6 +20,18 @@ class Track:
     popularity: int
     album: str
 
+@dataclass(frozen=True, slots=True)
+class TrackSnapshot:
+    """
+    Class to store a stored top track of an artist as of its insertion date, as read from the database.
+    """
+    artist_id: str
+    song_id: str
+    song_name: str
+    popularity: int
+    album: str
+    insertion_date: str
+
 @dataclass
 class Token:
     """
@@ -35,3 +47,16 @@ class Token:
         Returns True if the token is still valid, False otherwise.
         """
         return (time.time() - self._creation_time) < self._expires_in
+
+    @property
+    def expires_at(self) -> float:
+        """
+        Returns the time, in seconds since the epoch, at which the token expires.
+        """
+        return self._creation_time + self._expires_in
+
+    def expires_within(self, seconds) -> bool:
+        """
+        Returns True if the token expires in less than the given number of seconds, or already has.
+        """
+        return time.time() + seconds >= self.expires_at
@@ -1,34 +1,217 @@
 import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import requests
+from requests.adapters import HTTPAdapter
 from domain.models import Token, Artist, Track
+from infrastructure.token import TokenManager
 from dotenv import load_dotenv
 load_dotenv()
 
 
+class RequestScheduler:
+    """
+    Central scheduler for every request sent to the Spotify API.
+
+    Paces requests with a token bucket, waits for the Retry-After interval when
+    the API answers 429, retries 5xx responses with jittered exponential backoff
+    and stops sending once the per-run request budget is spent.
+
+    Args:
+        rate (float): Requests per second allowed by the bucket. None disables pacing.
+        burst (int): Bucket capacity, i.e. how many requests may be sent back to back. Defaults to 1.
+        max_retries (int): Retries for 429 and 5xx responses before the response is returned as is.
+        backoff (float): Base delay in seconds for retries without a Retry-After header.
+        max_backoff (float): Upper bound in seconds for a single backoff delay.
+        budget (int): Maximum number of requests sent in this run. None means unlimited.
+        max_retry_after (float): Longest Retry-After interval waited for, in seconds. A 429 asking for
+            a longer wait is returned as is instead of being retried before the API accepts requests.
+    """
+    def __init__(self, rate=None, burst=None, max_retries=5, backoff=1.0, max_backoff=60.0, budget=None,
+                 max_retry_after=3600.0):
+        self._lock = threading.Lock()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+        self.sent = 0
+        self.retries = 0
+        self.throttled = 0
+        self._paused_until = 0.0
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        """
+        Changes the allowed request rate. The bucket starts full at the new capacity.
+
+        Args:
+            rate (float): Requests per second. None disables pacing.
+            burst (int): Bucket capacity. Defaults to 1.
+        """
+        with self._lock:
+            self.rate = rate
+            self.capacity = float(burst or 1)
+            self._tokens = self.capacity
+            self._updated = time.monotonic()
+
+    def _acquire(self):
+        """
+        Blocks until a request may be sent, reserving one token from the bucket.
+        """
+        with self._lock:
+            if self.budget is not None and self.sent >= self.budget:
+                raise RuntimeError(f'Request budget of {self.budget} requests exhausted.')
+            self.sent += 1
+
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self.rate:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.rate)
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def _pause(self, delay):
+        """
+        Holds back every request, from all threads, for the given number of seconds.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def _retry_after(self, response):
+        """
+        Returns the delay in seconds requested by the Retry-After header, or None if absent or invalid.
+        """
+        value = response.headers.get('Retry-After')
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def _backoff_delay(self, attempt):
+        """
+        Returns a full-jitter exponential backoff delay for the given attempt.
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, send, *args, **kwargs):
+        """
+        Sends a request through the scheduler.
+
+        Args:
+            send (callable): Function performing the HTTP call, e.g. session.get.
+            *args, **kwargs: Arguments forwarded to send.
+
+        Returns:
+            requests.Response: Last response received.
+        """
+        attempt = 0
+        while True:
+            self._acquire()
+            response = send(*args, **kwargs)
+            status = response.status_code
+
+            if attempt >= self.max_retries or not (status == 429 or 500 <= status < 600):
+                return response
+
+            if status == 429:
+                self.throttled += 1
+                retry_after = self._retry_after(response)
+                if retry_after is not None and retry_after > self.max_retry_after:
+                    print(f'Rate limited by Spotify API for {retry_after:.0f}s, longer than {self.max_retry_after:.0f}s')
+                    return response
+                delay = retry_after if retry_after is not None else self._backoff_delay(attempt)
+                print(f'Rate limited by Spotify API, retrying in {delay:.1f}s')
+                self._pause(delay)
+            else:
+                time.sleep(self._backoff_delay(attempt))
+
+            self.retries += 1
+            attempt += 1
+
+
 class SpotifyAPI:
     """
     Class for Spotify API interaction.
+
+    Args:
+        spotify_client_id (str): Client ID. Defaults to the spotify_client_id environment variable.
+        spotify_client_secret (str): Client secret. Defaults to the spotify_client_secret environment variable.
+        url (str): Base URL of the Web API.
+        token_url (str): URL of the token endpoint.
+        pool_size (int): Maximum number of pooled connections.
+        scheduler (RequestScheduler): Scheduler every request goes through. Defaults to an unlimited one.
+        cache (ResponseCache): HTTP response cache, if any.
+        token_cache (str): JSON file where the access token is cached between runs. None disables it.
+        token_skew (float): Seconds before expiry at which the access token is refreshed in the background.
     """
-    def __init__(self, spotify_client_id=None, spotify_client_secret=None):
-        self.url = 'https://api.spotify.com/v1'
+    def __init__(self, spotify_client_id=None, spotify_client_secret=None,
+                 url='https://api.spotify.com/v1', token_url='https://accounts.spotify.com/api/token',
+                 pool_size=10, scheduler=None, cache=None, token_cache=None, token_skew=60):
+        self.url = url
+        self.token_url = token_url
+        self.session = self._create_session(pool_size)
+        self.scheduler = scheduler or RequestScheduler()
+        self.cache = cache
+        self.artist_cache = {}
+        # Lowercased names the search found no artist for, and the last error of failed lookups by name,
+        # so callers can tell an artist missing on Spotify from a request that may succeed later.
+        self.not_found = set()
+        self.errors = {}
         self.spotify_client_id = spotify_client_id or os.environ.get('spotify_client_id')
         self.spotify_client_secret = spotify_client_secret or os.environ.get('spotify_client_secret')
-        self._token_spotify = None
-        self._token_spotify = self._request_token()
+        # Looked up on each refresh, so an instrumented _request_token is timed too.
+        self.tokens = TokenManager(lambda: self._request_token(), self.spotify_client_id, token_cache, token_skew)
+
+    @staticmethod
+    def _create_session(pool_size):
+        """
+        Creates the HTTP session shared by every request, keeping connections alive between calls.
+
+        Args:
+            pool_size (int): Maximum number of pooled connections per host.
+
+        Returns:
+            requests.Session: Session with pooled adapters mounted for http and https.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, pool_size))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def close(self):
+        """
+        Closes the pooled connections.
+        """
+        self.session.close()
 
     @property
     def token(self):
         """
         Returns a valid access token for the Spotify API.
 
-        If the current token is expired or doesn't exist, automatically requests a new one.
+        The token is requested on first use, not when SpotifyAPI is created, so runs that never
+        call the API never pay for the round trip. It is then kept valid by the TokenManager.
 
         Returns:
             str: Valid access token.
         """
-        if not self._token_spotify or not self._token_spotify.valid:
-            self._token_spotify = self._request_token()
-        return self._token_spotify.token
+        return self.tokens.get()
 
     def _request_token(self):
         """
@@ -38,8 +221,6 @@ class SpotifyAPI:
             Token: Valid access token for authentication in Spotify API requests.
         """
         try:
-            token_url = 'https://accounts.spotify.com/api/token'
-
             headers = {'Content-Type': 'application/x-www-form-urlencoded'}
 
             body = {
@@ -48,7 +229,7 @@ class SpotifyAPI:
                 'client_secret': f'{self.spotify_client_secret}'
             }
             
-            request = requests.post(token_url, headers=headers, data=body)
+            request = self.scheduler.request(self.session.post, self.token_url, headers=headers, data=body)
             request.raise_for_status()
 
             token = request.json()['access_token']
@@ -58,35 +239,113 @@ class SpotifyAPI:
             print(f'Error requesting token: {e}')
             return None
 
+    def _get_json(self, url, params=None):
+        """
+        Sends an authorized GET request and returns the decoded JSON body.
+
+        When a response cache is configured, fresh entries are returned without a request and
+        stale ones are revalidated with a conditional request. A request rejected with 401 is sent
+        once more with a new token.
+
+        Args:
+            url (str): Endpoint URL.
+            params (dict): Query parameters.
+
+        Returns:
+            dict: Decoded response body.
+        """
+        entry = self.cache.lookup(url, params) if self.cache else None
+        if entry and entry['fresh']:
+            return self.cache.hit(entry)
+
+        # The token is only needed once a request is sent, so a run answered from the cache needs none.
+        token = self.token
+        headers = {
+            'Authorization': f'Bearer {token}'
+        }
+        if entry:
+            headers.update(self.cache.conditional_headers(entry))
+        kwargs = {'params': params} if params is not None else {}
+
+        request = self.scheduler.request(self.session.get, url, headers=headers, **kwargs)
+        if request.status_code == 401:
+            self.tokens.invalidate(token)
+            headers = {**headers, 'Authorization': f'Bearer {self.token}'}
+            request = self.scheduler.request(self.session.get, url, headers=headers, **kwargs)
+        if entry and request.status_code == 304:
+            return self.cache.revalidated(url, params, entry)
+
+        request.raise_for_status()
+        if self.cache:
+            return self.cache.store(url, params, request)
+        return request.json()
+
     def search_artist(self, artist):
         """
         Searches for an artist ID by name using the Spotify API.
+        Names already resolved in this run are answered from the name -> Artist cache.
 
         Args: 
             artist (str): Artist name.
 
         Returns:
-            Artist: Found Artist object.
+            Artist: Found Artist object, or None if the search found no match (the name is added to
+            not_found) or failed (the error is kept in errors).
         """
+        cached = self.artist_cache.get(artist.lower())
+        if cached:
+            return cached
+
         try:
             url = self.url + f'/search'
-            
-            headers = {
-                'Authorization': f'Bearer {self.token}'
-            }
-
-            request = requests.get(url, headers=headers, params={'q': artist, 'type': 'artist', 'limit': 1})
 
-            request.raise_for_status()
-            result = request.json()
+            result = self._get_json(url, params={'q': artist, 'type': 'artist', 'limit': 1})
 
-            artist_data = result['artists']['items'][0]
+            items = result['artists']['items']
         except Exception as e:
             print(f'Error searching for artist {artist}: {e}')
+            self.errors[artist.lower()] = str(e)
+            return
+
+        if not items:
+            print(f'Artist {artist} not found')
+            self.not_found.add(artist.lower())
             return
 
-        return Artist(name=artist_data['name'], artist_id=artist_data['id'])
-    
+        artist_data = items[0]
+
+        found = Artist(name=artist_data['name'], artist_id=artist_data['id'])
+        self.artist_cache[artist.lower()] = found
+        return found
+
+    def search_artists_by_ids(self, artist_ids, batch_size=50):
+        """
+        Fetches artists by ID using the Spotify multiple artists endpoint, up to 50 IDs per request.
+
+        Args:
+            artist_ids (list): Artist IDs.
+            batch_size (int): IDs sent per request. Spotify accepts at most 50.
+
+        Returns:
+            list: Found Artist objects. IDs unknown to Spotify or in a failed batch are left out.
+        """
+        artists = []
+        for start in range(0, len(artist_ids), batch_size):
+            batch = artist_ids[start:start + batch_size]
+            try:
+                url = self.url + '/artists'
+
+                response = self._get_json(url, params={'ids': ','.join(batch)})
+            except Exception as e:
+                print(f'Error searching for artists {batch}: {e}')
+                continue
+
+            for artist_data in response['artists']:
+                if artist_data:
+                    artists.append(Artist(name=artist_data['name'], artist_id=artist_data['id']))
+
+        return artists
+
     def search_top_tracks(self, artist: Artist):
         """
         Searches for an artist's most popular tracks using the Spotify API.
@@ -100,13 +359,7 @@ class SpotifyAPI:
         try:
             url = self.url + f'/artists/{artist.artist_id}/top-tracks'
 
-            headers = {
-                'Authorization': f'Bearer {self.token}'
-            }
-
-            request = requests.get(url, headers=headers)
-            request.raise_for_status()
-            response = request.json()
+            response = self._get_json(url)
 
             tracks = []
             for track in response['tracks']:
@@ -118,6 +371,8 @@ class SpotifyAPI:
                 ))
         except Exception as e:
             print(f'Error searching tracks for artist {artist}: {e}')
+            if artist is not None:
+                self.errors[artist.name.lower()] = str(e)
             return
 
         return {'artist': artist, 'top_tracks': tracks}
@@ -0,0 +1,143 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+
+class ResponseCache:
+    """
+    On-disk cache of Spotify API responses, stored in SQLite and keyed by URL and query parameters.
+
+    Entries younger than the TTL are served without a request. Older entries are revalidated with
+    If-None-Match/If-Modified-Since, so unchanged responses come back as a 304 with no body.
+    The least recently used entries are evicted once the cache holds more than max_entries.
+
+    Args:
+        path (str): SQLite file holding the cache.
+        ttl (float): Seconds an entry is served without revalidation.
+        max_entries (int): Maximum number of cached responses.
+    """
+    def __init__(self, path='data/http_cache.db', ttl=6 * 3600, max_entries=20000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, body TEXT NOT NULL, etag TEXT, last_modified TEXT, '
+            'stored_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)')
+        self._connection.commit()
+        self._entries = self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def key(url, params=None):
+        """
+        Returns the cache key for a URL and its query parameters.
+        """
+        if not params:
+            return url
+        return f'{url}?{urlencode(sorted(params.items()))}'
+
+    def lookup(self, url, params=None):
+        """
+        Returns the cached entry for the request, or None if not cached.
+
+        Returns:
+            dict: Keys body, etag, last_modified and fresh (True if younger than the TTL).
+        """
+        key = self.key(url, params)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+            self._connection.commit()
+
+        body, etag, last_modified, stored_at = row
+        return {'body': body, 'etag': etag, 'last_modified': last_modified, 'fresh': now - stored_at < self.ttl}
+
+    def conditional_headers(self, entry):
+        """
+        Returns the validators to send when revalidating a cached entry.
+        """
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, entry):
+        """
+        Records a response served from cache without any request.
+        """
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(entry['body'])
+        return json.loads(entry['body'])
+
+    def revalidated(self, url, params, entry):
+        """
+        Records a 304 answer for a cached entry and restarts its TTL.
+        """
+        with self._lock:
+            self.revalidations += 1
+            self.bytes_saved += len(entry['body'])
+            self._connection.execute('UPDATE responses SET stored_at = ? WHERE key = ?', (time.time(), self.key(url, params)))
+            self._connection.commit()
+        return json.loads(entry['body'])
+
+    def store(self, url, params, response):
+        """
+        Stores a successful response and evicts the least recently used entries above max_entries.
+        """
+        key = self.key(url, params)
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            exists = self._connection.execute('SELECT 1 FROM responses WHERE key = ?', (key,)).fetchone()
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses (key, body, etag, last_modified, stored_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'), now, now)
+            )
+            if not exists:
+                self._entries += 1
+            if self._entries > self.max_entries:
+                self._connection.execute(
+                    'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)',
+                    (self._entries - self.max_entries,)
+                )
+                self._entries = self.max_entries
+            self._connection.commit()
+        return response.json()
+
+    def stats(self):
+        """
+        Returns the hit, miss and revalidation counters and the response bytes not downloaded.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'bytes_saved': self.bytes_saved
+        }
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,201 @@
+import os
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ROW_COLUMNS = ['artist_codes', 'song_codes', 'album_codes', 'insertion_codes', 'popularity']
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError('numpy is required for the columnar history. Install it with: pip install numpy')
+
+
+def _code_dtype(size):
+    """
+    Returns the smallest signed integer type able to index a dictionary of the given size.
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if size <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.int64
+
+
+def _sorted_dictionary(values):
+    """
+    Sorts a dictionary array, returning the sorting order and the new code of every old code.
+    """
+    order = np.argsort(values, kind='stable')
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    return order, rank
+
+
+class TrackHistory:
+    """
+    Columnar top_tracks history, one NumPy array per column, as written by export_history.
+
+    Row columns hold one value per history row: artist_codes, song_codes, album_codes and
+    insertion_codes index the dictionaries artist_ids/artist_names, song_ids/song_names,
+    albums and insertion_dates (datetime64[us]); popularity is int8. The artist, song and
+    date dictionaries are sorted, and rows are sorted by artist ID, song ID and insertion date.
+
+    Args:
+        columns (dict): Column name -> array.
+    """
+    def __init__(self, columns):
+        self.columns = columns
+        for name, values in columns.items():
+            setattr(self, name, values)
+
+    def __len__(self):
+        return len(self.popularity)
+
+    @property
+    def artist_id(self):
+        """
+        Artist ID of every row.
+        """
+        return self.artist_ids[self.artist_codes]
+
+    @property
+    def song_id(self):
+        """
+        Song ID of every row.
+        """
+        return self.song_ids[self.song_codes]
+
+    @property
+    def insertion_date(self):
+        """
+        Insertion timestamp of every row, as datetime64[us].
+        """
+        return self.insertion_dates[self.insertion_codes]
+
+    @property
+    def insertion_day(self):
+        """
+        Insertion date of every row, as datetime64[D].
+        """
+        return self.insertion_dates.astype('datetime64[D]')[self.insertion_codes]
+
+
+def build_history(rows):
+    """
+    Builds the columnar history from top_tracks rows, dictionary-encoding artists, songs,
+    albums and insertion dates. Rows are consumed as they come, so only the compact columns
+    are held in memory, and are then sorted by artist, song and insertion date.
+
+    Args:
+        rows (iterable): Tuples of (artist_id, artist_name, song_id, song_name, album, popularity, insertion_date),
+            in any order.
+
+    Returns:
+        TrackHistory: Columnar history.
+    """
+    _require_numpy()
+    artists, songs, albums, insertions = {}, {}, {}, {}
+    artist_names, song_names = [], []
+    codes = {name: array('i') for name in ROW_COLUMNS[:-1]}
+    popularity = array('b')
+
+    for artist_id, artist_name, song_id, song_name, album, track_popularity, insertion_date in rows:
+        artist_code = artists.get(artist_id)
+        if artist_code is None:
+            artist_code = artists[artist_id] = len(artists)
+            artist_names.append(artist_name or '')
+        song_code = songs.get(song_id)
+        if song_code is None:
+            song_code = songs[song_id] = len(songs)
+            song_names.append(song_name or '')
+        album_code = albums.get(album)
+        if album_code is None:
+            album_code = albums[album] = len(albums)
+        insertion_code = insertions.get(insertion_date)
+        if insertion_code is None:
+            insertion_code = insertions[insertion_date] = len(insertions)
+
+        codes['artist_codes'].append(artist_code)
+        codes['song_codes'].append(song_code)
+        codes['album_codes'].append(album_code)
+        codes['insertion_codes'].append(insertion_code)
+        popularity.append(track_popularity)
+
+    artist_ids = np.array(list(artists), dtype=str)
+    song_ids = np.array(list(songs), dtype=str)
+    insertion_dates = np.array([str(value) for value in insertions], dtype='datetime64[us]')
+    artist_order, artist_rank = _sorted_dictionary(artist_ids)
+    song_order, song_rank = _sorted_dictionary(song_ids)
+    insertion_order, insertion_rank = _sorted_dictionary(insertion_dates)
+
+    sizes = {'artist_codes': len(artists), 'song_codes': len(songs),
+             'album_codes': len(albums), 'insertion_codes': len(insertions)}
+    columns = {
+        'artist_codes': artist_rank[np.frombuffer(codes['artist_codes'], dtype=np.int32)],
+        'song_codes': song_rank[np.frombuffer(codes['song_codes'], dtype=np.int32)],
+        'album_codes': np.frombuffer(codes['album_codes'], dtype=np.int32),
+        'insertion_codes': insertion_rank[np.frombuffer(codes['insertion_codes'], dtype=np.int32)],
+        'popularity': np.frombuffer(popularity, dtype=np.int8)
+    }
+    order = np.lexsort((columns['insertion_codes'], columns['song_codes'], columns['artist_codes']))
+    columns = {name: values[order].astype(_code_dtype(sizes[name])) if name in sizes else values[order]
+               for name, values in columns.items()}
+
+    columns['artist_ids'] = artist_ids[artist_order]
+    columns['artist_names'] = np.array(artist_names, dtype=str)[artist_order]
+    columns['song_ids'] = song_ids[song_order]
+    columns['song_names'] = np.array(song_names, dtype=str)[song_order]
+    columns['albums'] = np.array([album or '' for album in albums], dtype=str)
+    columns['insertion_dates'] = insertion_dates[insertion_order]
+    return TrackHistory(columns)
+
+
+def export_history(rows, path):
+    """
+    Writes top_tracks history rows to columnar NumPy files (see build_history).
+
+    Args:
+        rows (iterable): Tuples of (artist_id, artist_name, song_id, song_name, album, popularity, insertion_date).
+        path (str): A folder, written as one .npy file per column that can be memory-mapped,
+            or a file ending in .npz, written as one compressed archive.
+
+    Returns:
+        int: Number of rows exported.
+    """
+    history = build_history(rows)
+    columns = history.columns
+    if path.endswith('.npz'):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        np.savez_compressed(path, **columns)
+    else:
+        os.makedirs(path, exist_ok=True)
+        for name, values in columns.items():
+            np.save(os.path.join(path, f'{name}.npy'), values)
+    return len(history)
+
+
+def load_history(path, mmap=True):
+    """
+    Loads a history written by export_history.
+
+    Args:
+        path (str): Folder of .npy files or .npz archive.
+        mmap (bool): Memory-map the .npy files instead of reading them, so only the pages
+            actually used are loaded. Compressed .npz archives are always read in full.
+
+    Returns:
+        TrackHistory: Columnar history.
+    """
+    _require_numpy()
+    if path.endswith('.npz'):
+        with np.load(path) as archive:
+            columns = {name: archive[name] for name in archive.files}
+    else:
+        columns = {name[:-len('.npy')]: np.load(os.path.join(path, name), mmap_mode='r' if mmap else None)
+                   for name in os.listdir(path) if name.endswith('.npy')}
+    return TrackHistory(columns)
@@ -1,14 +1,52 @@
-from sqlalchemy import create_engine, Column, String, Integer, ForeignKey, PrimaryKeyConstraint, func, Date, cast
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, Column, String, Integer, Float, ForeignKey, PrimaryKeyConstraint, Index, func, Date, cast, inspect, text, select, and_, tuple_, delete, case, literal_column, MetaData, Table, union_all
+from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.schema import CreateIndex, CreateTable
 import os
+import re
 import csv
+import hashlib
 from datetime import date, timedelta, datetime
 import json
+import threading
+import time
+from contextlib import contextmanager
+from infrastructure.reader import SCHEMA_VERSION
+from domain.models import Artist, TrackSnapshot
 
-os.makedirs('data', exist_ok=True)
-db = create_engine("sqlite:///data/spotify_data.db")
-Session = sessionmaker(bind=db)
-session = Session()
+def create_database_engine(path='data/spotify_data.db', journal_mode='WAL', synchronous='NORMAL',
+                           mmap_size=256 * 1024 * 1024, cache_size=-64 * 1024, busy_timeout=5000):
+    """
+    Creates the SQLAlchemy engine for a SQLite database file, applying the connection PRAGMAs
+    on every new pooled connection.
+
+    Args:
+        path (str): Database file. Its folder is created if missing.
+        journal_mode (str): SQLite journal mode. WAL lets readers run alongside a writer.
+        synchronous (str): SQLite synchronous level. NORMAL is safe with WAL and avoids an fsync per commit.
+        mmap_size (int): Bytes of the database file read through memory mapping.
+        cache_size (int): Page cache size, in pages if positive or in KiB if negative.
+        busy_timeout (int): Milliseconds to wait for a lock before failing with "database is locked".
+
+    Returns:
+        Engine: Engine bound to the database file.
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    engine = create_engine(f'sqlite:///{path}', connect_args={'check_same_thread': False})
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+        cursor.execute(f'PRAGMA cache_size={int(cache_size)}')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout)}')
+        cursor.close()
+
+    return engine
 
 Base = declarative_base()
 
@@ -20,6 +58,15 @@ class Artists(Base):
     def __repr__(self):
         return f'<Artist(artist_id="{self.artist_id}", artist_name="{self.artist_name}")>'
 
+Index('ix_artists_artist_name_lower', func.lower(Artists.artist_name))
+
+def _insertion_day(context):
+    """
+    Default for TopTracks.insertion_day: the date part of the insertion_date string.
+    """
+    insertion_date = context.get_current_parameters().get('insertion_date')
+    return date.fromisoformat(str(insertion_date)[:10]) if insertion_date else None
+
 class TopTracks(Base):
     __tablename__ = 'top_tracks'
     song_name = Column(String)
@@ -28,22 +75,353 @@ class TopTracks(Base):
     album = Column(String)
     artist_id = Column(String, ForeignKey('artists.artist_id'))
     insertion_date = Column(String)
-    __table_args__ = (PrimaryKeyConstraint('song_id', 'insertion_date'),)
+    insertion_day = Column(Date, default=_insertion_day)
+    __table_args__ = (
+        PrimaryKeyConstraint('song_id', 'insertion_date'),
+        Index('ix_top_tracks_artist_date_popularity', 'artist_id', 'insertion_date', 'popularity'),
+        Index('ix_top_tracks_insertion_day_artist', 'insertion_day', 'artist_id'),
+    )
 
     def __repr__(self):
         return (f'<TopTracks(song_name="{self.song_name}", song_id="{self.song_id}", '
                 f'popularity={self.popularity}, album="{self.album}", '
                 f'artist_id="{self.artist_id}", insertion_date="{self.insertion_date}")>')
 
-Base.metadata.create_all(bind=db)
+class IngestedFiles(Base):
+    __tablename__ = 'ingested_files'
+    file_path = Column(String, primary_key=True)
+    size = Column(Integer)
+    mtime = Column(Float)
+    content_hash = Column(String)
+    byte_offset = Column(Integer)
+
+    def __repr__(self):
+        return (f'<IngestedFiles(file_path="{self.file_path}", size={self.size}, mtime={self.mtime}, '
+                f'content_hash="{self.content_hash}", byte_offset={self.byte_offset})>')
+
+class LatestTopTracks(Base):
+    """
+    Materialized latest snapshot: the top tracks of each artist from their most recent
+    insertion_date only, maintained during ingestion and indexed by popularity.
+    """
+    __tablename__ = 'latest_top_tracks'
+    artist_id = Column(String, ForeignKey('artists.artist_id'))
+    song_id = Column(String)
+    song_name = Column(String)
+    popularity = Column(Integer)
+    album = Column(String)
+    insertion_date = Column(String)
+    insertion_day = Column(Date)
+    __table_args__ = (
+        PrimaryKeyConstraint('artist_id', 'song_id'),
+        Index('ix_latest_top_tracks_artist_popularity', 'artist_id', 'popularity'),
+    )
+
+    def __repr__(self):
+        return (f'<LatestTopTracks(song_name="{self.song_name}", song_id="{self.song_id}", '
+                f'popularity={self.popularity}, album="{self.album}", '
+                f'artist_id="{self.artist_id}", insertion_date="{self.insertion_date}")>')
+
+class RefreshJobs(Base):
+    """
+    Work queue of an update run: one row per artist with its status (pending, in_progress, done
+    or failed), the attempts made, the last error and the worker holding it.
+    """
+    __tablename__ = 'refresh_jobs'
+    run_id = Column(String)
+    artist_name = Column(String)
+    status = Column(String, default='pending')
+    attempts = Column(Integer, default=0)
+    last_error = Column(String)
+    claimed_by = Column(String)
+    claimed_at = Column(Float)
+    updated_at = Column(Float)
+    __table_args__ = (
+        PrimaryKeyConstraint('run_id', 'artist_name'),
+        Index('ix_refresh_jobs_run_status', 'run_id', 'status'),
+    )
+
+    def __repr__(self):
+        return (f'<RefreshJobs(run_id="{self.run_id}", artist_name="{self.artist_name}", status="{self.status}", '
+                f'attempts={self.attempts}, last_error="{self.last_error}")>')
+
+class ArtistAliases(Base):
+    """
+    Roster names, lowercased, mapped to the artist ID their last successful search returned, so a
+    name spelled differently from Spotify's (e.g. 'Beyonce' for 'Beyoncé') is not searched again.
+    """
+    __tablename__ = 'artist_aliases'
+    roster_name = Column(String, primary_key=True)
+    artist_id = Column(String, ForeignKey('artists.artist_id'))
+
+    def __repr__(self):
+        return f'<ArtistAliases(roster_name="{self.roster_name}", artist_id="{self.artist_id}")>'
+
+SNAPSHOT_COLUMNS = [
+    LatestTopTracks.artist_id, LatestTopTracks.song_id, LatestTopTracks.song_name,
+    LatestTopTracks.popularity, LatestTopTracks.album, LatestTopTracks.insertion_date
+]
+
+LATEST_COLUMNS = ['artist_id', 'song_id', 'song_name', 'popularity', 'album', 'insertion_date', 'insertion_day']
+
+HISTORY_COLUMNS = ['song_name', 'song_id', 'popularity', 'album', 'artist_id', 'insertion_date', 'insertion_day']
+
+PARTITION_PREFIX = 'top_tracks_'
+
+HISTORY_VIEW = 'top_tracks_history'
+
+# Seconds since its last modification after which a CSV file is considered no longer being written.
+CSV_SETTLE_SECONDS = 2
+
+_partition_metadata = MetaData()
+_partition_lock = threading.Lock()
+
+def partition_month(insertion_date):
+    """
+    Returns the partition key ('YYYYMM') of an insertion_date string, date or datetime.
+    """
+    value = str(insertion_date)
+    return value[:4] + value[5:7]
+
+def partition_table(month):
+    """
+    Returns the table holding the top_tracks history of one month, with the same columns,
+    primary key and indexes as top_tracks.
+
+    Args:
+        month (str): Partition key, as 'YYYYMM'.
+
+    Returns:
+        Table: The top_tracks_YYYYMM table.
+    """
+    if not re.fullmatch(r'\d{6}', str(month)):
+        raise ValueError(f'Invalid partition {month!r}, expected YYYYMM.')
+    name = f'{PARTITION_PREFIX}{month}'
+    with _partition_lock:
+        table = _partition_metadata.tables.get(name)
+        if table is None:
+            table = Table(
+                name, _partition_metadata,
+                Column('song_name', String),
+                Column('song_id', String),
+                Column('popularity', Integer),
+                Column('album', String),
+                Column('artist_id', String),
+                Column('insertion_date', String),
+                Column('insertion_day', Date, default=_insertion_day),
+                PrimaryKeyConstraint('song_id', 'insertion_date'),
+                Index(f'ix_{name}_artist_date_popularity', 'artist_id', 'insertion_date', 'popularity'),
+                Index(f'ix_{name}_insertion_day_artist', 'insertion_day', 'artist_id'),
+            )
+    return table
+
+def list_partitions(connection):
+    """
+    Returns the months ('YYYYMM') that have a top_tracks partition, oldest first.
+    """
+    rows = connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' "
+        "AND name GLOB 'top_tracks_[0-9][0-9][0-9][0-9][0-9][0-9]' ORDER BY name"
+    )
+    return [name[len(PARTITION_PREFIX):] for (name,) in rows]
+
+def _create_history_view(connection):
+    """
+    (Re)creates the top_tracks_history view, the UNION ALL of top_tracks and every partition,
+    for tools reading the database directly.
+    """
+    columns = ', '.join(HISTORY_COLUMNS)
+    tables = [TopTracks.__tablename__] + [f'{PARTITION_PREFIX}{month}' for month in list_partitions(connection)]
+    connection.exec_driver_sql(f'DROP VIEW IF EXISTS {HISTORY_VIEW}')
+    connection.exec_driver_sql(f'CREATE VIEW {HISTORY_VIEW} AS ' + ' UNION ALL '.join(
+        f'SELECT {columns} FROM {table}' for table in tables
+    ))
+
+def create_partition(connection, month):
+    """
+    Creates the partition of a month if it does not exist yet and adds it to the history view.
+
+    Returns:
+        Table: The partition table.
+    """
+    table = partition_table(month)
+    connection.execute(CreateTable(table, if_not_exists=True))
+    for index in table.indexes:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+    _create_history_view(connection)
+    return table
+
+def top_tracks_history(connection, since=None, columns=HISTORY_COLUMNS):
+    """
+    Returns a subquery over the top_tracks history: the top_tracks table, which only keeps rows
+    written to it directly and is left out while empty, and the monthly partitions. SQLite pushes
+    WHERE clauses down into every branch, so each one is still searched through its own indexes,
+    and a history read from a single table is flattened into a plain query.
+
+    Args:
+        connection (Connection): Connection used to list the partitions.
+        since (date): If given, only partitions from the month of this date onwards are read.
+        columns (list): Columns to select. Selecting only indexed columns lets SQLite read the indexes alone.
+
+    Returns:
+        Subquery: Subquery with the requested columns.
+    """
+    tables = [partition_table(month) for month in list_partitions(connection)
+              if since is None or month >= partition_month(since)]
+    if not tables or connection.execute(select(TopTracks.song_id).limit(1)).first() is not None:
+        tables.insert(0, TopTracks.__table__)
+
+    selects = [select(*[table.c[column] for column in columns]) for table in tables]
+    if len(selects) == 1:
+        return selects[0].subquery('history')
+    return union_all(*selects).subquery('history')
+
+def _latest_snapshot_select(history):
+    """
+    Returns a select of the history rows belonging to each artist's most recent insertion_date.
+    """
+    latest = select(
+        history.c.artist_id,
+        func.max(history.c.insertion_date).label('insertion_date')
+    ).group_by(history.c.artist_id).subquery()
+
+    return select(*[history.c[column] for column in LATEST_COLUMNS]).join(latest, and_(
+        history.c.artist_id == latest.c.artist_id,
+        history.c.insertion_date == latest.c.insertion_date
+    ))
+
+def rebuild_latest(connection):
+    """
+    Regenerates latest_top_tracks from the whole top_tracks history.
+    """
+    connection.execute(delete(LatestTopTracks))
+    connection.execute(insert(LatestTopTracks).from_select(
+        LATEST_COLUMNS, _latest_snapshot_select(top_tracks_history(connection))
+    ))
+
+def _partition_legacy_rows(connection):
+    """
+    Moves the rows of the top_tracks table into the monthly partitions. Rows whose insertion_date
+    has no month are left in top_tracks, where they are still read through the history.
+    """
+    month = "substr(insertion_date, 1, 4) || substr(insertion_date, 6, 2)"
+    columns = ', '.join(HISTORY_COLUMNS)
+    months = [value for (value,) in connection.exec_driver_sql(f'SELECT DISTINCT {month} FROM top_tracks')
+              if value and re.fullmatch(r'\d{6}', value)]
+    for value in months:
+        table = create_partition(connection, value)
+        connection.exec_driver_sql(
+            f'INSERT OR IGNORE INTO {table.name} ({columns}) SELECT {columns} FROM top_tracks WHERE {month} = ?', (value,)
+        )
+        connection.exec_driver_sql(f'DELETE FROM top_tracks WHERE {month} = ?', (value,))
+
+def migrate(engine):
+    """
+    Creates the missing tables and brings a database created by an older version up to the
+    current schema: adds the insertion_day date column to top_tracks, backfills it from insertion_date, creates
+    the indexes missing on existing tables, moves the top_tracks rows into the monthly partitions,
+    creates the top_tracks_history view and fills latest_top_tracks if it is still empty.
+
+    The schema version is stored in PRAGMA user_version, so a database already at
+    SCHEMA_VERSION is only checked with that single PRAGMA.
+    """
+    with engine.connect() as connection:
+        if connection.exec_driver_sql('PRAGMA user_version').scalar() >= SCHEMA_VERSION:
+            return
+
+    Base.metadata.create_all(bind=engine)
+    columns = {column['name'] for column in inspect(engine).get_columns('top_tracks')}
+    with engine.begin() as connection:
+        if 'insertion_day' not in columns:
+            connection.execute(text('ALTER TABLE top_tracks ADD COLUMN insertion_day DATE'))
+            connection.execute(text(
+                'UPDATE top_tracks SET insertion_day = substr(insertion_date, 1, 10) WHERE insertion_day IS NULL'
+            ))
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+        _partition_legacy_rows(connection)
+        _create_history_view(connection)
+
+        history = top_tracks_history(connection)
+        latest_empty = connection.execute(select(LatestTopTracks.artist_id).limit(1)).first() is None
+        history_empty = connection.execute(select(history.c.artist_id).limit(1)).first() is None
+        if latest_empty and not history_empty:
+            rebuild_latest(connection)
+        connection.exec_driver_sql(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """
+    Returns the engine of data/spotify_data.db, creating the folder, the engine and the
+    schema on first use instead of at import time.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            engine = create_database_engine()
+            migrate(engine)
+            _engine = engine
+    return _engine
+
+def __getattr__(name):
+    if name == 'db':
+        return get_engine()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 class Database:
-    def check_data_date(self, artists_json):
+    """
+    Repository over the SQLite database. Every public method runs in its own session,
+    taken from a thread-local registry, so one instance can be shared between threads.
+
+    The top_tracks history is stored in one table per insertion month (top_tracks_YYYYMM).
+    Writes are routed to the partition of their insertion_date and reads go through
+    top_tracks_history, limited to the months they need when possible.
+
+    Args:
+        engine (Engine): Engine to use. Defaults to the data/spotify_data.db engine.
+    """
+    def __init__(self, engine=None):
+        if engine is None:
+            engine = get_engine()
+        else:
+            migrate(engine)
+        self.engine = engine
+        self.Session = scoped_session(sessionmaker(bind=self.engine, expire_on_commit=False))
+        self._partitions = set()
+
+    @contextmanager
+    def session_scope(self):
+        """
+        Provides the session of the current thread for one operation, committing on success,
+        rolling back on error and releasing it afterwards.
+        """
+        session = self.Session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            self.Session.remove()
+
+    def check_data_date(self, artists_json, max_age_hours=None):
         """
         Checks if data exists for each artist in the JSON for the current date.
 
+        A single query returns the names of every artist with fresh data, which is then diffed
+        with the JSON in memory, so the cost does not grow with one query per artist.
+
+        Args:
+            artists_json (str): Path to the JSON file with artist names.
+            max_age_hours (float): If given, data counts as fresh when it is younger than this many
+                hours instead of being from the current day, allowing staggered refreshes.
+
         Returns:
-            list: List of artists without updated data for the current day.
+            list: List of artists without updated data for the current day (or within max_age_hours).
         """
         try:
             with open(artists_json, 'r', encoding='utf-8') as f:
@@ -52,29 +430,38 @@ class Database:
             raise Exception(f'Error processing or reading file {artists_json}: {e}')
 
         try:
-            today = str(date.today().strftime('%Y-%m-%d'))
-            artists_without_data = list()
-
-            for artist in artists:
-                exists = session.query(TopTracks).join(Artists).filter(
-                    func.lower(Artists.artist_name) == artist.lower(),
-                    TopTracks.insertion_date.like(f'{today}%')
-                ).first()
-                if not exists:
-                    artists_without_data.append(artist)
+            with self.session_scope() as session:
+                if max_age_hours is None:
+                    history = top_tracks_history(session.connection(), since=date.today(),
+                                                 columns=['artist_id', 'insertion_day'])
+                    fresh_filter = [history.c.insertion_day == date.today()]
+                else:
+                    cutoff = datetime.now() - timedelta(hours=max_age_hours)
+                    history = top_tracks_history(session.connection(), since=cutoff.date(),
+                                                 columns=['artist_id', 'insertion_day', 'insertion_date'])
+                    fresh_filter = [history.c.insertion_day >= cutoff.date(), history.c.insertion_date >= str(cutoff)]
 
+                fresh_ids = select(history.c.artist_id).where(*fresh_filter).distinct().subquery()
+                fresh_names = {name for (name,) in session.query(func.lower(Artists.artist_name)).join(
+                    fresh_ids, Artists.artist_id == fresh_ids.c.artist_id
+                ).all()}
+                fresh_names.update(name for (name,) in session.query(ArtistAliases.roster_name).join(
+                    fresh_ids, ArtistAliases.artist_id == fresh_ids.c.artist_id
+                ).all())
 
+            artists_without_data = [artist for artist in artists if artist.lower() not in fresh_names]
         except Exception as e:
             raise Exception(f'Error querying database: {e}')
         
         return artists_without_data
 
-    def create_csv(self, results):
+    def create_csv(self, results, insertion_date=None):
         """
         Creates a CSV file with the results of artists' tracks.
 
         Args:
             results (list): List of dictionaries containing artist and track information.
+            insertion_date (datetime): Timestamp written on every row. Defaults to now.
         """
         try:
             subfolder = 'data'
@@ -82,7 +469,7 @@ class Database:
             file_exists = os.path.exists(full_path)
             write_header = not file_exists or os.path.getsize(full_path) == 0
 
-            current_insertion_date = datetime.now()
+            current_insertion_date = insertion_date or datetime.now()
 
             with open(full_path, 'a', newline='', encoding='utf-8') as f:
                 columns = ['artist_name', 'artist_id', 'song_name', 'song_id', 'popularity', 'album', 'insertion_date']
@@ -93,6 +480,8 @@ class Database:
                     writer.writeheader()
 
                 for artist_info in results:
+                    if not artist_info:
+                        continue
                     artist = artist_info['artist']
                     for track in artist_info['top_tracks']:
                         writer.writerow({
@@ -108,44 +497,551 @@ class Database:
             print(e)
             return
 
-    def insert_csv_data_to_database(self, csv_folder='data'):
+    def _history_cursor(self, session):
+        """
+        Returns a DBAPI cursor over every history row with its artist name, in table order.
+        The raw cursor streams plain tuples, much cheaper than ORM rows or an ORDER BY over the whole history.
+        """
+        history = top_tracks_history(session.connection(), columns=[
+            'artist_id', 'song_id', 'song_name', 'album', 'popularity', 'insertion_date'
+        ])
+        stmt = select(
+            history.c.artist_id, Artists.artist_name, history.c.song_id, history.c.song_name,
+            history.c.album, history.c.popularity, history.c.insertion_date
+        ).join(Artists, Artists.artist_id == history.c.artist_id, isouter=True)
+        cursor = session.connection().connection.cursor()
+        cursor.execute(str(stmt.compile(dialect=self.engine.dialect)))
+        return cursor
+
+    def export_history(self, path='data/history'):
+        """
+        Exports the whole top_tracks history to compact columnar NumPy files (see infrastructure/columnar.py),
+        with dictionary-encoded artists, songs, albums and dates and int8 popularity. Requires numpy.
+
+        Args:
+            path (str): Folder of memory-mappable .npy files, or a .npz file for a compressed archive.
+
+        Returns:
+            int: Number of rows exported.
+        """
+        from infrastructure.columnar import export_history
+
+        try:
+            with self.session_scope() as session:
+                return export_history(self._history_cursor(session), path)
+        except Exception as e:
+            raise RuntimeError(f'Error exporting history: {e}')
+
+    def load_history(self):
+        """
+        Loads the whole top_tracks history into memory as NumPy columns. Requires numpy.
+
+        Returns:
+            TrackHistory: Columnar history, sorted by artist, song and insertion date.
+        """
+        from infrastructure.columnar import build_history
+
+        try:
+            with self.session_scope() as session:
+                return build_history(self._history_cursor(session))
+        except Exception as e:
+            raise RuntimeError(f'Error loading history: {e}')
+
+    def _partition(self, session, month):
+        """
+        Returns the partition table of a month, creating it on the first write to that month.
+        """
+        if month not in self._partitions:
+            create_partition(session.connection(), month)
+            self._partitions.add(month)
+        return partition_table(month)
+
+    def _upsert_rows(self, session, artist_rows, track_rows):
+        """
+        Bulk upserts artist and track rows with executemany Core statements, each track row
+        going to the partition of its insertion month. The caller commits the transaction.
+
+        Args:
+            session (Session): Session of the current operation.
+            artist_rows (list): Dictionaries with artist_id and artist_name.
+            track_rows (list): Dictionaries with the top_tracks columns.
+
+        Returns:
+            int: Number of track rows written.
+        """
+        try:
+            if artist_rows:
+                stmt = insert(Artists)
+                session.execute(stmt.on_conflict_do_update(
+                    index_elements=[Artists.artist_id],
+                    set_={'artist_name': stmt.excluded.artist_name}
+                ), artist_rows)
+
+            if track_rows:
+                rows_by_month = {}
+                for row in track_rows:
+                    rows_by_month.setdefault(partition_month(row['insertion_date']), []).append(row)
+
+                for month, rows in rows_by_month.items():
+                    table = self._partition(session, month)
+                    stmt = insert(table)
+                    session.execute(stmt.on_conflict_do_update(
+                        index_elements=[table.c.song_id, table.c.insertion_date],
+                        set_={
+                            'song_name': stmt.excluded.song_name,
+                            'popularity': stmt.excluded.popularity,
+                            'album': stmt.excluded.album,
+                            'artist_id': stmt.excluded.artist_id
+                        }
+                    ), rows)
+
+                artist_dates = {}
+                for row in track_rows:
+                    if row['insertion_date'] > artist_dates.get(row['artist_id'], ''):
+                        artist_dates[row['artist_id']] = row['insertion_date']
+                self._refresh_latest(session, artist_dates)
+            return len(track_rows)
+        except Exception:
+            self._partitions.clear()
+            session.rollback()
+            raise
+
+    def _refresh_latest(self, session, artist_dates, batch_size=400):
+        """
+        Updates latest_top_tracks for artists that just received tracks. An artist's snapshot is
+        replaced only when the new insertion_date is at least as recent as the stored one, so
+        importing older history leaves the latest snapshot untouched. The new snapshot is read
+        from the partitions just written only, whatever the size of the history.
+
+        Args:
+            session (Session): Session of the current operation.
+            artist_dates (dict): Artist ID -> most recent insertion_date written in this batch.
+            batch_size (int): Artists handled per statement, keeping below the SQLite variable limit.
+        """
+        items = list(artist_dates.items())
+        for start in range(0, len(items), batch_size):
+            batch = dict(items[start:start + batch_size])
+            current = dict(session.query(LatestTopTracks.artist_id, func.max(LatestTopTracks.insertion_date)).filter(
+                LatestTopTracks.artist_id.in_(batch)
+            ).group_by(LatestTopTracks.artist_id).all())
+
+            newer = [(artist_id, insertion_date) for artist_id, insertion_date in batch.items()
+                     if artist_id not in current or insertion_date >= current[artist_id]]
+            if not newer:
+                continue
+
+            session.execute(delete(LatestTopTracks).where(
+                LatestTopTracks.artist_id.in_([artist_id for artist_id, _ in newer])
+            ))
+            newer_by_month = {}
+            for artist_id, insertion_date in newer:
+                newer_by_month.setdefault(partition_month(insertion_date), []).append((artist_id, insertion_date))
+            for month, keys in newer_by_month.items():
+                table = partition_table(month)
+                session.execute(insert(LatestTopTracks).from_select(LATEST_COLUMNS, select(
+                    *[table.c[column] for column in LATEST_COLUMNS]
+                ).where(tuple_(table.c.artist_id, table.c.insertion_date).in_(keys))))
+
+    def rebuild_latest_top_tracks(self):
+        """
+        Regenerates the latest_top_tracks snapshot table from the top_tracks history.
+        """
+        try:
+            with self.session_scope() as session:
+                rebuild_latest(session.connection())
+        except Exception as e:
+            raise RuntimeError(f'Error rebuilding latest top tracks: {e}')
+
+    def partitions(self):
+        """
+        Lists the monthly partitions of the top_tracks history.
+
+        Returns:
+            list: (month as 'YYYYMM', row count) tuples, oldest first.
+        """
+        with self.session_scope() as session:
+            connection = session.connection()
+            return [(month, connection.execute(select(func.count()).select_from(partition_table(month))).scalar())
+                    for month in list_partitions(connection)]
+
+    def drop_partition(self, month):
         """
-        Reads all CSV files from the specified folder and inserts data into the database.
+        Drops the history of a whole month with a single DROP TABLE, without deleting rows one by one.
+        latest_top_tracks is left as it is; run rebuild_latest_top_tracks to drop its rows from that month too.
+
+        Args:
+            month (str): Partition key, as 'YYYYMM'.
+        """
+        try:
+            table = partition_table(month)
+            with self.session_scope() as session:
+                connection = session.connection()
+                if month not in list_partitions(connection):
+                    raise RuntimeError(f'No partition for {month}.')
+                table.drop(connection)
+                _create_history_view(connection)
+            self._partitions.discard(month)
+        except Exception as e:
+            raise RuntimeError(f'Error dropping partition {month}: {e}')
+
+    def archive_partition(self, month, folder='data/archive', batch_size=5000):
+        """
+        Copies the history of a month to its own SQLite file, with the same table and indexes,
+        then drops it from the database.
+
+        Args:
+            month (str): Partition key, as 'YYYYMM'.
+            folder (str): Folder of the archive files.
+            batch_size (int): Rows copied per statement.
+
+        Returns:
+            str: Path of the archive file, folder/top_tracks_YYYYMM.db.
+        """
+        try:
+            table = partition_table(month)
+            path = os.path.join(folder, f'{table.name}.db')
+            if os.path.exists(path):
+                raise RuntimeError(f'{path} already exists.')
+
+            archive = create_database_engine(path, journal_mode='DELETE')
+            try:
+                table.create(archive)
+                with self.session_scope() as session, archive.begin() as connection:
+                    for batch in self._batched(session.execute(select(table)).mappings(), batch_size):
+                        connection.execute(insert(table), [dict(row) for row in batch])
+            finally:
+                archive.dispose()
+        except Exception as e:
+            raise RuntimeError(f'Error archiving partition {month}: {e}')
+
+        self.drop_partition(month)
+        return path
+
+    @staticmethod
+    def _batched(iterable, size):
+        """
+        Yields lists of up to size items from an iterable, consuming it lazily.
+        """
+        batch = []
+        for item in iterable:
+            batch.append(item)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def insert_results(self, results, insertion_date=None, batch_size=500):
+        """
+        Inserts search results directly into the database, without going through CSV files.
+        Rows are upserted with INSERT ... ON CONFLICT, one transaction per batch of artists.
+
+        Args:
+            results (list): List of dictionaries containing artist and track information.
+            insertion_date (datetime): Timestamp stored on every track row. Defaults to now.
+            batch_size (int): Number of artists written per transaction.
+        """
+        insertion_date = str(insertion_date or datetime.now())
+        results = [artist_info for artist_info in results if artist_info]
+
+        try:
+            with self.session_scope() as session:
+                for start in range(0, len(results), batch_size):
+                    artist_rows = {}
+                    track_rows = []
+                    for artist_info in results[start:start + batch_size]:
+                        artist = artist_info['artist']
+                        artist_rows[artist.artist_id] = {'artist_id': artist.artist_id, 'artist_name': artist.name}
+                        for track in artist_info['top_tracks']:
+                            track_rows.append({
+                                'song_name': track.track_name,
+                                'song_id': track.track_id,
+                                'popularity': track.popularity,
+                                'album': track.album,
+                                'artist_id': artist.artist_id,
+                                'insertion_date': insertion_date
+                            })
+                    self._upsert_rows(session, list(artist_rows.values()), track_rows)
+                    session.commit()
+        except Exception as e:
+            raise RuntimeError(f'Error inserting search results: {e}')
+
+    def _hash_prefix(self, full_path, length):
+        """
+        Returns the sha256 of the first length bytes of a file.
+        """
+        digest = hashlib.sha256()
+        with open(full_path, 'rb') as f:
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+        return digest
+
+    def _read_csv_lines(self, f, offset, digest, position, settled=False):
+        """
+        Yields complete decoded lines of an open binary CSV file, updating the hash and byte offset.
+        A trailing line without newline is only read once the file is settled, as until then it may
+        still be being written; otherwise it is left for the next run.
+
+        Args:
+            f: Binary file object positioned at offset.
+            offset (int): Byte position of f.
+            digest: sha256 object covering the bytes before offset.
+            position (dict): Receives the offset after the last line read under 'offset'.
+            settled (bool): Whether the file is no longer being written.
+        """
+        position['offset'] = offset
+        for line in f:
+            if not line.endswith(b'\n') and not settled:
+                break
+            digest.update(line)
+            position['offset'] += len(line)
+            yield line.decode('utf-8')
+
+    def insert_csv_data_to_database(self, csv_folder='data', batch_size=5000):
+        """
+        Reads the CSV files from the specified folder and inserts their new data into the database.
+
+        Rows are streamed from disk and upserted in fixed-size batches, one transaction per batch,
+        so memory use does not depend on the file size.
+
+        Every ingested file is recorded in the ingested_files manifest with its size, mtime,
+        content hash and the byte offset ingested. Unchanged files are skipped, files that only
+        grew (append-only daily files) are read from the recorded offset, and any other change
+        re-ingests the whole file. The offset is saved with every batch, so an interrupted import
+        resumes where it stopped. A last line without newline is ingested once the file has not been
+        modified for CSV_SETTLE_SECONDS; until then the file is not recorded as fully ingested, so
+        the next run reads that line.
 
         Args:
             csv_folder (str): Path to the folder containing CSV files. Default is 'data'.
+            batch_size (int): Number of rows written per transaction.
         """
+        file = None
         try:
-            for file in os.listdir(csv_folder):
-                if file.endswith('.csv'):
+            with self.session_scope() as session:
+                for file in sorted(os.listdir(csv_folder)):
+                    if not file.endswith('.csv'):
+                        continue
                     full_path = os.path.join(csv_folder, file)
-                    with open(full_path, encoding='utf-8') as f:
-                        reader = csv.DictReader(f, delimiter=';')
-                        if reader.fieldnames is None:
+                    file_path = os.path.abspath(full_path)
+                    stat = os.stat(full_path)
+                    settled = time.time() - stat.st_mtime >= CSV_SETTLE_SECONDS
+
+                    manifest = session.get(IngestedFiles, file_path)
+                    if manifest and manifest.size == stat.st_size and manifest.mtime == stat.st_mtime:
+                        continue
+
+                    offset = 0
+                    digest = hashlib.sha256()
+                    if manifest and manifest.byte_offset and stat.st_size >= manifest.byte_offset:
+                        prefix = self._hash_prefix(full_path, manifest.byte_offset)
+                        if prefix.hexdigest() == manifest.content_hash:
+                            offset, digest = manifest.byte_offset, prefix
+
+                    with open(full_path, 'rb') as f:
+                        header = f.readline()
+                        if not header.strip():
                             raise RuntimeError(f'CSV file {file} is empty or has no header.')
-                        rows = list(reader)
-                        if not rows:
+                        fieldnames = next(csv.reader([header.decode('utf-8')], delimiter=';'))
+                        if offset == 0:
+                            digest.update(header)
+                            offset = len(header)
+                        else:
+                            f.seek(offset)
+
+                        position = {'offset': offset}
+                        lines = self._read_csv_lines(f, offset, digest, position, settled)
+                        reader = csv.DictReader(lines, fieldnames=fieldnames, delimiter=';')
+
+                        row_count = 0
+                        for batch in self._batched(reader, batch_size):
+                            artist_rows = {}
+                            track_rows = []
+                            for row in batch:
+                                artist_rows[row['artist_id']] = {
+                                    'artist_id': row['artist_id'],
+                                    'artist_name': row['artist_name']
+                                }
+                                track_rows.append({
+                                    'song_name': row['song_name'],
+                                    'song_id': row['song_id'],
+                                    'popularity': int(row['popularity']),
+                                    'album': row['album'],
+                                    'artist_id': row['artist_id'],
+                                    'insertion_date': row['insertion_date']
+                                })
+                            self._upsert_rows(session, list(artist_rows.values()), track_rows)
+                            session.merge(IngestedFiles(
+                                file_path=file_path,
+                                size=None,
+                                mtime=None,
+                                content_hash=digest.hexdigest(),
+                                byte_offset=position['offset']
+                            ))
+                            session.commit()
+                            row_count += len(batch)
+
+                        complete = position['offset'] == stat.st_size
+                        if not row_count and not manifest and position['offset'] >= stat.st_size:
                             raise RuntimeError(f'CSV file {file} is empty.')
-                        for row in rows:
-                            artist_obj = Artists(
-                                artist_id=row['artist_id'],
-                                artist_name=row['artist_name']
-                            )
-                            session.merge(artist_obj)
-
-                            track_obj = TopTracks(
-                                song_name=row['song_name'],
-                                song_id=row['song_id'],
-                                popularity=int(row['popularity']),
-                                album=row['album'],
-                                artist_id=row['artist_id'],
-                                insertion_date=row['insertion_date']
-                            )
-                            session.merge(track_obj)
-                        session.commit()
+
+                    session.merge(IngestedFiles(
+                        file_path=file_path,
+                        size=stat.st_size if complete else None,
+                        mtime=stat.st_mtime if complete else None,
+                        content_hash=digest.hexdigest(),
+                        byte_offset=position['offset']
+                    ))
+                    session.commit()
         except Exception as e:
             raise RuntimeError(f'Error inserting CSV data from {file}: {e}')
 
+    def enqueue_refresh_jobs(self, run_id, artist_names, max_attempts=3):
+        """
+        Adds the artists of a run to the refresh_jobs queue as pending. Artists already queued for the
+        run keep their status, so enqueueing again resumes the run, except failed ones with attempts
+        left, which are pending again, and done ones, which are given again only when their data is
+        stale (e.g. older than max_age_hours), and are pending again with new attempts. Finished jobs
+        of other runs are removed.
+
+        Args:
+            run_id (str): Identifies the run.
+            artist_names (list): Artist names needing an update.
+            max_attempts (int): Attempts after which a failed job is not queued again.
+        """
+        now = time.time()
+        rows = [{'run_id': run_id, 'artist_name': name, 'status': 'pending', 'attempts': 0, 'updated_at': now}
+                for name in dict.fromkeys(artist_names)]
+        try:
+            with self.session_scope() as session:
+                session.execute(delete(RefreshJobs).where(RefreshJobs.run_id != run_id, RefreshJobs.status == 'done'))
+                for batch in self._batched(rows, 5000):
+                    session.execute(insert(RefreshJobs).on_conflict_do_nothing(), batch)
+                    names = [row['artist_name'] for row in batch]
+                    session.execute(RefreshJobs.__table__.update().where(
+                        RefreshJobs.run_id == run_id, RefreshJobs.status == 'failed',
+                        RefreshJobs.attempts < max_attempts, RefreshJobs.artist_name.in_(names)
+                    ).values(status='pending', updated_at=now))
+                    session.execute(RefreshJobs.__table__.update().where(
+                        RefreshJobs.run_id == run_id, RefreshJobs.status == 'done', RefreshJobs.artist_name.in_(names)
+                    ).values(status='pending', attempts=0, updated_at=now))
+        except Exception as e:
+            raise RuntimeError(f'Error queueing refresh jobs: {e}')
+
+    def claim_refresh_jobs(self, run_id, worker, limit, lease_seconds=600, max_attempts=3):
+        """
+        Claims up to limit jobs of a run for one worker, in a single UPDATE so that concurrent workers,
+        in this or other processes, never claim the same artist. Pending jobs are claimed first, in the
+        order they were queued, then
+        in_progress jobs whose lease expired because their worker died. Expired jobs that used up
+        their attempts are marked failed.
+
+        Args:
+            run_id (str): Identifies the run.
+            worker (str): Identifies the claiming worker.
+            limit (int): Maximum number of jobs claimed.
+            lease_seconds (float): Seconds after which an in_progress job can be claimed again.
+            max_attempts (int): Attempts after which a job is no longer claimed.
+
+        Returns:
+            list: Names of the claimed artists.
+        """
+        now = time.time()
+        expired = and_(RefreshJobs.status == 'in_progress', RefreshJobs.claimed_at < now - lease_seconds)
+        candidates = select(RefreshJobs.artist_name).where(
+            RefreshJobs.run_id == run_id,
+            (RefreshJobs.status == 'pending') | expired,
+            RefreshJobs.attempts < max_attempts
+        ).order_by(RefreshJobs.status.desc(), literal_column('rowid')).limit(limit)  # 'pending' sorts after 'in_progress'
+
+        try:
+            with self.session_scope() as session:
+                session.execute(RefreshJobs.__table__.update().where(
+                    RefreshJobs.run_id == run_id, RefreshJobs.artist_name.in_(candidates)
+                ).values(status='in_progress', claimed_by=worker, claimed_at=now, updated_at=now,
+                         attempts=RefreshJobs.attempts + 1))
+                session.execute(RefreshJobs.__table__.update().where(
+                    RefreshJobs.run_id == run_id, expired, RefreshJobs.attempts >= max_attempts
+                ).values(status='failed', last_error='Lease expired', claimed_by=None, updated_at=now))
+                return list(session.execute(select(RefreshJobs.artist_name).where(
+                    RefreshJobs.run_id == run_id, RefreshJobs.status == 'in_progress',
+                    RefreshJobs.claimed_by == worker, RefreshJobs.claimed_at == now
+                ).order_by(literal_column('rowid'))).scalars())
+        except Exception as e:
+            raise RuntimeError(f'Error claiming refresh jobs: {e}')
+
+    def finish_refresh_jobs(self, run_id, worker, done=(), missing=(), errors=None, max_attempts=3):
+        """
+        Marks claimed jobs as done, or failed for artists Spotify did not find. Artists whose requests
+        failed go back to pending with their error, or are failed once they used up their attempts.
+
+        Args:
+            run_id (str): Identifies the run.
+            worker (str): Worker holding the jobs.
+            done (list): Names of the artists saved.
+            missing (list): Names of the artists not found.
+            errors (dict): Artist name -> error, for the artists whose requests failed.
+            max_attempts (int): Attempts after which a job is failed.
+        """
+        now = time.time()
+        retry = case((RefreshJobs.attempts >= max_attempts, 'failed'), else_='pending')
+        by_error = {}
+        for name, error in (errors or {}).items():
+            by_error.setdefault(error, []).append(name)
+        try:
+            with self.session_scope() as session:
+                for names, values in ((list(done), {'status': 'done', 'last_error': None}),
+                                      (list(missing), {'status': 'failed', 'last_error': 'Artist not found'}),
+                                      *((names, {'status': retry, 'last_error': error})
+                                        for error, names in by_error.items())):
+                    for start in range(0, len(names), 500):
+                        session.execute(RefreshJobs.__table__.update().where(
+                            RefreshJobs.run_id == run_id, RefreshJobs.claimed_by == worker,
+                            RefreshJobs.artist_name.in_(names[start:start + 500])
+                        ).values(claimed_by=None, updated_at=now, **values))
+        except Exception as e:
+            raise RuntimeError(f'Error finishing refresh jobs: {e}')
+
+    def release_refresh_jobs(self, run_id, worker, error, max_attempts=3):
+        """
+        Returns the jobs a worker still holds to the queue after an error, recording it. Jobs that
+        used up their attempts are marked failed instead.
+
+        Args:
+            run_id (str): Identifies the run.
+            worker (str): Worker holding the jobs.
+            error (str): Error that stopped the worker.
+            max_attempts (int): Attempts after which a job is failed.
+        """
+        try:
+            with self.session_scope() as session:
+                session.execute(RefreshJobs.__table__.update().where(
+                    RefreshJobs.run_id == run_id, RefreshJobs.claimed_by == worker,
+                    RefreshJobs.status == 'in_progress'
+                ).values(
+                    status=case((RefreshJobs.attempts >= max_attempts, 'failed'), else_='pending'),
+                    last_error=error, claimed_by=None, updated_at=time.time()
+                ))
+        except Exception as e:
+            raise RuntimeError(f'Error releasing refresh jobs: {e}')
+
+    def refresh_job_counts(self, run_id):
+        """
+        Counts the jobs of a run by status.
+
+        Returns:
+            dict: Status -> number of jobs.
+        """
+        with self.session_scope() as session:
+            return dict(session.execute(select(RefreshJobs.status, func.count()).where(
+                RefreshJobs.run_id == run_id
+            ).group_by(RefreshJobs.status)).all())
+
     def query_artists_data(self, filter_list):
         """
         Search for artists and their top tracks in the database by name (case-insensitive) or exact ID.
@@ -154,19 +1050,64 @@ class Database:
             filter_list (list): List of artist names or IDs.
 
         Return:
-            list: List of found Artist objects.
+            list: List of found Artist objects, read as plain columns without ORM instances.
         """
-        if not filter_list:
-            return session.query(Artists).all()
-        
-        filter_lower = [name.lower() for name in filter_list]
+        stmt = select(Artists.artist_name, Artists.artist_id)
+        if filter_list:
+            filter_lower = [name.lower() for name in filter_list]
+            stmt = stmt.where(
+                (func.lower(Artists.artist_name).in_(filter_lower)) |
+                (Artists.artist_id.in_(filter_list))
+            )
+
+        with self.session_scope() as session:
+            return [Artist(name, artist_id) for name, artist_id in session.execute(stmt)]
+
+    def query_artist_ids(self, names, batch_size=500):
+        """
+        Resolves artist names (case-insensitive) to the IDs already stored in the database, from the
+        artist_aliases map of roster names first and from the artist names Spotify returned otherwise.
+
+        Args:
+            names (list): Artist names.
+            batch_size (int): Names sent per query, keeping below the SQLite variable limit.
 
-        artists_info = session.query(Artists).filter(
-            (func.lower(Artists.artist_name).in_(filter_lower)) |
-            (Artists.artist_id.in_(filter_list))
-        ).all()
+        Returns:
+            dict: Lowercased artist name -> artist ID, only for names found.
+        """
+        names_lower = list({name.lower() for name in names})
+        artist_ids = {}
+        with self.session_scope() as session:
+            for start in range(0, len(names_lower), batch_size):
+                batch = names_lower[start:start + batch_size]
+                artist_ids.update(session.query(func.lower(Artists.artist_name), Artists.artist_id).filter(
+                    func.lower(Artists.artist_name).in_(batch)
+                ).all())
+                artist_ids.update(session.query(ArtistAliases.roster_name, ArtistAliases.artist_id).filter(
+                    ArtistAliases.roster_name.in_(batch)
+                ).all())
+        return artist_ids
+
+    def insert_artist_aliases(self, aliases):
+        """
+        Stores the artist ID found by the search of each roster name, replacing the previous one, so
+        later runs resolve the name with query_artist_ids instead of searching it again.
 
-        return artists_info
+        Args:
+            aliases (dict): Roster name -> artist ID. The artists must already be stored.
+        """
+        rows = [{'roster_name': name.lower(), 'artist_id': artist_id} for name, artist_id in aliases.items()]
+        if not rows:
+            return
+        try:
+            with self.session_scope() as session:
+                stmt = insert(ArtistAliases)
+                session.execute(stmt.on_conflict_do_update(
+                    index_elements=[ArtistAliases.roster_name],
+                    set_={'artist_id': stmt.excluded.artist_id}
+                ), rows)
+        except Exception as e:
+            raise RuntimeError(f'Error saving artist aliases: {e}')
 
     def query_top_tracks_data(self, artist_id):
         """
@@ -176,18 +1117,47 @@ class Database:
             artist_id (str): Artist ID.
 
         Returns:
-            list: List of TopTracks objects for the artist, ordered by popularity (descending).
+            list: List of TrackSnapshot objects for the artist, ordered by popularity (descending).
+        """
+        stmt = select(*SNAPSHOT_COLUMNS).where(
+            LatestTopTracks.artist_id == artist_id
+        ).order_by(LatestTopTracks.popularity.desc())
+
+        with self.session_scope() as session:
+            return [TrackSnapshot(*row) for row in session.execute(stmt)]
+
+    def query_latest_top_tracks(self, artist_ids=None, batch_size=500):
+        """
+        Search for the most recent top tracks of many artists at once, reading the
+        latest_top_tracks snapshot with one statement per batch of IDs. Plain column tuples
+        are selected straight into TrackSnapshot objects, skipping the ORM identity map.
+
+        Args:
+            artist_ids (list): Artist IDs. None returns every artist.
+            batch_size (int): IDs sent per query, keeping below the SQLite variable limit.
+
+        Returns:
+            dict: Artist ID -> list of TrackSnapshot objects, ordered by popularity (descending).
         """
-        most_recent_date = session.query(func.max(TopTracks.insertion_date)).filter(
-            TopTracks.artist_id == artist_id
-        ).scalar()
+        if artist_ids is None:
+            batches = [None]
+        else:
+            artist_ids = list(artist_ids)
+            batches = [artist_ids[start:start + batch_size] for start in range(0, len(artist_ids), batch_size)]
+
+        tracks_by_artist = {}
+        with self.session_scope() as session:
+            for batch in batches:
+                stmt = select(*SNAPSHOT_COLUMNS)
+                if batch is not None:
+                    stmt = stmt.where(LatestTopTracks.artist_id.in_(batch))
+                stmt = stmt.order_by(LatestTopTracks.artist_id, LatestTopTracks.popularity.desc())
 
-        tracks = session.query(TopTracks).filter(
-            TopTracks.artist_id == artist_id,
-            TopTracks.insertion_date == most_recent_date
-        ).order_by(TopTracks.popularity.desc()).all()
+                for row in session.execute(stmt):
+                    track = TrackSnapshot(*row)
+                    tracks_by_artist.setdefault(track.artist_id, []).append(track)
 
-        return tracks
+        return tracks_by_artist
 
     def display_artists(self):
         """
@@ -198,5 +1168,5 @@ class Database:
         if not all_artists:
             raise RuntimeError('No artists found in database. Run with --artists_json to update data.')
         print('\nAll artists in database:\n')
-        for artist in sorted(all_artists, key=lambda a: a.artist_name.lower()):
-            print(f'{artist.artist_id} - {artist.artist_name}')
+        for artist in sorted(all_artists, key=lambda a: a.name.lower()):
+            print(f'{artist.artist_id} - {artist.name}')
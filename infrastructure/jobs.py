@@ -0,0 +1,67 @@
+import os
+import uuid
+from datetime import date
+
+
+class RefreshQueue:
+    """
+    The refresh_jobs work queue of one update run, as seen by one worker. Several workers, in this
+    or other processes, can share a run: each artist is claimed by a single worker at a time, and
+    jobs left in_progress by a worker that died are claimed again once their lease expires.
+
+    Args:
+        database (Database): Database holding the refresh_jobs table.
+        run_id (str): Identifies the run. See run_id_for.
+        worker (str): Identifies this worker. Defaults to the process ID and a random suffix.
+        lease_seconds (float): Seconds before an unfinished claim can be taken over.
+        max_attempts (int): Attempts after which an artist is failed.
+    """
+    def __init__(self, database, run_id, worker=None, lease_seconds=600, max_attempts=3):
+        self.database = database
+        self.run_id = run_id
+        self.worker = worker or f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    @staticmethod
+    def run_id_for(artists_json):
+        """
+        Returns the run ID of an update of the given artists JSON on the current day, so a run
+        started again the same day resumes the same queue.
+        """
+        return f'{os.path.abspath(artists_json)}@{date.today()}'
+
+    def enqueue(self, artist_names):
+        """
+        Queues artists needing an update as pending, keeping the status of those already queued for
+        the run unless they failed with attempts left or are done but stale again.
+        """
+        self.database.enqueue_refresh_jobs(self.run_id, artist_names, self.max_attempts)
+
+    def claim(self, limit):
+        """
+        Claims up to limit artists for this worker.
+
+        Returns:
+            list: Names of the claimed artists.
+        """
+        return self.database.claim_refresh_jobs(self.run_id, self.worker, limit, self.lease_seconds, self.max_attempts)
+
+    def finish(self, done, missing=(), errors=None):
+        """
+        Marks claimed artists as done, failed when they were not found, or pending again when their
+        requests failed (see errors), until they use up their attempts.
+        """
+        self.database.finish_refresh_jobs(self.run_id, self.worker, done, missing, errors, self.max_attempts)
+
+    def release(self, error):
+        """
+        Returns the artists this worker still holds to the queue after an error.
+        """
+        self.database.release_refresh_jobs(self.run_id, self.worker, error, self.max_attempts)
+
+    def counts(self):
+        """
+        Returns the number of jobs of the run by status.
+        """
+        return self.database.refresh_job_counts(self.run_id)
@@ -0,0 +1,291 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+
+# Upper bounds, in seconds, of the latency buckets: from a cached lookup to a throttled request.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PREFIX = 'spotify_'
+
+
+class Histogram:
+    """
+    Latency distribution kept as counts per bucket, the same way Prometheus histograms are, so
+    recording a value costs a bisect and a few additions whatever the number of calls.
+
+    Args:
+        buckets (tuple): Sorted upper bounds of the buckets, in seconds.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in, or the largest value
+        observed when it falls beyond the last bucket.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative(self):
+        """
+        Returns (upper bound, calls up to that bound) pairs, ending with '+Inf'.
+        """
+        pairs = []
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            pairs.append((bound, seen))
+        pairs.append(('+Inf', self.count))
+        return pairs
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': {str(bound): seen for bound, seen in self.cumulative()}
+        }
+
+
+class Metrics:
+    """
+    Latency histograms and counters of one run, exported as a JSON report and in the Prometheus
+    text format. Nothing is measured until instrument wraps the methods of an object, so a run
+    without --metrics keeps calling the original methods directly.
+
+    Every instrumented method records, under its component and method labels:
+    - spotify_call_duration_seconds: histogram of the call latency.
+    - spotify_call_errors_total: calls that raised.
+    - spotify_call_empty_total: calls that returned None, e.g. an artist not found.
+    - spotify_call_items_total: items passed in the first argument, when it is a list, tuple, dict or set,
+      e.g. the search results given to insert_results.
+    - spotify_rows_written_total: rows returned by the methods listed in row_counts, e.g. the track
+      rows written by _upsert_rows.
+
+    Args:
+        labels (dict): Labels added to every series, e.g. the worker of a --processes run.
+    """
+    def __init__(self, labels=None):
+        self._lock = threading.Lock()
+        self.labels = tuple(sorted((labels or {}).items()))
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def count(self, name, value=1, **labels):
+        """
+        Adds a value to a counter.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        """
+        Sets a gauge to a value.
+        """
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        """
+        Records a duration in a histogram.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Records the duration of the with block in a histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def _wrap(self, function, component, method, counts_rows=False):
+        labels = (('component', component), ('method', method))
+        key = (PREFIX + 'call_duration_seconds', labels)
+        errors, empty, items, rows = ((PREFIX + name, labels) for name in
+                                      ('call_errors_total', 'call_empty_total', 'call_items_total', 'rows_written_total'))
+        lock = self._lock
+        histograms = self.histograms
+        counters = self.counters
+        perf_counter = time.perf_counter
+
+        def record(start, args, result, error=False):
+            elapsed = perf_counter() - start
+            size = len(args[0]) if args and isinstance(args[0], (list, tuple, dict, set)) else 0
+            with lock:
+                histogram = histograms.get(key)
+                if histogram is None:
+                    histogram = histograms[key] = Histogram()
+                histogram.observe(elapsed)
+                if error:
+                    counters[errors] = counters.get(errors, 0) + 1
+                elif result is None:
+                    counters[empty] = counters.get(empty, 0) + 1
+                if size:
+                    counters[items] = counters.get(items, 0) + size
+                if counts_rows and type(result) is int:
+                    counters[rows] = counters.get(rows, 0) + result
+
+        if inspect.isgeneratorfunction(function):
+            # The duration of a generator runs until it is exhausted or closed, not until it is created.
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    yield from function(*args, **kwargs)
+                except GeneratorExit:
+                    record(start, args, True)
+                    raise
+                except Exception:
+                    record(start, args, None, error=True)
+                    raise
+                record(start, args, True)
+            return wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except Exception:
+                record(start, args, None, error=True)
+                raise
+            record(start, args, result)
+            return result
+        return wrapper
+
+    def instrument(self, target, component, methods, row_counts=()):
+        """
+        Replaces methods of an object with timed wrappers. Only this object is changed: other
+        instances of its class and callables taken from it beforehand keep the original methods,
+        so objects are instrumented before they are injected into others.
+
+        Args:
+            target (object): Object whose methods are wrapped.
+            component (str): Value of the component label, e.g. 'api' or 'database'.
+            methods (list): Names of the methods to wrap. Names the object lacks are skipped.
+            row_counts (list): Names of wrapped methods returning the number of rows they wrote.
+
+        Returns:
+            object: The target.
+        """
+        for method in methods:
+            function = getattr(target, method, None)
+            if function is not None:
+                setattr(target, method, self._wrap(function, component, method, method in row_counts))
+        return target
+
+    def report(self):
+        """
+        Returns the run report: start time, duration, counters, gauges and a summary of every histogram.
+        """
+        def series(entries, value):
+            return [{'name': name, 'labels': dict(self.labels + labels), **value(entry)}
+                    for (name, labels), entry in sorted(entries.items())]
+
+        with self._lock:
+            return {
+                'started': self.started.isoformat(),
+                'duration_seconds': time.perf_counter() - self._start,
+                'pid': os.getpid(),
+                'counters': series(self.counters, lambda value: {'value': value}),
+                'gauges': series(self.gauges, lambda value: {'value': value}),
+                'histograms': series(self.histograms, Histogram.snapshot)
+            }
+
+    def _label_text(self, labels, extra=()):
+        pairs = self.labels + labels + extra
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def prometheus(self):
+        """
+        Returns the counters, gauges and histograms in the Prometheus text exposition format.
+        """
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                header(name, 'counter')
+                lines.append(f'{name}{self._label_text(labels)} {value}')
+            for (name, labels), value in sorted(self.gauges.items()):
+                header(name, 'gauge')
+                lines.append(f'{name}{self._label_text(labels)} {value}')
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                header(name, 'histogram')
+                for bound, seen in histogram.cumulative():
+                    lines.append(f'{name}_bucket{self._label_text(labels, (("le", bound),))} {seen}')
+                lines.append(f'{name}_sum{self._label_text(labels)} {histogram.sum}')
+                lines.append(f'{name}_count{self._label_text(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, folder='data/metrics', name='metrics'):
+        """
+        Writes the report to <folder>/<name>.json and <folder>/<name>.prom. Each file is written
+        under a temporary name and then renamed, so a collector never reads half a file.
+
+        Returns:
+            tuple: Paths of the JSON report and of the Prometheus text file.
+        """
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+        for extension, text in (('json', json.dumps(self.report(), indent=2)), ('prom', self.prometheus())):
+            path = os.path.join(folder, f'{name}.{extension}')
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(path + '.tmp', path)
+            paths.append(path)
+        return tuple(paths)
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+from domain.models import Artist, TrackSnapshot
+
+SCHEMA_VERSION = 4
+
+SNAPSHOT_COLUMNS = 'artist_id, song_id, song_name, popularity, album, insertion_date'
+
+
+class SnapshotReader:
+    """
+    Read-only access to the artists and the latest_top_tracks snapshot through the standard
+    sqlite3 module, for query runs that should not pay for importing SQLAlchemy or running
+    the schema migration. Offers the same query methods as Database.
+
+    Args:
+        path (str): Database file written by Database.
+        check_same_thread (bool): Forwarded to sqlite3.connect. Pass False when the caller
+            serializes access from several threads itself.
+    """
+    def __init__(self, path='data/spotify_data.db', check_same_thread=True):
+        self.path = path
+        self.connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=check_same_thread)
+
+    @staticmethod
+    def available(path='data/spotify_data.db'):
+        """
+        Tells whether the database file exists and was already migrated to the current schema,
+        so it can be read without going through Database.
+
+        Args:
+            path (str): Database file.
+
+        Returns:
+            bool: True if the file can be read by SnapshotReader.
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+            try:
+                return connection.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        self.connection.close()
+
+    def data_version(self):
+        """
+        Returns SQLite's data_version, which changes whenever another connection commits to the database.
+        """
+        return self.connection.execute('PRAGMA data_version').fetchone()[0]
+
+    def latest_insertion_date(self):
+        """
+        Returns the most recent insertion_date in the latest_top_tracks snapshot, or None if it is empty.
+        """
+        return self.connection.execute('SELECT max(insertion_date) FROM latest_top_tracks').fetchone()[0]
+
+    def query_artists_data(self, filter_list):
+        """
+        Search for artists in the database by name (case-insensitive) or exact ID.
+
+        Args:
+            filter_list (list): List of artist names or IDs.
+
+        Return:
+            list: List of found Artist objects.
+        """
+        if not filter_list:
+            rows = self.connection.execute('SELECT artist_name, artist_id FROM artists').fetchall()
+        else:
+            names = ', '.join('?' * len(filter_list))
+            rows = self.connection.execute(
+                f'SELECT artist_name, artist_id FROM artists '
+                f'WHERE lower(artist_name) IN ({names}) OR artist_id IN ({names})',
+                [name.lower() for name in filter_list] + list(filter_list)
+            ).fetchall()
+        return [Artist(*row) for row in rows]
+
+    def query_latest_top_tracks(self, artist_ids=None, batch_size=500):
+        """
+        Search for the most recent top tracks of many artists at once in the latest_top_tracks snapshot.
+
+        Args:
+            artist_ids (list): Artist IDs. None returns every artist.
+            batch_size (int): IDs sent per query, keeping below the SQLite variable limit.
+
+        Returns:
+            dict: Artist ID -> list of TrackSnapshot objects, ordered by popularity (descending).
+        """
+        columns = SNAPSHOT_COLUMNS
+        if artist_ids is None:
+            statements = [(f'SELECT {columns} FROM latest_top_tracks ORDER BY artist_id, popularity DESC', [])]
+        else:
+            artist_ids = list(artist_ids)
+            statements = []
+            for start in range(0, len(artist_ids), batch_size):
+                batch = artist_ids[start:start + batch_size]
+                statements.append((
+                    f'SELECT {columns} FROM latest_top_tracks WHERE artist_id IN ({", ".join("?" * len(batch))}) '
+                    f'ORDER BY artist_id, popularity DESC',
+                    batch
+                ))
+
+        tracks_by_artist = {}
+        for statement, parameters in statements:
+            for row in self.connection.execute(statement, parameters):
+                track = TrackSnapshot(*row)
+                tracks_by_artist.setdefault(track.artist_id, []).append(track)
+        return tracks_by_artist
+
+    def display_artists(self):
+        """
+        Displays all registered artists in the database, sorted alphabetically.
+        """
+        all_artists = self.query_artists_data([])
+        if not all_artists:
+            raise RuntimeError('No artists found in database. Run with --artists_json to update data.')
+        print('\nAll artists in database:\n')
+        for artist in sorted(all_artists, key=lambda a: a.name.lower()):
+            print(f'{artist.artist_id} - {artist.name}')
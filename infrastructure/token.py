@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from domain.models import Token
+
+
+class TokenManager:
+    """
+    Keeps the Spotify access token of one client valid for every thread of a run.
+
+    A token is refreshed in the background once it gets within skew seconds of its expiry, while
+    requests keep using it, so requests are not held up at the expiry boundary. When no valid token
+    is left, a single thread requests a new one while the others wait for it instead of all calling
+    the token endpoint. Tokens are saved with their expiry in a JSON file readable only by its owner,
+    so short runs and --processes workers reuse them without a round trip.
+
+    Args:
+        request_token (callable): Requests a new Token from the token endpoint, returning None on failure.
+        client_id (str): Client the tokens belong to. A cached token of another client is ignored.
+        path (str): JSON file caching the token. None disables the disk cache.
+        skew (float): Seconds before expiry at which the token is refreshed.
+        retry_delay (float): Seconds to wait after a failed refresh before trying again.
+    """
+    def __init__(self, request_token, client_id=None, path=None, skew=60, retry_delay=5):
+        self.request_token = request_token
+        self.client = hashlib.sha256(str(client_id).encode('utf-8')).hexdigest()[:16]
+        self.path = path
+        self.skew = skew
+        self.retry_delay = retry_delay
+        self.refreshes = 0
+        self._token = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._next_attempt = 0.0
+
+    def get(self):
+        """
+        Returns a valid access token, starting a background refresh when it is about to expire.
+
+        Returns:
+            str: Access token.
+        """
+        token = self._token
+        if token is not None and token.valid:
+            if token.expires_within(self.skew):
+                self._refresh_in_background()
+            return token.token
+
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                self._token = self._load()
+            if self._token is None or not self._token.valid:
+                self._token = None
+                # After a failed refresh, threads waiting for the lock fail fast instead of each
+                # calling the token endpoint again, until retry_delay has passed.
+                if time.monotonic() >= self._next_attempt and self._refresh() is None:
+                    self._next_attempt = time.monotonic() + self.retry_delay
+            if self._token is None:
+                raise RuntimeError('Could not obtain a Spotify access token.')
+            return self._token.token
+
+    def invalidate(self, token):
+        """
+        Drops the given token after the API rejected it with 401, so the next get requests a new
+        one. Threads rejected with the same token only cause one refresh.
+
+        Args:
+            token (str): Token the API rejected.
+        """
+        with self._lock:
+            if self._token is not None and self._token.token == token:
+                self._token = None
+
+    def _refresh(self):
+        """
+        Requests a new token and saves it. Called with the lock held.
+        """
+        token = self.request_token()
+        if token is not None:
+            self._save(token)
+            self._token = token
+            self.refreshes += 1
+        return token
+
+    def _refresh_in_background(self):
+        """
+        Starts a thread refreshing the token, unless one is running or the last attempt failed recently.
+        """
+        with self._lock:
+            if self._refreshing or time.monotonic() < self._next_attempt:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self):
+        with self._lock:
+            try:
+                if self._token is None or self._token.expires_within(self.skew):
+                    if self._refresh() is None:
+                        self._next_attempt = time.monotonic() + self.retry_delay
+            finally:
+                self._refreshing = False
+
+    def _load(self):
+        """
+        Returns the token cached on disk for this client, or None if there is none or it expires within skew.
+        """
+        if self.path is None:
+            return None
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached['client'] != self.client:
+                return None
+            token = Token(cached['access_token'], cached['expires_in'], cached['created'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return None if token.expires_within(self.skew) else token
+
+    def _save(self, token):
+        """
+        Writes the token to the disk cache with owner-only permissions, replacing the previous file at once.
+        """
+        if self.path is None:
+            return
+        try:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            temporary = f'{self.path}.{os.getpid()}.tmp'
+            descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                json.dump({'client': self.client, 'access_token': token.token,
+                           'expires_in': token._expires_in, 'created': token._creation_time}, f)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            print(f'Error caching token: {e}')
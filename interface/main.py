@@ -1,31 +1,245 @@
 import argparse
-from infrastructure.api import SpotifyAPI
-from infrastructure.database import Database
-from application.update_data import UpdateDataUseCase
+import multiprocessing
+import sys
+from contextlib import nullcontext, redirect_stdout
+from functools import partial
 from application.query_data import QueryDataUseCase
+from infrastructure.reader import SnapshotReader
+from interface.output import FORMATS, write_results
 
+# Methods timed by --metrics, per component. Names an object lacks (e.g. SnapshotReader) are skipped.
+INSTRUMENTED = {
+    'api': ['_request_token', '_get_json', 'search_artist', 'search_artists_by_ids', 'search_top_tracks'],
+    'http': ['request'],
+    'cache': ['lookup', 'store', 'revalidated'],
+    'database': ['check_data_date', 'query_artist_ids', 'insert_artist_aliases', 'insert_results', '_upsert_rows',
+                 '_refresh_latest', 'create_csv', 'insert_csv_data_to_database', 'rebuild_latest_top_tracks', 'export_history',
+                 'load_history', 'query_artists_data', 'query_latest_top_tracks'],
+    'jobs': ['enqueue', 'claim', 'finish', 'release'],
+    'update': ['resolve_known_artists', 'fetch_artist', 'run_pipeline', 'process_jobs', 'execute'],
+    'query': ['iter_results'],
+    'analytics': ['execute']
+}
 
-def main(spotify_client_id, spotify_client_secret, artists_json, filter):
-    try:   
-        api = SpotifyAPI(spotify_client_id, spotify_client_secret)
-        database = Database()
+# Instrumented methods returning the number of rows they wrote, counted in spotify_rows_written_total.
+ROW_COUNTS = {'database': ['_upsert_rows']}
 
-        if artists_json is not None:
-            usecase = UpdateDataUseCase(api, database.check_data_date, database.create_csv, database.insert_csv_data_to_database)
-            usecase.execute(artists_json)
-        else:
-            print('Direct query: existing data from database will be used.')
 
-        database.display_artists()
+def create_update_usecase(database, spotify_client_id, spotify_client_secret, workers, rate_limit, request_budget,
+                          use_cache, cache_ttl, export_csv, max_age_hours, batch_size, jobs, metrics=None, token_skew=60):
+    """
+    Builds the update use case with its own API client, HTTP cache and request scheduler, all of
+    them instrumented when metrics are given.
+    """
+    from infrastructure.api import SpotifyAPI, RequestScheduler
+    from infrastructure.cache import ResponseCache
+    from application.update_data import UpdateDataUseCase
 
-        usecase = QueryDataUseCase(database.query_artists_data, database.query_top_tracks_data, filter)
-        result = usecase.execute()
+    scheduler = RequestScheduler(rate=rate_limit, budget=request_budget)
+    cache = ResponseCache(ttl=cache_ttl) if use_cache else None
+    api = SpotifyAPI(spotify_client_id, spotify_client_secret, pool_size=workers, scheduler=scheduler, cache=cache,
+                     token_cache='data/token.json', token_skew=token_skew)
+    if metrics is not None:
+        metrics.instrument(api, 'api', INSTRUMENTED['api'])
+        metrics.instrument(scheduler, 'http', INSTRUMENTED['http'])
+        if cache:
+            metrics.instrument(cache, 'cache', INSTRUMENTED['cache'])
+        metrics.instrument(jobs, 'jobs', INSTRUMENTED['jobs'])
+    check_data_date = partial(database.check_data_date, max_age_hours=max_age_hours)
+    usecase = UpdateDataUseCase(api, check_data_date, database.insert_results,
+                                database.create_csv if export_csv else None, workers,
+                                database.query_artist_ids, batch_size=batch_size, jobs=jobs,
+                                save_artist_ids=database.insert_artist_aliases)
+    if metrics is not None:
+        metrics.instrument(usecase, 'update', INSTRUMENTED['update'])
+    return usecase, cache
 
-        print(result)
-            
+
+def record_update_stats(metrics, usecase, cache):
+    """
+    Adds the request, retry, token refresh and HTTP cache counters of an update, and the refresh job counts, to the metrics.
+    """
+    scheduler = usecase.spotify_api.scheduler
+    metrics.count('spotify_http_requests_total', scheduler.sent)
+    metrics.count('spotify_http_retries_total', scheduler.retries)
+    metrics.count('spotify_http_throttled_total', scheduler.throttled)
+    metrics.count('spotify_token_refreshes_total', usecase.spotify_api.tokens.refreshes)
+    if cache:
+        stats = cache.stats()
+        for result in ('hits', 'misses', 'revalidations'):
+            metrics.count('spotify_http_cache_total', stats[result], result=result)
+        metrics.count('spotify_http_cache_bytes_saved_total', stats['bytes_saved'])
+    for status, jobs in usecase.jobs.counts().items():
+        metrics.gauge('spotify_refresh_jobs', jobs, status=status)
+
+
+def refresh_worker(run_id, spotify_client_id, spotify_client_secret, workers, rate_limit, request_budget,
+                   use_cache, cache_ttl, batch_size, index=0, metrics_folder=None, token_skew=60, lease_seconds=600):
+    """
+    Entry point of each --processes worker: processes the refresh jobs of the run with its own
+    database connection and API client until none is left. With metrics_folder, the worker writes
+    its own report, metrics_worker<index>.json/.prom, labelled with its index.
+    """
+    from infrastructure.database import Database
+    from infrastructure.jobs import RefreshQueue
+
+    metrics = None
+    database = Database()
+    if metrics_folder is not None:
+        from infrastructure.metrics import Metrics
+
+        metrics = Metrics(labels={'worker': index})
+        metrics.instrument(database, 'database', INSTRUMENTED['database'], ROW_COUNTS['database'])
+    jobs = RefreshQueue(database, run_id, lease_seconds=lease_seconds)
+    usecase, cache = create_update_usecase(database, spotify_client_id, spotify_client_secret, workers, rate_limit,
+                                           request_budget, use_cache, cache_ttl, False, None, batch_size, jobs,
+                                           metrics, token_skew)
+    try:
+        usecase.process_jobs()
     except Exception as e:
-        print(e)
-        return
+        print(f'Worker {jobs.worker} stopped: {e}')
+    finally:
+        if metrics is not None:
+            record_update_stats(metrics, usecase, cache)
+            metrics.write(metrics_folder, f'metrics_worker{index}')
+
+
+def main(spotify_client_id, spotify_client_secret, artists_json, filter, workers=1, rate_limit=None, request_budget=None,
+         use_cache=True, cache_ttl=6 * 3600, export_csv=False, import_csv=None, max_age_hours=None,
+         rebuild_latest=False, serve=False, host='127.0.0.1', port=8000, cache_size=1024, export_history=None,
+         trends=False, trend_window=7, trend_days=7, output_format='python', list_partitions=False,
+         drop_partition=None, archive_partition=None, batch_size=100, processes=1, metrics_folder=None,
+         token_skew=60, lease_seconds=600):
+    stdout = sys.stdout
+    metrics = None
+    machine_output = output_format != 'python'
+
+    # With --format json/ndjson, stdout only carries the results; progress messages go to stderr.
+    with redirect_stdout(sys.stderr) if machine_output else nullcontext():
+        try:
+            # SQLAlchemy, requests and the schema migration are only loaded by runs that write, export or analyze.
+            # Pure queries read an already migrated database through the sqlite3 SnapshotReader.
+            maintenance = rebuild_latest or list_partitions or drop_partition is not None or archive_partition is not None
+            if artists_json is None and import_csv is None and not maintenance and export_history is None and not trends \
+                    and SnapshotReader.available():
+                database = SnapshotReader()
+            else:
+                from infrastructure.database import Database
+                database = Database()
+
+            if metrics_folder is not None:
+                from infrastructure.metrics import Metrics
+
+                metrics = Metrics()
+                metrics.instrument(database, 'database', INSTRUMENTED['database'], ROW_COUNTS['database'])
+
+            if import_csv is not None:
+                database.insert_csv_data_to_database(import_csv)
+                print(f'CSV files from {import_csv} imported into /data/spotify_data.db.')
+
+            if rebuild_latest:
+                database.rebuild_latest_top_tracks()
+                print('Latest top tracks snapshot rebuilt from history.')
+
+            if archive_partition is not None:
+                path = database.archive_partition(archive_partition)
+                print(f'History of {archive_partition} archived to {path} and dropped.')
+
+            if drop_partition is not None:
+                database.drop_partition(drop_partition)
+                print(f'History of {drop_partition} dropped.')
+
+            if list_partitions:
+                print('\nHistory partitions:\n')
+                for month, rows in database.partitions():
+                    print(f'{month} - {rows} rows')
+
+            if artists_json is not None:
+                from infrastructure.jobs import RefreshQueue
+
+                if processes > 1 and export_csv:
+                    raise RuntimeError('--export_csv cannot be combined with --processes.')
+                jobs = RefreshQueue(database, RefreshQueue.run_id_for(artists_json), lease_seconds=lease_seconds)
+                # --rate_limit and --request_budget are shared between the processes.
+                rate = rate_limit / processes if rate_limit else rate_limit
+                budget = request_budget // processes if request_budget else request_budget
+                usecase, cache = create_update_usecase(database, spotify_client_id, spotify_client_secret, workers,
+                                                       rate, budget, use_cache, cache_ttl, export_csv, max_age_hours,
+                                                       batch_size, jobs, metrics, token_skew)
+                if processes == 1:
+                    try:
+                        usecase.execute(artists_json)
+                    finally:
+                        if metrics is not None:
+                            record_update_stats(metrics, usecase, cache)
+                    if cache:
+                        print(f'HTTP cache: {cache.stats()}')
+                elif not usecase.enqueue(artists_json):
+                    print('Data already updated. No new search will be executed.')
+                else:
+                    print(f'Searching with {processes} processes...')
+                    context = multiprocessing.get_context('spawn')
+                    pool = [context.Process(target=refresh_worker, args=(
+                        jobs.run_id, spotify_client_id, spotify_client_secret, workers, rate, budget, use_cache,
+                        cache_ttl, batch_size, index, metrics_folder, token_skew, lease_seconds
+                    )) for index in range(processes)]
+                    for process in pool:
+                        process.start()
+                    for process in pool:
+                        process.join()
+                    if metrics is not None:
+                        record_update_stats(metrics, usecase, cache)
+                    counts = jobs.counts()
+                    print(f'Refresh jobs: {counts}')
+                    usecase.warn_in_progress(counts)
+            else:
+                print('Direct query: existing data from database will be used.')
+
+            if export_history is not None:
+                rows = database.export_history(export_history)
+                print(f'{rows} history rows exported to {export_history}.')
+
+            if trends:
+                from application.analytics import AnalyticsUseCase
+
+                usecase = AnalyticsUseCase(database.load_history, window=trend_window, days=trend_days)
+                if metrics is not None:
+                    metrics.instrument(usecase, 'analytics', INSTRUMENTED['analytics'])
+                print(usecase.execute())
+
+            if serve:
+                from interface.server import QueryService, create_server
+
+                if not SnapshotReader.available():
+                    raise RuntimeError('No database found. Run with --artists_json to update data.')
+                server = create_server(QueryService(SnapshotReader(check_same_thread=False), cache_size), host, port)
+                print(f'Serving queries on http://{host}:{server.server_address[1]}/query?filter=<names or IDs>')
+                try:
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    server.server_close()
+                return
+
+            if not machine_output:
+                database.display_artists()
+
+            # With --format json/ndjson there is no prompt: a missing --filter means every artist.
+            usecase = QueryDataUseCase(database.query_artists_data, database.query_latest_top_tracks, filter,
+                                       ask=not machine_output)
+            if metrics is not None:
+                metrics.instrument(usecase, 'query', INSTRUMENTED['query'])
+            write_results(usecase.iter_results(), output_format, stdout)
+
+        except Exception as e:
+            print(e)
+            return
+
+        finally:
+            if metrics is not None:
+                paths = metrics.write(metrics_folder)
+                print(f'Metrics written to {paths[0]} and {paths[1]}.')
 
 
 if __name__ == '__main__':
@@ -34,8 +248,66 @@ if __name__ == '__main__':
     parser.add_argument('--secret', type=str, required=False)
     parser.add_argument('--artists_json', type=str, required=False)
     parser.add_argument('--filter', type=str, required=False, help='Names or IDs separated by comma')
+    parser.add_argument('--workers', type=int, default=1, help='Number of artists fetched concurrently')
+    parser.add_argument('--rate_limit', type=float, required=False, help='Maximum Spotify API requests per second')
+    parser.add_argument('--request_budget', type=int, required=False, help='Maximum Spotify API requests in this run')
+    parser.add_argument('--no_cache', action='store_true', help='Disable the on-disk HTTP response cache')
+    parser.add_argument('--cache_ttl', type=float, default=6 * 3600, help='Seconds a cached response is used without revalidation')
+    parser.add_argument('--token_skew', type=float, default=60,
+                        help='Seconds before expiry at which the Spotify access token is refreshed in the background')
+    parser.add_argument('--export_csv', action='store_true', help='Also write the search results to /data/search_results_<date>.csv')
+    parser.add_argument('--import_csv', type=str, required=False, help='Folder with search_results CSV files to load into the database')
+    parser.add_argument('--processes', type=int, default=1, help='Processes sharing the update through the refresh_jobs queue')
+    parser.add_argument('--lease_seconds', type=float, default=600,
+                        help='Seconds after which artists left in progress by a stopped run are fetched again')
+    parser.add_argument('--batch_size', type=int, default=100, help='Artists saved per transaction while an update runs')
+    parser.add_argument('--max_age_hours', type=float, required=False, help='Refresh only artists whose data is older than this many hours')
+    parser.add_argument('--rebuild_latest', action='store_true', help='Regenerate the latest top tracks snapshot from history')
+    parser.add_argument('--partitions', action='store_true', help='List the monthly partitions of the top tracks history')
+    parser.add_argument('--drop_partition', type=str, required=False, help='Drop the history of a month, given as YYYYMM')
+    parser.add_argument('--archive_partition', type=str, required=False,
+                        help='Move the history of a month, given as YYYYMM, to data/archive/top_tracks_YYYYMM.db')
+    parser.add_argument('--export_history', type=str, required=False,
+                        help='Export the top tracks history as NumPy columns to this folder, or to a compressed .npz file')
+    parser.add_argument('--trends', action='store_true', help='Print the tracks whose popularity rose the most')
+    parser.add_argument('--trend_window', type=int, default=7, help='Snapshots in the rolling popularity average')
+    parser.add_argument('--trend_days', type=int, default=7, help='Days over which rising tracks are measured')
+    parser.add_argument('--format', type=str, choices=FORMATS, default='python',
+                        help='Output of the query: python dict, a JSON object or one JSON object per artist and line')
+    parser.add_argument('--metrics', type=str, required=False,
+                        help='Time the run and write metrics.json and metrics.prom (Prometheus text) to this folder')
+    parser.add_argument('--serve', action='store_true', help='Answer queries over HTTP as JSON instead of printing one result')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address the query server binds to')
+    parser.add_argument('--port', type=int, default=8000, help='Port the query server listens on')
+    parser.add_argument('--cache_size', type=int, default=1024, help='Entries kept in each query server cache')
     args = parser.parse_args()
     main(args.id,
          args.secret,
          args.artists_json,
-         args.filter)
+         args.filter,
+         args.workers,
+         args.rate_limit,
+         args.request_budget,
+         not args.no_cache,
+         args.cache_ttl,
+         args.export_csv,
+         args.import_csv,
+         args.max_age_hours,
+         args.rebuild_latest,
+         args.serve,
+         args.host,
+         args.port,
+         args.cache_size,
+         args.export_history,
+         args.trends,
+         args.trend_window,
+         args.trend_days,
+         args.format,
+         args.partitions,
+         args.drop_partition,
+         args.archive_partition,
+         args.batch_size,
+         args.processes,
+         args.metrics,
+         args.token_skew,
+         args.lease_seconds)
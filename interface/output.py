@@ -0,0 +1,71 @@
+import json
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATS = ['python', 'json', 'ndjson']
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def encode(value):
+    """
+    Encodes a value as compact JSON text, with orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return _encoder.encode(value)
+
+
+def _iso_dates(entry, cache):
+    """
+    Rewrites the insertion_date of every track as an ISO 8601 timestamp ('2024-07-22T09:09:44.331729').
+    Dates are parsed once per distinct value, as all tracks of a run share the same one.
+    """
+    for track in entry['top_tracks']:
+        value = track['insertion_date']
+        if value not in cache:
+            try:
+                cache[value] = (value if isinstance(value, datetime) else datetime.fromisoformat(str(value))).isoformat()
+            except ValueError:
+                cache[value] = value
+        track['insertion_date'] = cache[value]
+    return entry
+
+
+def write_results(results, output_format, stream):
+    """
+    Writes query results to a stream as they are produced.
+
+    Args:
+        results (iterable): (artist name, entry) pairs, as yielded by QueryDataUseCase.iter_results.
+        output_format (str): 'python' prints the result dict repr, 'json' streams a single JSON object
+            keyed by artist name and 'ndjson' writes one JSON object per artist and line. In json, an
+            artist sharing the name of one already written is keyed '<name> (<artist ID>)' instead.
+        stream (file): Text stream to write to.
+    """
+    if output_format == 'python':
+        print(dict(results), file=stream)
+        return
+
+    cache = {}
+    if output_format == 'ndjson':
+        for name, entry in results:
+            stream.write(encode({'artist_name': name, **_iso_dates(entry, cache)}))
+            stream.write('\n')
+        return
+
+    keys = set()
+    stream.write('{')
+    for position, (name, entry) in enumerate(results):
+        if position:
+            stream.write(',')
+        key = name if name not in keys else f"{name} ({entry['id']})"
+        keys.add(key)
+        stream.write(encode(key))
+        stream.write(':')
+        stream.write(encode(_iso_dates(entry, cache)))
+    stream.write('}\n')
@@ -0,0 +1,205 @@
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from application.query_data import QueryDataUseCase
+
+
+class LRUCache:
+    """
+    Thread-safe least recently used cache.
+
+    Args:
+        max_entries (int): Entries kept before the least recently used one is evicted. 0 disables caching.
+    """
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key, or default if it is not cached.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Caches value under key, evicting the least recently used entry when full.
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class QueryService:
+    """
+    Runs QueryDataUseCase for the query server, caching the artists matched by each filter term
+    and the top tracks of each artist. Both caches are dropped as soon as another connection
+    commits to the database, e.g. an update or CSV import writing new insertion_date data.
+
+    Args:
+        reader (SnapshotReader): Read-only database access, opened with check_same_thread=False.
+        cache_size (int): Entries kept in each cache.
+    """
+    def __init__(self, reader, cache_size=1024):
+        self.reader = reader
+        self.artists = LRUCache(cache_size)
+        self.tracks = LRUCache(cache_size)
+        self.invalidations = 0
+        self._data_version = None
+        self._lock = threading.Lock()
+
+    def _check_data_version(self):
+        """
+        Clears the caches if the database changed since the last request.
+        """
+        data_version = self.reader.data_version()
+        if data_version != self._data_version:
+            if self._data_version is not None:
+                self.invalidations += 1
+            self._data_version = data_version
+            self.artists.clear()
+            self.tracks.clear()
+
+    def query_artists(self, filter_list):
+        """
+        Cached query_artists_data: each filter term is looked up in the database only once.
+        An empty filter list (every artist) is cached under None.
+        """
+        if not filter_list:
+            artists = self.artists.get(None)
+            if artists is None:
+                artists = self.reader.query_artists_data([])
+                self.artists.put(None, artists)
+            return artists
+
+        matches = {term: self.artists.get(term) for term in filter_list}
+        missing = [term for term, artists in matches.items() if artists is None]
+        if missing:
+            found = self.reader.query_artists_data(missing)
+            for term in missing:
+                matches[term] = [artist for artist in found
+                                 if artist.name.lower() == term.lower() or artist.artist_id == term]
+                self.artists.put(term, matches[term])
+
+        artists = {}
+        for term in filter_list:
+            for artist in matches[term]:
+                artists.setdefault(artist.artist_id, artist)
+        return list(artists.values())
+
+    def query_tracks(self, artist_ids):
+        """
+        Cached query_latest_top_tracks: only artists missing from the cache are read from the database.
+        """
+        tracks_by_artist = {}
+        missing = []
+        for artist_id in artist_ids:
+            tracks = self.tracks.get(artist_id)
+            if tracks is None:
+                missing.append(artist_id)
+            else:
+                tracks_by_artist[artist_id] = tracks
+
+        if missing:
+            found = self.reader.query_latest_top_tracks(missing)
+            for artist_id in missing:
+                tracks_by_artist[artist_id] = found.get(artist_id, [])
+                self.tracks.put(artist_id, tracks_by_artist[artist_id])
+        return tracks_by_artist
+
+    def execute(self, filter):
+        """
+        Returns the QueryDataUseCase result for a comma separated filter of names or IDs.
+        """
+        with self._lock:
+            self._check_data_version()
+            return QueryDataUseCase(self.query_artists, self.query_tracks, filter or '').execute()
+
+    def stats(self):
+        """
+        Returns the cache counters and the most recent insertion_date served.
+        """
+        with self._lock:
+            latest = self.reader.latest_insertion_date()
+        return {
+            'latest_insertion_date': latest,
+            'artist_cache': {'entries': len(self.artists), 'hits': self.artists.hits, 'misses': self.artists.misses},
+            'track_cache': {'entries': len(self.tracks), 'hits': self.tracks.hits, 'misses': self.tracks.misses},
+            'invalidations': self.invalidations
+        }
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /query?filter=<names or IDs separated by comma> returns the query result as JSON.
+    GET /stats returns the cache counters.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            if url.path == '/query':
+                filter = parse_qs(url.query).get('filter', [''])[0]
+                self._send_json(200, self.server.service.execute(filter))
+            elif url.path == '/stats':
+                self._send_json(200, self.server.service.stats())
+            else:
+                self._send_json(404, {'error': f'Unknown path {url.path}'})
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(service, host='127.0.0.1', port=8000):
+    """
+    Creates the threaded HTTP server answering queries with the given QueryService.
+
+    Args:
+        service (QueryService): Service answering the requests.
+        host (str): Address to bind.
+        port (int): Port to bind. 0 picks a free port.
+
+    Returns:
+        ThreadingHTTPServer: Server, not yet serving.
+    """
+    server = ThreadingHTTPServer((host, port), QueryRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
@@ -1,17 +1,33 @@
 import unittest
-from unittest.mock import patch, mock_open
+from unittest.mock import patch, mock_open, MagicMock
 import json
 import os
 import csv
-from infrastructure.api import SpotifyAPI
-from infrastructure.database import Database, session, Artists, TopTracks
-from domain.models import Artist, Track, Token
-from datetime import date
+import tempfile
+import time
+from infrastructure.api import SpotifyAPI, RequestScheduler
+from infrastructure.cache import ResponseCache
+from infrastructure.reader import SnapshotReader, SCHEMA_VERSION
+from infrastructure.columnar import load_history, build_history, np
+from infrastructure.jobs import RefreshQueue
+from infrastructure.metrics import Histogram, Metrics
+from infrastructure.token import TokenManager
+from infrastructure.database import Database, create_database_engine, Artists, TopTracks, IngestedFiles, LatestTopTracks, RefreshJobs, migrate, top_tracks_history
+from sqlalchemy import create_engine, inspect, text, select
+from sqlalchemy.orm import sessionmaker
+from application.update_data import UpdateDataUseCase
+from application.query_data import QueryDataUseCase
+from application.analytics import AnalyticsUseCase, compute_trends
+from interface.server import LRUCache, QueryService, create_server
+import interface.output as output
+from domain.models import Artist, Track, TrackSnapshot, Token
+from datetime import date, datetime, timedelta
 from io import StringIO
 from contextlib import redirect_stdout
+from dataclasses import replace
 
 class TestsSpotifyAPI(unittest.TestCase):
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_request_token(self, mock_post):
         """
         Tests if the _request_token method returns a valid Token object when receiving API response.
@@ -40,8 +56,23 @@ class TestsSpotifyAPI(unittest.TestCase):
         self.assertEqual(token_obj._expires_in, 3600)
         self.assertTrue(token_obj.valid)
 
-    @patch('requests.post')
-    @patch('requests.get')
+    @patch('requests.Session.post')
+    def test_token_requested_on_first_use(self, mock_post):
+        """
+        Tests if SpotifyAPI only requests the token when it is first needed.
+        """
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {'access_token': 'ABCD1234', 'expires_in': 3600}
+
+        api = SpotifyAPI('my_client_id', 'my_client_secret')
+        mock_post.assert_not_called()
+
+        self.assertEqual(api.token, 'ABCD1234')
+        self.assertEqual(api.token, 'ABCD1234')
+        self.assertEqual(mock_post.call_count, 1)
+
+    @patch('requests.Session.post')
+    @patch('requests.Session.get')
     def test_search_artist(self, mock_get, mock_post):
         """
         Tests if search_artist correctly returns the Artist object when querying the Spotify API.
@@ -73,8 +104,8 @@ class TestsSpotifyAPI(unittest.TestCase):
             params={'q': 'Linkin Park', 'type': 'artist', 'limit': 1}
         )
 
-    @patch('requests.get')
-    @patch('requests.post')
+    @patch('requests.Session.get')
+    @patch('requests.Session.post')
     def test_search_top_tracks(self, mock_post, mock_get):
         """
         Tests if search_top_tracks correctly returns the information of the artist's most popular tracks.
@@ -131,9 +162,268 @@ class TestsSpotifyAPI(unittest.TestCase):
         self.assertEqual(track2.track_id, '654321ebca')
  
 
+    @patch('requests.Session.get')
+    @patch('requests.Session.post')
+    def test_search_artists_by_ids(self, mock_post, mock_get):
+        """
+        Tests if search_artists_by_ids batches IDs 50 per request and skips IDs unknown to Spotify.
+        """
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {
+            'access_token': 'ABCD1234',
+            'expires_in': 3600
+            }
+
+        artist_ids = [f'id{i}' for i in range(60)]
+        first_batch = MagicMock(status_code = 200)
+        first_batch.json.return_value = {'artists': [{'id': i, 'name': f'Artist {i}'} for i in artist_ids[:50]]}
+        second_batch = MagicMock(status_code = 200)
+        second_batch.json.return_value = {'artists': [{'id': i, 'name': f'Artist {i}'} for i in artist_ids[50:59]] + [None]}
+        mock_get.side_effect = [first_batch, second_batch]
+
+        api = SpotifyAPI('my_client_id', 'my_client_secret')
+        artists = api.search_artists_by_ids(artist_ids)
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args_list[1].kwargs['params'], {'ids': ','.join(artist_ids[50:])})
+        self.assertEqual(len(artists), 59)
+        self.assertEqual(artists[0], Artist(name = 'Artist id0', artist_id = 'id0'))
+
+    @patch('requests.Session.get')
+    @patch('requests.Session.post')
+    def test_search_top_tracks_cached(self, mock_post, mock_get):
+        """
+        Tests if cached responses are served while fresh and revalidated with If-None-Match once stale.
+        """
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {
+            'access_token': 'ABCD1234',
+            'expires_in': 3600
+            }
+
+        payload = {'tracks': [{'name': 'Numb', 'popularity': 90, 'album': {'name': 'Meteora'}, 'id': 'def'}]}
+        downloaded = MagicMock(status_code = 200, text = json.dumps(payload), headers = {'ETag': '"v1"'})
+        downloaded.json.return_value = payload
+        not_modified = MagicMock(status_code = 304, headers = {'ETag': '"v1"'})
+        mock_get.side_effect = [downloaded, not_modified]
+
+        cache_path = 'http_cache_test.db'
+        cache = ResponseCache(cache_path, ttl = 3600)
+        api = SpotifyAPI('my_client_id', 'my_client_secret', cache = cache)
+        artist = Artist(name = 'Linkin Park', artist_id = 'artist_id')
+
+        api.search_top_tracks(artist)
+        result = api.search_top_tracks(artist)
+        self.assertEqual(mock_get.call_count, 1)
+
+        # A run answered from fresh cache entries never requests a token.
+        mock_post.reset_mock()
+        SpotifyAPI('my_client_id', 'my_client_secret', cache = cache).search_top_tracks(artist)
+        mock_post.assert_not_called()
+
+        cache.ttl = 0
+        result = api.search_top_tracks(artist)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args.kwargs['headers']['If-None-Match'], '"v1"')
+        self.assertEqual(result['top_tracks'][0].track_name, 'Numb')
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(cache.stats()['revalidations'], 1)
+
+        cache.close()
+        os.remove(cache_path)
+
+    def test_response_cache_eviction(self):
+        """
+        Tests if the response cache keeps at most max_entries, evicting the least recently used.
+        """
+        cache_path = 'http_cache_test.db'
+        cache = ResponseCache(cache_path, max_entries = 2)
+        for url in ['a', 'b']:
+            cache.store(url, None, MagicMock(text = '{}', headers = {}))
+        cache.lookup('a')
+        cache.store('c', None, MagicMock(text = '{}', headers = {}))
+
+        self.assertIsNotNone(cache.lookup('a'))
+        self.assertIsNone(cache.lookup('b'))
+        self.assertIsNotNone(cache.lookup('c'))
+
+        cache.close()
+        os.remove(cache_path)
+
+    @patch('time.sleep')
+    def test_scheduler_retries_rate_limited_requests(self, mock_sleep):
+        """
+        Tests if the scheduler waits for Retry-After on 429, retries 5xx and returns the final response.
+        """
+        throttled = MagicMock(status_code = 429, headers = {'Retry-After': '3'})
+        unavailable = MagicMock(status_code = 503, headers = {})
+        ok = MagicMock(status_code = 200, headers = {})
+        send = MagicMock(side_effect = [throttled, unavailable, ok])
+
+        scheduler = RequestScheduler(backoff = 0.5)
+        with redirect_stdout(StringIO()):
+            response = scheduler.request(send, 'https://api.spotify.com/v1/search', params = {'q': 'Linkin Park'})
+
+        self.assertIs(response, ok)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(scheduler.retries, 2)
+        self.assertEqual(scheduler.throttled, 1)
+        self.assertAlmostEqual(mock_sleep.call_args_list[0].args[0], 3, delta = 0.1)
+
+    @patch('time.sleep')
+    def test_scheduler_honors_long_retry_after(self, mock_sleep):
+        """
+        Tests if a Retry-After longer than max_backoff is waited in full, and if one longer than
+        max_retry_after is returned without retrying.
+        """
+        ok = MagicMock(status_code = 200, headers = {})
+        send = MagicMock(side_effect = [MagicMock(status_code = 429, headers = {'Retry-After': '120'}), ok])
+        scheduler = RequestScheduler(max_backoff = 60, max_retry_after = 600)
+        with redirect_stdout(StringIO()):
+            self.assertIs(scheduler.request(send, 'url'), ok)
+        self.assertAlmostEqual(mock_sleep.call_args_list[0].args[0], 120, delta = 0.1)
+
+        throttled = MagicMock(status_code = 429, headers = {'Retry-After': '7200'})
+        send = MagicMock(return_value = throttled)
+        with redirect_stdout(StringIO()):
+            self.assertIs(scheduler.request(send, 'url'), throttled)
+        self.assertEqual(send.call_count, 1)
+
+    def test_scheduler_budget(self):
+        """
+        Tests if the scheduler refuses to send requests once the run budget is spent.
+        """
+        send = MagicMock(return_value = MagicMock(status_code = 200))
+        scheduler = RequestScheduler(budget = 2)
+
+        scheduler.request(send, 'url')
+        scheduler.request(send, 'url')
+        with self.assertRaises(RuntimeError):
+            scheduler.request(send, 'url')
+        self.assertEqual(send.call_count, 2)
+
+    def test_token_manager_single_flight(self):
+        """
+        Tests if threads needing a token at the same time cause a single token request.
+        """
+        import threading
+        import time
+
+        calls = []
+
+        def request_token():
+            calls.append(1)
+            time.sleep(0.05)
+            return Token('ABCD1234', 3600)
+
+        manager = TokenManager(request_token)
+        tokens = []
+        threads = [threading.Thread(target=lambda: tokens.append(manager.get())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(tokens, ['ABCD1234'] * 8)
+
+    def test_token_manager_refresh_and_disk_cache(self):
+        """
+        Tests if a token close to expiry is still used while it is refreshed in the background, and
+        if the token cached on disk is reused by the same client only.
+        """
+        import stat
+        import time
+
+        tokens = iter([Token('old', 100), Token('new', 3600)])
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'token.json')
+            manager = TokenManager(lambda: next(tokens), 'client', path, skew=300)
+
+            self.assertEqual(manager.get(), 'old')
+            self.assertEqual(manager.get(), 'old')
+            for _ in range(100):
+                if manager.refreshes == 2:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(manager.get(), 'new')
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+
+            request_token = MagicMock(return_value = Token('other', 3600))
+            self.assertEqual(TokenManager(request_token, 'client', path, skew=300).get(), 'new')
+            request_token.assert_not_called()
+            self.assertEqual(TokenManager(request_token, 'other client', path, skew=300).get(), 'other')
+
+    def test_token_manager_failed_refresh(self):
+        """
+        Tests if an expired token is never returned when its refresh fails, and if threads asking
+        again within retry_delay fail without calling the token endpoint.
+        """
+        request_token = MagicMock(side_effect = [Token('old', 3600), None, Token('new', 3600)])
+        manager = TokenManager(request_token, skew=0, retry_delay=60)
+
+        self.assertEqual(manager.get(), 'old')
+        manager._token._creation_time -= 7200
+        with self.assertRaises(RuntimeError):
+            manager.get()
+        self.assertIsNone(manager._token)
+        with self.assertRaises(RuntimeError):
+            manager.get()
+        self.assertEqual(request_token.call_count, 2)
+
+        manager._next_attempt = 0.0
+        self.assertEqual(manager.get(), 'new')
+
+    @patch('requests.Session.get')
+    @patch('requests.Session.post')
+    def test_request_retried_on_unauthorized(self, mock_post, mock_get):
+        """
+        Tests if a request rejected with 401 is sent once more with a new token.
+        """
+        first, second = MagicMock(status_code = 200), MagicMock(status_code = 200)
+        first.json.return_value = {'access_token': 'expired', 'expires_in': 3600}
+        second.json.return_value = {'access_token': 'renewed', 'expires_in': 3600}
+        mock_post.side_effect = [first, second]
+
+        payload = {'artists': {'items': [{'name': 'Linkin Park', 'id': 'artist_id'}]}}
+        ok = MagicMock(status_code = 200)
+        ok.json.return_value = payload
+        mock_get.side_effect = [MagicMock(status_code = 401), ok]
+
+        api = SpotifyAPI('my_client_id', 'my_client_secret')
+        artist = api.search_artist('Linkin Park')
+
+        self.assertEqual(artist, Artist(name = 'Linkin Park', artist_id = 'artist_id'))
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(mock_get.call_args_list[0].kwargs['headers']['Authorization'], 'Bearer expired')
+        self.assertEqual(mock_get.call_args_list[1].kwargs['headers']['Authorization'], 'Bearer renewed')
+
+
 class TestsDatabase(unittest.TestCase):
     def setUp(self):
         self.database = Database()
+        self.session = sessionmaker(bind=self.database.engine)()
+
+    def tearDown(self):
+        self.session.close()
+
+    def history(self):
+        """
+        Returns every history row, from top_tracks and the monthly partitions, ordered by song ID.
+        """
+        with self.database.session_scope() as session:
+            history = top_tracks_history(session.connection())
+            return session.execute(select(history).order_by(history.c.song_id)).all()
+
+    def clear_history(self):
+        """
+        Deletes the top_tracks rows and drops every monthly partition.
+        """
+        self.session.query(TopTracks).delete()
+        self.session.commit()
+        for month, rows in self.database.partitions():
+            self.database.drop_partition(month)
 
     def test_check_data_date(self):
         """
@@ -142,14 +432,14 @@ class TestsDatabase(unittest.TestCase):
         creates temporary JSON, inserts Linkin Park data today, removes temporary JSON and clears database.
         
         """
-        session.query(TopTracks).delete()
-        session.query(Artists).delete()
-        session.commit()
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
 
         artist1 = Artists(artist_id = '1', artist_name = 'Linkin Park')
         artist2 = Artists(artist_id = '2', artist_name = 'Disturbed')
-        session.add_all([artist1, artist2])
-        session.commit()
+        self.session.add_all([artist1, artist2])
+        self.session.commit()
 
         self.json_path = 'artists_test.json'
         with open(self.json_path, 'w', encoding='utf-8') as f:
@@ -164,17 +454,48 @@ class TestsDatabase(unittest.TestCase):
              artist_id = '1',
              insertion_date = today
         )
-        session.add(track)
-        session.commit()
+        self.session.add(track)
+        self.session.commit()
 
         result = self.database.check_data_date(self.json_path)
         self.assertEqual(result, ['Disturbed'])
 
         if os.path.exists(self.json_path):
             os.remove(self.json_path)
-        session.query(TopTracks).delete()
-        session.query(Artists).delete()
-        session.commit()
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+    def test_check_data_date_max_age(self):
+        """
+        Tests if check_data_date with max_age_hours only keeps artists whose latest data is too old.
+        """
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+        self.session.add_all([Artists(artist_id = '1', artist_name = 'Linkin Park'),
+                         Artists(artist_id = '2', artist_name = 'Disturbed')])
+        now = datetime.now()
+        self.session.add_all([
+            TopTracks(song_name = 'Numb', song_id = 'def', popularity = 90, album = 'Meteora',
+                      artist_id = '1', insertion_date = str(now - timedelta(hours = 2))),
+            TopTracks(song_name = 'Stricken', song_id = 'jkl', popularity = 85, album = 'Ten Thousand Fists',
+                      artist_id = '2', insertion_date = str(now - timedelta(hours = 30)))
+        ])
+        self.session.commit()
+
+        json_path = 'artists_test.json'
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(['LINKIN PARK', 'Disturbed', 'Metallica'], f)
+
+        self.assertEqual(self.database.check_data_date(json_path, max_age_hours = 6), ['Disturbed', 'Metallica'])
+        self.assertEqual(self.database.check_data_date(json_path, max_age_hours = 48), ['Metallica'])
+
+        os.remove(json_path)
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
 
     def test_create_csv(self):
         """
@@ -203,77 +524,475 @@ class TestsDatabase(unittest.TestCase):
         """
         Tests if insert_csv_data_to_database correctly inserts CSV data into the database.
         """
-        with patch('os.listdir', return_value = ['test.csv']):
-             csv_content = (
+        csv_content = (
             "artist_name;artist_id;song_name;song_id;popularity;album;insertion_date\n"
             "Linkin Park;1;In the End;abc;91;Hybrid Theory;2024-07-22\n"
             "Linkin Park;1;Numb;def;90;Meteora;2024-07-22\n"
-             )
+        )
+
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, 'test.csv'), 'w', encoding='utf-8') as f:
+                f.write(csv_content)
+
+            self.clear_history()
+            self.session.query(Artists).delete()
+            self.session.commit()
+
+            self.database.insert_csv_data_to_database(folder)
+
+            artists = self.session.query(Artists).filter_by(artist_id = '1').all()
+            tracks = [t for t in self.history() if t.artist_id == '1']
+
+            self.assertEqual(len(artists), 1)
+            self.assertEqual(artists[0].artist_name, 'Linkin Park')
+            self.assertEqual(len(tracks), 2)
+            song_names = [t.song_name for t in tracks]
+            self.assertIn('In the End', song_names)
+            self.assertIn('Numb', song_names)
+
+            self.clear_history()
+            self.session.query(Artists).delete()
+            self.session.query(IngestedFiles).delete()
+            self.session.commit()
+
+    def test_insert_csv_data_incremental(self):
+        """
+        Tests if unchanged CSV files are skipped and only rows appended since the last run are ingested.
+        """
+        header = "artist_name;artist_id;song_name;song_id;popularity;album;insertion_date\n"
+        with tempfile.TemporaryDirectory() as folder:
+            full_path = os.path.join(folder, 'search_results_2024-07-22.csv')
+            with open(full_path, 'w', encoding='utf-8') as f:
+                f.write(header + "Linkin Park;1;In the End;abc;91;Hybrid Theory;2024-07-22\n")
+
+            self.clear_history()
+            self.session.query(Artists).delete()
+            self.session.commit()
+
+            self.database.insert_csv_data_to_database(folder)
+            self.clear_history()
+
+            self.database.insert_csv_data_to_database(folder)
+            self.assertEqual(len(self.history()), 0)
+
+            with open(full_path, 'a', encoding='utf-8') as f:
+                f.write("Linkin Park;1;Numb;def;90;Meteora;2024-07-22\n")
+            self.database.insert_csv_data_to_database(folder)
+
+            tracks = self.history()
+            self.assertEqual([t.song_name for t in tracks], ['Numb'])
+            manifest = self.session.get(IngestedFiles, os.path.abspath(full_path))
+            self.assertEqual(manifest.byte_offset, os.path.getsize(full_path))
+
+            self.clear_history()
+            self.session.query(Artists).delete()
+            self.session.query(IngestedFiles).delete()
+            self.session.commit()
+
+    def test_insert_csv_data_last_line_without_newline(self):
+        """
+        Tests if a last line without newline is left for the next run while the file may be being
+        written, and ingested once the file is settled.
+        """
+        header = "artist_name;artist_id;song_name;song_id;popularity;album;insertion_date\n"
+        with tempfile.TemporaryDirectory() as folder:
+            full_path = os.path.join(folder, 'search_results_2024-07-22.csv')
+            with open(full_path, 'w', encoding='utf-8') as f:
+                f.write(header + "Linkin Park;1;In the End;abc;91;Hybrid Theory;2024-07-22\n"
+                        "Linkin Park;1;Numb;def;90;Meteora;2024-07-22")
+
+            self.clear_history()
+            self.session.query(Artists).delete()
+            self.session.commit()
+
+            self.database.insert_csv_data_to_database(folder)
+            self.assertEqual([t.song_name for t in self.history()], ['In the End'])
+
+            settled = time.time() - 60
+            os.utime(full_path, (settled, settled))
+            self.database.insert_csv_data_to_database(folder)
+            self.assertEqual(sorted(t.song_name for t in self.history()), ['In the End', 'Numb'])
+            manifest = self.session.get(IngestedFiles, os.path.abspath(full_path))
+            self.assertEqual(manifest.byte_offset, os.path.getsize(full_path))
+
+            self.clear_history()
+            self.database.insert_csv_data_to_database(folder)
+            self.assertEqual(len(self.history()), 0)
+
+            single_path = os.path.join(folder, 'search_results_2024-07-23.csv')
+            with open(single_path, 'w', encoding='utf-8') as f:
+                f.write(header + "Linkin Park;1;Faint;ghi;85;Meteora;2024-07-23")
+            self.database.insert_csv_data_to_database(folder)
+            os.utime(single_path, (settled, settled))
+            self.database.insert_csv_data_to_database(folder)
+            self.assertEqual([t.song_name for t in self.history()], ['Faint'])
+
+            self.clear_history()
+            self.session.query(Artists).delete()
+            self.session.query(IngestedFiles).delete()
+            self.session.commit()
+
+    def test_insert_csv_data_in_batches(self):
+        """
+        Tests if CSV rows are streamed and written in batches, recording the final offset of the file.
+        """
+        header = "artist_name;artist_id;song_name;song_id;popularity;album;insertion_date\n"
+        rows = "".join(f"Linkin Park;1;Song {i};id{i};{i};Meteora;2024-07-22\n" for i in range(5))
+        with tempfile.TemporaryDirectory() as folder:
+            full_path = os.path.join(folder, 'test.csv')
+            with open(full_path, 'w', encoding='utf-8') as f:
+                f.write(header + rows)
+
+            self.clear_history()
+            self.session.query(Artists).delete()
+            self.session.commit()
+
+            self.assertEqual(list(Database._batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+            self.database.insert_csv_data_to_database(folder, batch_size = 2)
+
+            self.assertEqual(len(self.history()), 5)
+            manifest = self.session.get(IngestedFiles, os.path.abspath(full_path))
+            self.assertEqual(manifest.size, os.path.getsize(full_path))
+            self.assertEqual(manifest.byte_offset, os.path.getsize(full_path))
+
+            self.clear_history()
+            self.session.query(Artists).delete()
+            self.session.query(IngestedFiles).delete()
+            self.session.commit()
+
+    def test_insert_results(self):
+        """
+        Tests if insert_results upserts artists and tracks directly, skipping failed artists.
+        """
+        self.clear_history()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+        artist = Artist(name = 'Linkin Park', artist_id = '1')
+        track1 = Track(track_name = 'In The End', track_id = 'abc', popularity = 91, album = 'Hybrid Theory')
+        track2 = Track(track_name = 'Numb', track_id = 'def', popularity = 90, album = 'Meteora')
+        results = [{'artist': artist, 'top_tracks': [track1, track2]}, None]
+
+        self.database.insert_results(results, '2024-07-22 10:00:00')
+        results[0]['top_tracks'][0] = replace(track1, popularity = 95)
+        self.database.insert_results(results, '2024-07-22 10:00:00')
+
+        self.assertEqual(self.session.query(Artists).count(), 1)
+        tracks = self.history()
+        self.assertEqual(len(tracks), 2)
+        self.assertEqual(tracks[0].popularity, 95)
+        self.assertEqual(tracks[0].insertion_date, '2024-07-22 10:00:00')
+        self.assertEqual(tracks[0].insertion_day, date(2024, 7, 22))
+
+        self.clear_history()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+    def test_latest_top_tracks_maintained(self):
+        """
+        Tests if ingestion replaces an artist's latest snapshot with newer data only.
+        """
+        self.session.query(LatestTopTracks).delete()
+        self.clear_history()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+        artist = Artist(name = 'Linkin Park', artist_id = '1')
+        newer = {'artist': artist, 'top_tracks': [Track(track_name = 'Numb', track_id = 'def', popularity = 90, album = 'Meteora'),
+                                                  Track(track_name = 'In The End', track_id = 'abc', popularity = 91, album = 'Hybrid Theory')]}
+        older = {'artist': artist, 'top_tracks': [Track(track_name = 'Papercut', track_id = 'ghi', popularity = 80, album = 'Hybrid Theory')]}
+
+        self.database.insert_results([newer], '2024-07-22 10:00:00')
+        self.database.insert_results([older], '2024-07-21 10:00:00')
+
+        result = self.database.query_top_tracks_data('1')
+        self.assertEqual([t.song_name for t in result], ['In The End', 'Numb'])
+        self.assertEqual(len(self.history()), 3)
+
+        self.session.query(LatestTopTracks).delete()
+        self.clear_history()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+    def test_migrate(self):
+        """
+        Tests if migrate adds and backfills insertion_day and creates the indexes on an old database.
+        """
+        engine = create_engine('sqlite://')
+        with engine.begin() as connection:
+            connection.execute(text('CREATE TABLE artists (artist_id VARCHAR PRIMARY KEY, artist_name VARCHAR)'))
+            connection.execute(text(
+                'CREATE TABLE top_tracks (song_name VARCHAR, song_id VARCHAR, popularity INTEGER, album VARCHAR, '
+                'artist_id VARCHAR, insertion_date VARCHAR, PRIMARY KEY (song_id, insertion_date))'
+            ))
+            connection.execute(text(
+                "INSERT INTO top_tracks VALUES ('Numb', 'def', 90, 'Meteora', '1', '2024-07-22 09:09:44.331729')"
+            ))
+
+        migrate(engine)
+
+        with engine.connect() as connection:
+            day = connection.execute(text('SELECT insertion_day FROM top_tracks_history')).scalar()
+            latest = connection.execute(text('SELECT song_id FROM latest_top_tracks')).scalars().all()
+            legacy = connection.execute(text('SELECT count(*) FROM top_tracks')).scalar()
+            partitioned = connection.execute(text('SELECT song_id FROM top_tracks_202407')).scalars().all()
+        indexes = {index['name'] for index in inspect(engine).get_indexes('top_tracks')}
+        self.assertEqual(day, '2024-07-22')
+        self.assertEqual(latest, ['def'])
+        self.assertEqual((legacy, partitioned), (0, ['def']))
+        self.assertIn('ix_top_tracks_artist_date_popularity', indexes)
+        self.assertIn('ix_top_tracks_insertion_day_artist', indexes)
+
+    def test_migrate_skips_current_schema(self):
+        """
+        Tests if migrate records the schema version and leaves a database at that version untouched.
+        """
+        engine = create_engine('sqlite://')
+        migrate(engine)
+        with engine.begin() as connection:
+            version = connection.execute(text('PRAGMA user_version')).scalar()
+            connection.execute(text('DROP INDEX ix_top_tracks_insertion_day_artist'))
 
-             m = mock_open(read_data=csv_content)
-             with patch('builtins.open', m):
-                  with patch('csv.DictReader', wraps = csv.DictReader) as mock_reader:
-                    session.query(TopTracks).delete()
-                    session.query(Artists).delete()
-                    session.commit()
+        migrate(engine)
 
-                    self.database.insert_csv_data_to_database('data')
+        indexes = {index['name'] for index in inspect(engine).get_indexes('top_tracks')}
+        self.assertEqual(version, SCHEMA_VERSION)
+        self.assertNotIn('ix_top_tracks_insertion_day_artist', indexes)
 
-                    artists = session.query(Artists).filter_by(artist_id = '1').all()
-                    tracks = session.query(TopTracks).filter_by(artist_id = '1').all()
+    def test_snapshot_reader(self):
+        """
+        Tests if SnapshotReader returns the same artists and latest tracks as Database.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'test.db')
+            self.assertFalse(SnapshotReader.available(path))
+
+            engine = create_database_engine(path)
+            database = Database(engine=engine)
+            database.insert_results([
+                {'artist': Artist(name='Linkin Park', artist_id='1'),
+                 'top_tracks': [Track('Numb', 'def', 80, 'Meteora'), Track('In the End', 'abc', 90, 'Hybrid Theory')]},
+                {'artist': Artist(name='Disturbed', artist_id='2'),
+                 'top_tracks': [Track('Down with the Sickness', 'ghi', 85, 'The Sickness')]}
+            ], insertion_date='2024-07-22 09:09:44.331729')
+            engine.dispose()
+
+            self.assertTrue(SnapshotReader.available(path))
+            reader = SnapshotReader(path)
+            artists = reader.query_artists_data(['linkin park', '2'])
+            tracks = reader.query_latest_top_tracks(['1'])
+            everything = reader.query_latest_top_tracks()
+            reader.close()
+
+        self.assertEqual(sorted(artist.name for artist in artists), ['Disturbed', 'Linkin Park'])
+        self.assertEqual([track.song_id for track in tracks['1']], ['abc', 'def'])
+        self.assertEqual(tracks['1'][0].insertion_date, '2024-07-22 09:09:44.331729')
+        self.assertEqual(set(everything), {'1', '2'})
+
+    def test_partitioned_history(self):
+        """
+        Tests if tracks are written to the partition of their month and if partitions can be archived and dropped.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            engine = create_database_engine(os.path.join(folder, 'test.db'))
+            database = Database(engine=engine)
+            artist = Artist(name='Linkin Park', artist_id='1')
+            database.insert_results([{'artist': artist, 'top_tracks': [Track('Numb', 'def', 80, 'Meteora')]}],
+                                    insertion_date='2024-06-30 09:00:00')
+            database.insert_results([{'artist': artist, 'top_tracks': [Track('Numb', 'def', 85, 'Meteora'),
+                                                                       Track('Faint', 'ghi', 75, 'Meteora')]}],
+                                    insertion_date='2024-07-01 09:00:00')
+
+            self.assertEqual(database.partitions(), [('202406', 1), ('202407', 2)])
+            self.assertEqual([t.popularity for t in database.query_top_tracks_data('1')], [85, 75])
+
+            path = database.archive_partition('202406', os.path.join(folder, 'archive'))
+            archive = create_database_engine(path)
+            with archive.connect() as connection:
+                archived = connection.execute(text('SELECT song_id, popularity FROM top_tracks_202406')).all()
+            archive.dispose()
+            self.assertEqual(archived, [('def', 80)])
+            self.assertEqual(database.partitions(), [('202407', 2)])
+
+            database.drop_partition('202407')
+            self.assertEqual(database.partitions(), [])
+            with self.assertRaises(RuntimeError):
+                database.drop_partition('202407')
+            database.insert_results([{'artist': artist, 'top_tracks': [Track('Numb', 'def', 90, 'Meteora')]}],
+                                    insertion_date='2024-07-02 09:00:00')
+            self.assertEqual(database.partitions(), [('202407', 1)])
+            engine.dispose()
+
+    def test_refresh_jobs(self):
+        """
+        Tests if workers claim disjoint jobs, if released and expired jobs are claimed again and if attempts are capped.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            engine = create_database_engine(os.path.join(folder, 'test.db'))
+            database = Database(engine=engine)
+            first = RefreshQueue(database, 'run', 'first', max_attempts = 2)
+            second = RefreshQueue(database, 'run', 'second', max_attempts = 2)
+
+            first.enqueue(['A', 'B', 'C'])
+            first.enqueue(['A'])
+            self.assertEqual(first.claim(2), ['A', 'B'])
+            self.assertEqual(second.claim(2), ['C'])
+            self.assertEqual(second.claim(2), [])
+
+            first.finish(['A'], ['B'])
+            second.release('connection lost')
+            self.assertEqual(first.claim(5), ['C'])
+
+            expired = RefreshQueue(database, 'run', 'third', lease_seconds = -1, max_attempts = 2)
+            self.assertEqual(expired.claim(5), [])
+            self.assertEqual(first.counts(), {'done': 1, 'failed': 2})
+
+            first.enqueue(['B', 'D'])
+            self.assertEqual(first.claim(5), ['B', 'D'])
+            first.finish([], errors = {'B': '429 Too Many Requests', 'D': 'Read timed out'})
+            self.assertEqual(first.counts(), {'done': 1, 'failed': 2, 'pending': 1})
+            first.enqueue(['B'])
+            self.assertEqual(first.claim(5), ['D'])
+
+            jobs = {job.artist_name: (job.status, job.last_error) for job in database.Session().query(RefreshJobs).all()}
+            database.Session.remove()
+            engine.dispose()
 
-                    self.assertEqual(len(artists), 1)
-                    self.assertEqual(artists[0].artist_name, 'Linkin Park')
-                    self.assertEqual(len(tracks), 2)
-                    song_names = [t.song_name for t in tracks]
-                    self.assertIn('In the End', song_names)
-                    self.assertIn('Numb', song_names)
+        self.assertEqual(jobs, {'A': ('done', None), 'B': ('failed', '429 Too Many Requests'),
+                                'C': ('failed', 'Lease expired'), 'D': ('in_progress', 'Read timed out')})
 
-                    session.query(TopTracks).delete()
-                    session.query(Artists).delete()
-                    session.commit()
+    @unittest.skipIf(np is None, 'numpy is not installed')
+    def test_export_history(self):
+        """
+        Tests if export_history writes typed, dictionary-encoded columns sorted by artist, song and date,
+        readable memory-mapped from a folder and from a compressed archive.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            engine = create_database_engine(os.path.join(folder, 'test.db'))
+            database = Database(engine=engine)
+            database.insert_results([{'artist': Artist(name='Linkin Park', artist_id='1'),
+                                      'top_tracks': [Track('Numb', 'def', 80, 'Meteora')]}],
+                                    insertion_date='2024-07-23 09:00:00')
+            database.insert_results([{'artist': Artist(name='Linkin Park', artist_id='1'),
+                                      'top_tracks': [Track('Numb', 'def', 70, 'Meteora'),
+                                                     Track('In the End', 'abc', 90, 'Hybrid Theory')]}],
+                                    insertion_date='2024-07-22 09:00:00')
+
+            rows = database.export_history(os.path.join(folder, 'history'))
+            database.export_history(os.path.join(folder, 'history.npz'))
+            engine.dispose()
+
+            history = load_history(os.path.join(folder, 'history'))
+            archive = load_history(os.path.join(folder, 'history.npz'))
+
+            self.assertEqual(rows, 3)
+            self.assertIsInstance(history.popularity, np.memmap)
+            self.assertEqual(history.popularity.dtype, np.int8)
+            self.assertEqual(history.artist_codes.dtype, np.int8)
+            self.assertEqual(list(history.song_id), ['abc', 'def', 'def'])
+            self.assertEqual(list(history.popularity), [90, 70, 80])
+            self.assertEqual([str(day) for day in history.insertion_day], ['2024-07-22', '2024-07-22', '2024-07-23'])
+            self.assertEqual(list(history.artist_names), ['Linkin Park'])
+            self.assertEqual(list(archive.popularity), list(history.popularity))
+
+    def test_create_database_engine_pragmas(self):
+        """
+        Tests if every connection of the engine gets the tuning PRAGMAs.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            engine = create_database_engine(os.path.join(folder, 'db', 'test.db'), busy_timeout=1234)
+            with engine.connect() as connection:
+                journal_mode = connection.execute(text('PRAGMA journal_mode')).scalar()
+                synchronous = connection.execute(text('PRAGMA synchronous')).scalar()
+                busy_timeout = connection.execute(text('PRAGMA busy_timeout')).scalar()
+            engine.dispose()
+        self.assertEqual(journal_mode, 'wal')
+        self.assertEqual(synchronous, 1)
+        self.assertEqual(busy_timeout, 1234)
+
+    def test_database_shared_between_threads(self):
+        """
+        Tests if one Database instance can insert and query from several threads at once.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        with tempfile.TemporaryDirectory() as folder:
+            engine = create_database_engine(os.path.join(folder, 'test.db'))
+            database = Database(engine=engine)
+
+            def insert(i):
+                artist = Artist(name=f'Artist {i}', artist_id=str(i))
+                track = Track(track_name='Song', track_id=f'song{i}', popularity=i, album='Album')
+                database.insert_results([{'artist': artist, 'top_tracks': [track]}])
+                return database.query_artist_ids([f'Artist {i}'])
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                found = list(executor.map(insert, range(8)))
+
+            tracks = database.query_latest_top_tracks()
+            engine.dispose()
+        self.assertEqual(found, [{f'artist {i}': str(i)} for i in range(8)])
+        self.assertEqual(len(tracks), 8)
 
     def test_query_artists_data(self):
         """
         Tests if query_artists_data returns the correct artists for different filters.
         """
-        session.query(Artists).delete()
-        session.commit()
+        self.session.query(Artists).delete()
+        self.session.commit()
 
         artist1 = Artists(artist_id = '1', artist_name = 'Linkin Park')
         artist2 = Artists(artist_id = '2', artist_name = 'Disturbed')
         artist3 = Artists(artist_id = '3', artist_name = 'Metallica')
-        session.add_all([artist1, artist2, artist3])
-        session.commit()
+        self.session.add_all([artist1, artist2, artist3])
+        self.session.commit()
 
         result = self.database.query_artists_data(['linkin park'])
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0].artist_id, '1')
-        self.assertEqual(result[0].artist_name, 'Linkin Park')
+        self.assertEqual(result[0].name, 'Linkin Park')
 
         result = self.database.query_artists_data(['2'])
         self.assertEqual(len(result), 1)
-        self.assertEqual(result[0].artist_name, 'Disturbed')
+        self.assertEqual(result[0].name, 'Disturbed')
 
         result = self.database.query_artists_data(['metallica', 'LINKIN PARK'])
         ids = [a.artist_id for a in result]
         self.assertIn('1', ids)
         self.assertIn('3', ids)
 
-        session.query(Artists).delete()
-        session.commit()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+    def test_query_artist_ids(self):
+        """
+        Tests if query_artist_ids maps lowercased names to stored IDs, leaving unknown names out.
+        """
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+        self.session.add_all([Artists(artist_id = '1', artist_name = 'Linkin Park'),
+                         Artists(artist_id = '2', artist_name = 'Disturbed')])
+        self.session.commit()
+
+        result = self.database.query_artist_ids(['LINKIN PARK', 'Disturbed', 'Metallica'])
+        self.assertEqual(result, {'linkin park': '1', 'disturbed': '2'})
+
+        self.session.query(Artists).delete()
+        self.session.commit()
 
     def test_query_top_tracks_data(self):
         """
         Tests if query_top_tracks_data returns the most popular tracks from the most recent date.
         """
-        session.query(TopTracks).delete()
-        session.query(Artists).delete()
-        session.commit()
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
 
         artist = Artists(artist_id = '1', artist_name = 'Linkin Park')
-        session.add(artist)
-        session.commit()
+        self.session.add(artist)
+        self.session.commit()
 
         track1 = TopTracks(
             song_name = 'In The End',
@@ -299,8 +1018,9 @@ class TestsDatabase(unittest.TestCase):
             artist_id = '1',
             insertion_date = '2024-07-21'
         )
-        session.add_all([track1, track2, track3])
-        session.commit()
+        self.session.add_all([track1, track2, track3])
+        self.session.commit()
+        self.database.rebuild_latest_top_tracks()
 
         result = self.database.query_top_tracks_data('1')
 
@@ -308,22 +1028,61 @@ class TestsDatabase(unittest.TestCase):
         self.assertEqual(result[0].song_name, 'In The End')
         self.assertEqual(result[1].song_name, 'Numb')
 
-        session.query(TopTracks).delete()
-        session.query(Artists).delete()
-        session.commit()
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+    def test_query_latest_top_tracks(self):
+        """
+        Tests if query_latest_top_tracks returns the most recent tracks of several artists in one call.
+        """
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+        self.session.add_all([Artists(artist_id = '1', artist_name = 'Linkin Park'),
+                         Artists(artist_id = '2', artist_name = 'Disturbed')])
+        self.session.add_all([
+            TopTracks(song_name = 'Numb', song_id = 'def', popularity = 90, album = 'Meteora',
+                      artist_id = '1', insertion_date = '2024-07-22'),
+            TopTracks(song_name = 'In The End', song_id = 'abc', popularity = 91, album = 'Hybrid Theory',
+                      artist_id = '1', insertion_date = '2024-07-22'),
+            TopTracks(song_name = 'Papercut', song_id = 'ghi', popularity = 80, album = 'Hybrid Theory',
+                      artist_id = '1', insertion_date = '2024-07-21'),
+            TopTracks(song_name = 'Stricken', song_id = 'jkl', popularity = 85, album = 'Ten Thousand Fists',
+                      artist_id = '2', insertion_date = '2024-07-20')
+        ])
+        self.session.commit()
+        self.database.rebuild_latest_top_tracks()
+
+        result = self.database.query_latest_top_tracks(['1', '2', '3'], batch_size = 1)
+
+        self.assertEqual([t.song_name for t in result['1']], ['In The End', 'Numb'])
+        self.assertEqual([t.song_name for t in result['2']], ['Stricken'])
+        self.assertNotIn('3', result)
+        self.assertEqual(self.database.query_latest_top_tracks().keys(), result.keys())
+        self.assertEqual(result['2'][0], TrackSnapshot(artist_id = '2', song_id = 'jkl', song_name = 'Stricken',
+                                                       popularity = 85, album = 'Ten Thousand Fists',
+                                                       insertion_date = '2024-07-20'))
+        with self.assertRaises(AttributeError):
+            result['2'][0].popularity = 0
+
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
 
     def test_display_artists(self):
         """
         Tests if display_artists correctly prints all registered artists in the database.
         """
-        session.query(TopTracks).delete()
-        session.query(Artists).delete()
-        session.commit()
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
 
         artist1 = Artists(artist_id = '1', artist_name = 'Linkin Park')
         artist2 = Artists(artist_id = '2', artist_name = 'Disturbed')
-        session.add_all([artist1, artist2])
-        session.commit()
+        self.session.add_all([artist1, artist2])
+        self.session.commit()
 
         f = StringIO()
         with redirect_stdout(f):
@@ -334,9 +1093,458 @@ class TestsDatabase(unittest.TestCase):
         self.assertIn('Disturbed', output)
         self.assertIn('All artists in database', output)
 
-        session.query(TopTracks).delete()
-        session.query(Artists).delete()
-        session.commit()
+        self.session.query(TopTracks).delete()
+        self.session.query(Artists).delete()
+        self.session.commit()
+
+class TestsQueryData(unittest.TestCase):
+    def test_execute(self):
+        """
+        Tests if execute fetches the tracks of all found artists with a single bulk call.
+        """
+        artists = [Artist(name = 'Linkin Park', artist_id = '1'), Artist(name = 'Disturbed', artist_id = '2')]
+        track = TrackSnapshot(artist_id = '1', song_id = 'def', song_name = 'Numb', popularity = 90, album = 'Meteora',
+                              insertion_date = '2024-07-22')
+        query_tracks = MagicMock(return_value = {'1': [track]})
+
+        usecase = QueryDataUseCase(lambda filter_list: artists, query_tracks, 'Linkin Park, Disturbed')
+        result = usecase.execute()
+
+        query_tracks.assert_called_once_with(['1', '2'])
+        self.assertEqual(result['Linkin Park']['top_tracks'][0]['song_name'], 'Numb')
+        self.assertEqual(result['Disturbed'], {'id': '2', 'top_tracks': []})
+
+    def test_filter_list(self):
+        """
+        Tests if an empty filter or answer matches no artist, and if only a missing filter without
+        prompt selects every artist.
+        """
+        query_artists = MagicMock(return_value = [])
+
+        self.assertEqual(QueryDataUseCase(query_artists, MagicMock(), '').execute(), {})
+        query_artists.assert_called_with([''])
+        with patch('builtins.input', return_value = ''):
+            QueryDataUseCase(query_artists, MagicMock()).execute()
+        query_artists.assert_called_with([''])
+        QueryDataUseCase(query_artists, MagicMock(), ask = False).execute()
+        query_artists.assert_called_with([])
+
+    def test_iter_results(self):
+        """
+        Tests if iter_results yields one artist at a time, querying tracks per batch of artists.
+        """
+        artists = [Artist(name = f'Artist {i}', artist_id = str(i)) for i in range(5)]
+        query_tracks = MagicMock(side_effect = lambda ids: {})
+
+        results = QueryDataUseCase(lambda filter_list: artists, query_tracks, '', batch_size = 2).iter_results()
+        first = next(results)
+
+        self.assertEqual(first, ('Artist 0', {'id': '0', 'top_tracks': []}))
+        query_tracks.assert_called_once_with(['0', '1'])
+        self.assertEqual([name for name, entry in results], ['Artist 1', 'Artist 2', 'Artist 3', 'Artist 4'])
+        self.assertEqual(query_tracks.call_count, 3)
+
+    def test_write_results(self):
+        """
+        Tests if json and ndjson outputs are valid JSON with ISO insertion dates, with and without orjson.
+        """
+        def results():
+            yield 'Linkin Park', {'id': '1', 'top_tracks': [{'song_name': 'Numb', 'song_id': 'def', 'popularity': 90,
+                                                             'album': 'Meteora', 'insertion_date': '2024-07-22 09:09:44.331729'}]}
+            yield 'Beyoncé', {'id': '2', 'top_tracks': []}
+            yield 'Linkin Park', {'id': '3', 'top_tracks': []}
+
+        for encoder in {output.orjson, None}:
+            with patch.object(output, 'orjson', encoder):
+                stream = StringIO()
+                output.write_results(results(), 'json', stream)
+                document = json.loads(stream.getvalue())
+
+                stream = StringIO()
+                output.write_results(results(), 'ndjson', stream)
+                lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+            self.assertEqual(list(document), ['Linkin Park', 'Beyoncé', 'Linkin Park (3)'])
+            self.assertEqual(document['Linkin Park']['top_tracks'][0]['insertion_date'], '2024-07-22T09:09:44.331729')
+            self.assertEqual([line['artist_name'] for line in lines], ['Linkin Park', 'Beyoncé', 'Linkin Park'])
+            self.assertEqual(lines[0]['top_tracks'][0]['insertion_date'], '2024-07-22T09:09:44.331729')
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestsAnalytics(unittest.TestCase):
+    def setUp(self):
+        rows = []
+        for day, popularity in (('2024-07-20', (50, 60)), ('2024-07-21', (70, 55)), ('2024-07-22', (80, 40))):
+            rows.append(('1', 'Linkin Park', 'numb', 'Numb', 'Meteora', popularity[0], f'{day} 09:00:00'))
+            rows.append(('1', 'Linkin Park', 'end', 'In the End', 'Hybrid Theory', popularity[1], f'{day} 09:00:00'))
+        rows.append(('2', 'Disturbed', 'down', 'Down with the Sickness', 'The Sickness', 30, '2024-07-22 09:00:00'))
+        self.history = build_history(reversed(rows))
+
+    def test_compute_trends(self):
+        """
+        Tests deltas, rolling averages, ranks and rank changes of every track at once.
+        """
+        trends = compute_trends(self.history, window=2)
+        songs = list(self.history.song_id)
+
+        numb = [row for row, song in enumerate(songs) if song == 'numb']
+        end = [row for row, song in enumerate(songs) if song == 'end']
+        self.assertTrue(np.isnan(trends['delta'][numb[0]]))
+        self.assertEqual(list(trends['delta'][numb[1:]]), [20, 10])
+        self.assertEqual(list(trends['rolling_average'][numb]), [50, 60, 75])
+        self.assertEqual(list(trends['rank'][numb]), [2, 1, 1])
+        self.assertEqual(list(trends['rank'][end]), [1, 2, 2])
+        self.assertEqual(list(trends['rank_change'][numb[1:]]), [1, 0])
+        self.assertEqual(trends['rank'][songs.index('down')], 1)
+
+    def test_execute(self):
+        """
+        Tests if execute returns the rising tracks, ordered by gain, with their trend values.
+        """
+        result = AnalyticsUseCase(lambda: self.history, window=3, days=2).execute()
+
+        self.assertEqual(result['latest_day'], '2024-07-22')
+        self.assertEqual(len(result['rising_tracks']), 1)
+        rising = result['rising_tracks'][0]
+        self.assertEqual(rising['song_name'], 'Numb')
+        self.assertEqual(rising['artist_name'], 'Linkin Park')
+        self.assertEqual(rising['gain'], 10)
+        self.assertEqual(rising['rolling_average'], 66.67)
+        self.assertEqual(rising['rank'], 1)
+        self.assertEqual(rising['rank_change'], 0)
+
+
+class TestsUpdateData(unittest.TestCase):
+    def test_fetch_artists_with_workers(self):
+        """
+        Tests if fetching with several workers keeps roster order and the None result of a failed artist.
+        """
+        class FakeAPI:
+            def search_artist(self, artist):
+                if artist == 'Unknown':
+                    return None
+                return Artist(name = artist, artist_id = artist.lower())
+
+            def search_top_tracks(self, artist):
+                if artist is None:
+                    return None
+                return {'artist': artist, 'top_tracks': []}
+
+        artists = ['Linkin Park', 'Unknown', 'Disturbed', 'Metallica']
+        usecase = UpdateDataUseCase(FakeAPI(), None, None, None, workers = 3)
+
+        with redirect_stdout(StringIO()):
+            results = usecase.fetch_artists(artists)
+
+        self.assertIsNone(results[1])
+        self.assertEqual([r['artist'].name for r in results if r], ['Linkin Park', 'Disturbed', 'Metallica'])
+
+    def test_known_artists_skip_search(self):
+        """
+        Tests if artists already stored are refreshed by ID and only new names are searched.
+        """
+        api = MagicMock()
+        api.artist_cache = {}
+        api.search_artists_by_ids.return_value = [Artist(name = 'Linkin Park', artist_id = '1')]
+        api.search_artist.return_value = Artist(name = 'Metallica', artist_id = '3')
+        api.search_top_tracks.side_effect = lambda artist: {'artist': artist, 'top_tracks': []}
+
+        usecase = UpdateDataUseCase(api, None, None, None, resolve_artist_ids = lambda names: {'linkin park': '1'})
+        with redirect_stdout(StringIO()):
+            known = usecase.resolve_known_artists(['Linkin Park', 'Metallica'])
+            results = usecase.fetch_artists(['Linkin Park', 'Metallica'], known)
+
+        api.search_artists_by_ids.assert_called_once_with(['1'])
+        api.search_artist.assert_called_once_with('Metallica')
+        self.assertEqual([r['artist'].artist_id for r in results], ['1', '3'])
+
+    def test_execute_resumes_interrupted_run(self):
+        """
+        Tests if batches fetched before a crash are committed and their jobs done, if the next run only fetches the rest,
+        and if artists whose requests failed are fetched again while those not found are failed.
+        """
+        fetched = []
+
+        class FakeAPI:
+            crash = True
+
+            not_found = {'unknown'}
+            errors = {}
+
+            def search_artist(self, artist):
+                fetched.append(artist)
+                if artist == 'Crash' and self.crash:
+                    raise RuntimeError('connection lost')
+                if artist == 'Unknown':
+                    return None
+                if artist == 'Throttled' and fetched.count(artist) == 1:
+                    self.errors['throttled'] = '429 Too Many Requests'
+                    return None
+                return Artist(name = artist, artist_id = artist.lower())
+
+            def search_top_tracks(self, artist):
+                if artist is None:
+                    return None
+                return {'artist': artist, 'top_tracks': []}
+
+        artists = ['A', 'B', 'Unknown', 'C', 'Crash', 'E', 'Throttled']
+        saved = []
+        with tempfile.TemporaryDirectory() as folder:
+            engine = create_database_engine(os.path.join(folder, 'test.db'))
+            jobs = RefreshQueue(Database(engine=engine), 'run')
+            api = FakeAPI()
+            # As check_data_date, leaves out the artists saved today.
+            stale = lambda _: [a for a in artists if not any(a in names for names in saved)]
+            usecase = UpdateDataUseCase(api, stale, lambda results, _: saved.append([r['artist'].name for r in results]),
+                                        batch_size = 2, jobs = jobs)
+
+            with redirect_stdout(StringIO()):
+                with self.assertRaises(RuntimeError):
+                    usecase.execute('artists.json')
+                self.assertEqual(saved, [['A', 'B'], ['C']])
+                self.assertEqual(jobs.counts(), {'done': 3, 'failed': 1, 'pending': 3})
+
+                fetched.clear()
+                api.crash = False
+                usecase.execute('artists.json')
+            counts = jobs.counts()
+            engine.dispose()
+
+        # Not found artists are searched again while they have attempts left; throttled ones are retried in the same run.
+        self.assertEqual(fetched, ['Unknown', 'Crash', 'E', 'Throttled', 'Throttled'])
+        self.assertEqual(saved[2:], [['Crash'], ['E'], ['Throttled']])
+        self.assertEqual(counts, {'done': 6, 'failed': 1})
+
+    def test_roster_names_resolved_on_later_runs(self):
+        """
+        Tests if a roster name spelled differently from Spotify's is searched once, then resolved by
+        the artist ID kept for it, and counts as fresh once its data is saved.
+        """
+        api = MagicMock()
+        api.artist_cache = {}
+        api.search_artist.return_value = Artist(name = 'Beyoncé', artist_id = '1')
+        api.search_artists_by_ids.return_value = [Artist(name = 'Beyoncé', artist_id = '1')]
+        api.search_top_tracks.side_effect = lambda artist: {'artist': artist, 'top_tracks': [Track('Halo', 'abc', 80, 'I Am')]}
+
+        with tempfile.TemporaryDirectory() as folder:
+            artists_json = os.path.join(folder, 'artists.json')
+            with open(artists_json, 'w', encoding='utf-8') as f:
+                json.dump(['Beyonce'], f)
+            engine = create_database_engine(os.path.join(folder, 'test.db'))
+            database = Database(engine=engine)
+            usecase = UpdateDataUseCase(api, lambda _: ['Beyonce'], database.insert_results,
+                                        resolve_artist_ids = database.query_artist_ids,
+                                        save_artist_ids = database.insert_artist_aliases)
+
+            with redirect_stdout(StringIO()):
+                usecase.execute(artists_json)
+                usecase.execute(artists_json)
+            artist_ids = database.query_artist_ids(['BEYONCE'])
+            stale = database.check_data_date(artists_json)
+            engine.dispose()
+
+        api.search_artist.assert_called_once_with('Beyonce')
+        api.search_artists_by_ids.assert_called_once_with(['1'])
+        self.assertEqual(artist_ids, {'beyonce': '1'})
+        self.assertEqual(stale, [])
+
+    def test_execute_same_day_with_max_age_hours(self):
+        """
+        Tests if a second run on the same day fetches again the artists done by the first one once
+        check_data_date reports their data as older than max_age_hours.
+        """
+        api = MagicMock()
+        api.not_found, api.errors = set(), {}
+        api.search_artist.side_effect = lambda name: Artist(name = name, artist_id = '1')
+        api.search_top_tracks.side_effect = lambda artist: {
+            'artist': artist, 'top_tracks': [Track('Numb', 'def', 90, 'Meteora')]}
+        age = {'hours': 8}
+
+        with tempfile.TemporaryDirectory() as folder:
+            artists_json = os.path.join(folder, 'artists.json')
+            with open(artists_json, 'w', encoding='utf-8') as f:
+                json.dump(['Linkin Park'], f)
+            engine = create_database_engine(os.path.join(folder, 'test.db'))
+            database = Database(engine=engine)
+            jobs = RefreshQueue(database, RefreshQueue.run_id_for(artists_json))
+            check_data_date = lambda path: database.check_data_date(path, max_age_hours = 6)
+            insert_results = lambda results, insertion_date: database.insert_results(
+                results, insertion_date - timedelta(hours = age['hours']))
+            usecase = UpdateDataUseCase(api, check_data_date, insert_results, jobs = jobs)
+
+            with redirect_stdout(StringIO()):
+                usecase.execute(artists_json)
+                self.assertEqual(check_data_date(artists_json), ['Linkin Park'])
+                age['hours'] = 0
+                usecase.execute(artists_json)
+                self.assertEqual(api.search_top_tracks.call_count, 2)
+                self.assertEqual(check_data_date(artists_json), [])
+                usecase.execute(artists_json)
+            counts = jobs.counts()
+            engine.dispose()
+
+        self.assertEqual(api.search_top_tracks.call_count, 2)
+        self.assertEqual(counts, {'done': 1})
+
+
+class TestsQueryServer(unittest.TestCase):
+    def test_lru_cache(self):
+        """
+        Tests if LRUCache evicts the least recently used entry.
+        """
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_query_server(self):
+        """
+        Tests if the server answers queries as JSON from its cache and drops the cache once new data is committed.
+        """
+        import threading
+        import urllib.request
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'test.db')
+            engine = create_database_engine(path)
+            database = Database(engine=engine)
+            database.insert_results([{'artist': Artist(name='Linkin Park', artist_id='1'),
+                                      'top_tracks': [Track('Numb', 'def', 80, 'Meteora')]}],
+                                    insertion_date='2024-07-22 09:00:00')
+
+            service = QueryService(SnapshotReader(path, check_same_thread=False))
+            server = create_server(service, port=0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f'http://127.0.0.1:{server.server_address[1]}/query?filter=linkin%20park'
+
+            def get():
+                with urllib.request.urlopen(url) as response:
+                    return json.loads(response.read())
+
+            first = get()
+            second = get()
+            database.insert_results([{'artist': Artist(name='Linkin Park', artist_id='1'),
+                                      'top_tracks': [Track('Faint', 'ghi', 85, 'Meteora')]}],
+                                    insertion_date='2024-07-23 09:00:00')
+            third = get()
+
+            server.shutdown()
+            server.server_close()
+            service.reader.close()
+            engine.dispose()
+
+        self.assertEqual(first['Linkin Park']['top_tracks'][0]['song_name'], 'Numb')
+        self.assertEqual(second, first)
+        self.assertEqual(service.tracks.hits, 1)
+        self.assertEqual(service.invalidations, 1)
+        self.assertEqual(third['Linkin Park']['top_tracks'][0]['song_name'], 'Faint')
+
+
+class TestsMetrics(unittest.TestCase):
+    def test_histogram(self):
+        """
+        Tests if Histogram counts values per bucket and estimates quantiles from the buckets.
+        """
+        histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+        for value in (0.005, 0.01, 0.05, 0.5, 2.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.cumulative(), [(0.01, 2), (0.1, 3), (1.0, 4), ('+Inf', 5)])
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.99), 2.0)
+        self.assertAlmostEqual(histogram.snapshot()['sum'], 2.565)
+
+    def test_instrument(self):
+        """
+        Tests if instrumented methods record their latency, errors, empty results and items,
+        generators until exhausted, and if other instances are left unchanged.
+        """
+        class Target:
+            def store(self, rows):
+                return len(rows)
+
+            def find(self, name):
+                if name == 'error':
+                    raise RuntimeError('Search failed.')
+                return None
+
+            def rows(self, count):
+                yield from range(count)
+
+        metrics = Metrics()
+        target = metrics.instrument(Target(), 'database', ['store', 'find', 'rows', 'missing'])
+        self.assertEqual(target.store([1, 2, 3]), 3)
+        self.assertEqual(target.store([4]), 1)
+        self.assertIsNone(target.find('Linkin Park'))
+        with self.assertRaises(RuntimeError):
+            target.find('error')
+        self.assertEqual(list(target.rows(2)), [0, 1])
+        Target().store([5])
+
+        report = metrics.report()
+        histograms = {h['labels']['method']: h for h in report['histograms']}
+        counters = {(c['name'], c['labels']['method']): c['value'] for c in report['counters']}
+        self.assertEqual(histograms['store']['count'], 2)
+        self.assertEqual(histograms['find']['count'], 2)
+        self.assertEqual(histograms['rows']['count'], 1)
+        self.assertEqual(counters, {('spotify_call_errors_total', 'find'): 1,
+                                    ('spotify_call_empty_total', 'find'): 1,
+                                    ('spotify_call_items_total', 'store'): 4})
+
+    def test_rows_written(self):
+        """
+        Tests if the rows written by the database are counted, whatever the arguments of the caller.
+        """
+        from interface.main import INSTRUMENTED, ROW_COUNTS
+
+        header = "artist_name;artist_id;song_name;song_id;popularity;album;insertion_date\n"
+        with tempfile.TemporaryDirectory() as folder:
+            engine = create_database_engine(os.path.join(folder, 'spotify_data.db'))
+            metrics = Metrics()
+            database = metrics.instrument(Database(engine), 'database', INSTRUMENTED['database'], ROW_COUNTS['database'])
+            database.insert_results([{'artist': Artist(name='Linkin Park', artist_id='1'),
+                                      'top_tracks': [Track('In the End', 'abc', 91, 'Hybrid Theory'),
+                                                     Track('Numb', 'def', 90, 'Meteora')]}])
+            with open(os.path.join(folder, 'search_results_2024-07-22.csv'), 'w', encoding='utf-8') as f:
+                f.write(header + "Linkin Park;1;Faint;ghi;85;Meteora;2024-07-22\n")
+            database.insert_csv_data_to_database(folder)
+            engine.dispose()
+
+        counters = {(c['name'], c['labels']['method']): c['value'] for c in metrics.report()['counters']}
+        self.assertEqual(counters[('spotify_rows_written_total', '_upsert_rows')], 3)
+        self.assertEqual(counters[('spotify_call_items_total', 'insert_results')], 1)
+        self.assertNotIn(('spotify_rows_written_total', 'insert_results'), counters)
+
+    def test_write(self):
+        """
+        Tests if write saves the JSON report and the Prometheus text file, with the labels of the run.
+        """
+        metrics = Metrics(labels={'worker': 1})
+        metrics.count('spotify_http_requests_total', 12)
+        metrics.gauge('spotify_refresh_jobs', 3, status='done')
+        metrics.observe('spotify_call_duration_seconds', 0.02, component='api', method='search_artist')
+
+        with tempfile.TemporaryDirectory() as folder:
+            json_path, prom_path = metrics.write(folder)
+            with open(json_path, encoding='utf-8') as f:
+                report = json.load(f)
+            with open(prom_path, encoding='utf-8') as f:
+                text = f.read()
+            self.assertEqual(sorted(os.listdir(folder)), ['metrics.json', 'metrics.prom'])
+
+        self.assertEqual(report['counters'], [{'name': 'spotify_http_requests_total', 'labels': {'worker': 1}, 'value': 12}])
+        self.assertEqual(report['histograms'][0]['count'], 1)
+        self.assertIn('# TYPE spotify_http_requests_total counter\nspotify_http_requests_total{worker="1"} 12\n', text)
+        self.assertIn('spotify_refresh_jobs{worker="1",status="done"} 3\n', text)
+        self.assertIn('spotify_call_duration_seconds_bucket{worker="1",component="api",method="search_artist",le="0.025"} 1\n', text)
+        self.assertIn('spotify_call_duration_seconds_bucket{worker="1",component="api",method="search_artist",le="+Inf"} 1\n', text)
+        self.assertIn('spotify_call_duration_seconds_count{worker="1",component="api",method="search_artist"} 1\n', text)
+
 
 if __name__ == '__main__':
     unittest.main()